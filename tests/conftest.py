@@ -0,0 +1,120 @@
+"""
+Test configuration.
+
+  The annotation factories derive from vtkAtamai.ActorFactory, which needs a
+  GUI toolkit.  When vtkAtamai isn't installed, a minimal stand-in with the
+  parts of ActorFactory that the factories use is installed instead, so that
+  their probing can be tested with VTK and NumPy alone.
+
+"""
+
+import sys
+import types
+
+import numpy as np
+import pytest
+import vtk
+from vtk.util import numpy_support
+
+
+class ActorFactory(object):
+
+    """Stand-in for vtkAtamai.ActorFactory.ActorFactory."""
+
+    def __init__(self):
+        self._Renderers = []
+        self._ActorDict = {}
+        self._Object = vtk.vtkObject()
+
+    def Modified(self):
+        self._Object.Modified()
+
+    def GetMTime(self):
+        return self._Object.GetMTime()
+
+    def AddToRenderer(self, renderer):
+        self._Renderers.append(renderer)
+
+    def RemoveFromRenderer(self, renderer):
+        self._Renderers.remove(renderer)
+
+
+def _InstallModule(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
+try:
+    import vtkAtamai.ActorFactory
+except ImportError:
+    _InstallModule('vtkAtamai')
+    _InstallModule('vtkAtamai.ActorFactory', ActorFactory=ActorFactory)
+
+try:
+    import zope.component
+except ImportError:
+    import zope
+    _InstallModule('zope.component')
+
+
+def MakeImage(shape=(12, 14, 16), components=1, seed=0):
+    """Return a random float image with a non-trivial origin and spacing."""
+
+    nz, ny, nx = shape
+    rng = np.random.RandomState(seed)
+    array = rng.uniform(-100, 100, (nz, ny, nx, components)).astype(np.float32)
+
+    image = vtk.vtkImageData()
+    image.SetDimensions(nx, ny, nz)
+    image.SetSpacing(0.5, 0.75, 1.25)
+    image.SetOrigin(-3.0, 2.0, 1.5)
+    image.GetPointData().SetScalars(numpy_support.numpy_to_vtk(
+        array.reshape(-1, components), deep=1))
+    return image, array
+
+
+def ResliceAt(image, points, mode):
+    """Probe points one at a time with vtkImageReslice."""
+
+    reslice = vtk.vtkImageReslice()
+    reslice.SetInputData(image)
+    reslice.SetInterpolationMode(mode)
+    reslice.SetOutputExtent(0, 0, 0, 0, 0, 0)
+
+    values = []
+    for point in points:
+        reslice.SetOutputOrigin(point)
+        reslice.Update()
+        output = reslice.GetOutput()
+        values.append([output.GetScalarComponentAsDouble(0, 0, 0, c)
+                       for c in range(output.GetNumberOfScalarComponents())])
+    return np.array(values)
+
+
+def RandomPoints(image, n, margin, seed=1):
+    """Return n random world points, margin voxels inside of the bounds."""
+
+    rng = np.random.RandomState(seed)
+    b = np.array(image.GetBounds()).reshape(3, 2)
+    s = np.array(image.GetSpacing())
+    return rng.uniform(b[:, 0] + margin * s, b[:, 1] - margin * s, (n, 3))
+
+
+@pytest.fixture
+def make_image():
+    return MakeImage
+
+
+@pytest.fixture
+def reslice_at():
+    return ResliceAt
+
+
+@pytest.fixture
+def random_points():
+    return RandomPoints
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+import vtk
+from vtk.util import numpy_support
+
+from vtkEVS import ImageProbe
+
+
+def test_get_scalar_array_is_a_view(make_image):
+    image, array = make_image()
+    view = ImageProbe.get_scalar_array(image)
+    assert view.shape == array.shape
+    view[1, 2, 3, 0] = 1234.0
+    assert image.GetScalarComponentAsDouble(3, 2, 1, 0) == 1234.0
+
+
+def test_world_to_index(make_image):
+    image, array = make_image()
+    index = np.array([[0, 0, 0], [3, 5, 7], [15, 13, 11]], dtype=float)
+    points = np.array(image.GetOrigin()) + index * image.GetSpacing()
+    assert np.allclose(ImageProbe.world_to_index(image, points), index)
+
+
+def test_sample_nearest_matches_reslice(make_image, reslice_at,
+                                        random_points):
+    image, array = make_image(components=2)
+    points = random_points(image, 200, 0.0)
+
+    expected = reslice_at(image, points, vtk.VTK_RESLICE_NEAREST)
+    values = ImageProbe.sample_nearest(
+        array, ImageProbe.world_to_index(image, points))
+
+    assert np.array_equal(values, expected)
+
+
+@pytest.mark.parametrize('mode, margin', [
+    (vtk.VTK_RESLICE_NEAREST, 0.0),
+    (vtk.VTK_RESLICE_LINEAR, 0.0),
+    (vtk.VTK_RESLICE_CUBIC, 1.0),
+])
+def test_sample_matches_reslice(make_image, reslice_at, random_points,
+                                mode, margin):
+    image, array = make_image(components=2)
+    points = random_points(image, 200, margin)
+
+    expected = reslice_at(image, points, mode)
+    values = ImageProbe.sample(
+        array, ImageProbe.world_to_index(image, points), mode)
+
+    # vtkImageReslice interpolates float images in single precision
+    assert np.allclose(values, expected, rtol=1e-4, atol=1e-2)
+
+
+def test_sample_on_voxels_is_exact(make_image):
+    image, array = make_image()
+    index = np.array([[1, 2, 3], [4, 5, 6], [10, 11, 8]], dtype=float)
+    expected = array[index[:, 2].astype(int), index[:, 1].astype(int),
+                     index[:, 0].astype(int)]
+    for mode in (vtk.VTK_RESLICE_NEAREST, vtk.VTK_RESLICE_LINEAR,
+                 vtk.VTK_RESLICE_CUBIC):
+        assert np.allclose(ImageProbe.sample(array, index, mode), expected)
+
+
+def test_outside_is_background(make_image):
+    image, array = make_image()
+    index = np.array([[-2.0, 0, 0], [0, 100.0, 0], [0, 0, -0.6]])
+    for mode in (vtk.VTK_RESLICE_NEAREST, vtk.VTK_RESLICE_LINEAR,
+                 vtk.VTK_RESLICE_CUBIC):
+        values = ImageProbe.sample(array, index, mode, background=-7.0)
+        assert np.all(values == -7.0)
+
+
+def test_neighbourhood_statistics_clips_at_edge(make_image):
+    image, array = make_image()
+    stats = ImageProbe.neighbourhood_statistics(array, (0, 0, 0), 3)
+    window = array[0:2, 0:2, 0:2].reshape(-1, 1)
+    assert stats['count'] == 8
+    assert np.allclose(stats['mean'], window.mean(axis=0))
+    assert np.allclose(stats['max'], window.max(axis=0))
+
+
+def test_sample_series_matches_sample(make_image):
+    image, array = make_image()
+    stack = np.stack([array, 2 * array, array + 5])
+    index = (4.3, 6.7, 5.2)
+    for mode in (vtk.VTK_RESLICE_NEAREST, vtk.VTK_RESLICE_LINEAR,
+                 vtk.VTK_RESLICE_CUBIC):
+        values = ImageProbe.sample_series(stack, index, mode)
+        expected = [ImageProbe.sample(a, np.array([index]), mode)[0]
+                    for a in stack]
+        assert np.allclose(values, expected)
+
+
+@pytest.mark.parametrize('mode', [vtk.VTK_IMAGE_SLAB_MAX,
+                                  vtk.VTK_IMAGE_SLAB_MIN,
+                                  vtk.VTK_IMAGE_SLAB_MEAN])
+def test_slab_projection_matches_reslice(make_image, mode):
+    image, array = make_image()
+    first, last = 3, 7
+
+    reslice = vtk.vtkImageReslice()
+    reslice.SetInputData(image)
+    reslice.SetOutputDimensionality(2)
+    reslice.SetSlabMode(mode)
+    reslice.SetSlabNumberOfSlices(last - first + 1)
+    axes = vtk.vtkMatrix4x4()
+    axes.SetElement(2, 3, image.GetOrigin()[2] +
+                    0.5 * (first + last) * image.GetSpacing()[2])
+    reslice.SetResliceAxes(axes)
+    reslice.Update()
+    expected = numpy_support.vtk_to_numpy(
+        reslice.GetOutput().GetPointData().GetScalars())
+
+    projection = ImageProbe.slab_projection(array, 2, first, last, mode)
+    assert np.allclose(projection.ravel(), expected, atol=1e-4)
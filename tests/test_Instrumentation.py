@@ -0,0 +1,89 @@
+import json
+import pytest
+import vtk
+
+from vtkEVS import Instrumentation
+
+
+@pytest.fixture(autouse=True)
+def reset():
+    Instrumentation.Reset()
+    yield
+    Instrumentation.Enable(False)
+    Instrumentation.Reset()
+
+
+def test_histogram_statistics():
+    histogram = Instrumentation.RollingHistogram(size=4)
+    for ms in (0.05, 1.5, 3.0, 2000.0, 7.0):
+        histogram.Add(ms)
+
+    stats = histogram.GetStatistics()
+    assert stats['total'] == 5
+    assert stats['count'] == 4
+    assert stats['min'] == 1.5
+    assert stats['max'] == 2000.0
+    assert stats['histogram'] == [[2.0, 1], [5.0, 1], [10.0, 1], [None, 1]]
+
+
+def test_instrumented_only_records_when_enabled():
+    calls = []
+    wrapped = Instrumentation.Instrumented('test/call', calls.append)
+
+    wrapped(1)
+    assert Instrumentation.GetStatistics('test/call') is None
+
+    Instrumentation.Enable()
+    wrapped(2)
+    wrapped(3)
+    assert calls == [1, 2, 3]
+    assert Instrumentation.GetStatistics('test/call')['count'] == 2
+
+
+def test_instrumented_records_exceptions():
+    def fail():
+        raise RuntimeError()
+
+    Instrumentation.Enable()
+    with pytest.raises(RuntimeError):
+        Instrumentation.Instrumented('test/fail', fail)()
+    assert Instrumentation.GetStatistics('test/fail')['count'] == 1
+
+
+def test_callback_name():
+    class Pane(object):
+        def OnKey(self, evt):
+            pass
+
+    assert Instrumentation.GetCallbackName(Pane().OnKey) == 'Pane.OnKey'
+
+
+def test_dump_json(tmp_path):
+    Instrumentation.Record('render/test', 0.004)
+    filename = str(tmp_path / 'stats.json')
+    text = Instrumentation.DumpJSON(filename)
+    with open(filename) as f:
+        assert json.load(f) == json.loads(text)
+    assert json.loads(text)['render/test']['max'] == pytest.approx(4.0)
+
+
+def test_observe_renderer():
+    renderer = vtk.vtkRenderer()
+    window = vtk.vtkRenderWindow()
+    window.SetOffScreenRendering(1)
+    window.SetSize(16, 16)
+    window.AddRenderer(renderer)
+    tags = Instrumentation.ObserveRenderer(renderer, 'render/test')
+
+    window.Render()
+    assert Instrumentation.GetStatistics('render/test') is None
+
+    Instrumentation.Enable()
+    window.Render()
+    window.Render()
+    assert Instrumentation.GetStatistics('render/test')['count'] == 2
+
+    for tag in tags:
+        renderer.RemoveObserver(tag)
+    window.Render()
+    assert Instrumentation.GetStatistics('render/test')['count'] == 2
@@ -0,0 +1,325 @@
+import numpy as np
+import pytest
+import vtk
+
+from vtkEVS import IntensityAnnotateFactory
+
+
+def MakeFactory(image, **kw):
+    factory = IntensityAnnotateFactory.IntensityAnnotateFactory(**kw)
+    factory.SetInput(image)
+    return factory
+
+
+def test_probe_points_matches_reslice(make_image, reslice_at, random_points):
+    image, array = make_image(components=2)
+    points = random_points(image, 50, 0.0)
+
+    values = MakeFactory(image).ProbePoints(points)
+
+    assert values.shape == (50, 2)
+    assert np.array_equal(
+        values, reslice_at(image, points, vtk.VTK_RESLICE_NEAREST))
+
+
+def test_probe_points_with_transform_shift_and_scale(make_image,
+                                                     random_points):
+    image, array = make_image()
+    points = random_points(image, 50, 2.0)
+
+    transform = vtk.vtkTransform()
+    transform.Translate(0.5, -0.75, 1.25)
+
+    factory = MakeFactory(image)
+    expected = factory.ProbePoints(
+        [transform.TransformPoint(p) for p in points])
+
+    factory.SetTransform(transform)
+    factory.SetShift(10.0)
+    factory.SetScale(-2.0)
+    assert np.allclose(factory.ProbePoints(points), expected * -2.0 + 10.0)
+
+
+def test_probe_points_matches_point_of_interest(make_image, random_points):
+    image, array = make_image()
+    points = random_points(image, 10, 0.0)
+
+    factory = MakeFactory(image)
+    factory.SetShift(3.0)
+    factory.SetScale(0.5)
+    values = factory.ProbePoints(points)
+
+    for point, value in zip(points, values):
+        factory.SetPointOfInterest(tuple(point))
+        assert np.allclose(factory._Intensity, value)
+
+
+def test_probe_points_without_input():
+    factory = IntensityAnnotateFactory.IntensityAnnotateFactory()
+    assert factory.ProbePoints(np.zeros((4, 3))).shape == (4, 0)
+
+
+def test_probe_with_reslice_matches_array(make_image, random_points):
+    image, array = make_image(components=2)
+    points = random_points(image, 20, 0.0)
+
+    factory = MakeFactory(image)
+    values = [factory._ProbeWithReslice(*p) for p in points]
+    assert np.array_equal(values, factory.ProbePoints(points))
+
+
+def test_probe_falls_back_to_reslice(make_image, reslice_at, random_points,
+                                     monkeypatch):
+    image, array = make_image(components=2)
+    points = random_points(image, 20, 0.0)
+    expected = reslice_at(image, points, vtk.VTK_RESLICE_NEAREST)
+
+    # as for an input whose scalars aren't in memory
+    factory = MakeFactory(image)
+    monkeypatch.setattr(factory, '_GetInputArray', lambda: None)
+
+    assert np.array_equal(factory.ProbePoints(points), expected)
+    for point, value in zip(points, expected):
+        factory.SetPointOfInterest(tuple(point))
+        assert np.array_equal(factory._Intensity, value)
+
+
+def test_probe_oblique_input(make_image):
+    image, array = make_image()
+    transform = vtk.vtkTransform()
+    transform.RotateWXYZ(30.0, 1.0, 2.0, 3.0)
+    matrix = vtk.vtkMatrix3x3()
+    for i in range(3):
+        for j in range(3):
+            matrix.SetElement(i, j, transform.GetMatrix().GetElement(i, j))
+    image.SetDirectionMatrix(matrix)
+
+    # voxel centres are probed exactly
+    index = np.array([[1, 2, 3], [4, 5, 6], [10, 11, 8]])
+    direction = np.array([[matrix.GetElement(i, j) for j in range(3)]
+                          for i in range(3)])
+    points = np.array(image.GetOrigin()) + \
+        (index * image.GetSpacing()).dot(direction.T)
+    expected = array[index[:, 2], index[:, 1], index[:, 0]]
+
+    factory = MakeFactory(image)
+    assert np.array_equal(factory.ProbePoints(points), expected)
+    for point, value in zip(points, expected):
+        factory.SetPointOfInterest(tuple(point))
+        assert np.array_equal(factory._Intensity, value)
+
+    factory.SetInterpolationModeToLinear()
+    assert np.allclose(factory.ProbePoints(points), expected)
+
+
+@pytest.mark.parametrize('mode, margin', [
+    (vtk.VTK_RESLICE_LINEAR, 0.0),
+    (vtk.VTK_RESLICE_CUBIC, 1.0),
+])
+def test_interpolation_mode(make_image, reslice_at, random_points,
+                            mode, margin):
+    image, array = make_image()
+    points = random_points(image, 20, margin)
+    expected = reslice_at(image, points, mode)
+
+    factory = MakeFactory(image)
+    factory.SetInterpolationMode(mode)
+    assert factory.GetInterpolate()
+    assert np.allclose(factory.ProbePoints(points), expected,
+                       rtol=1e-4, atol=1e-2)
+    for point, value in zip(points, expected):
+        factory.SetPointOfInterest(tuple(point))
+        assert np.allclose(factory._Intensity, value, rtol=1e-4, atol=1e-2)
+
+
+def test_unknown_interpolation_mode_is_ignored(make_image):
+    image, array = make_image()
+    factory = MakeFactory(image)
+    factory.SetInterpolationModeToCubic()
+    factory.SetInterpolationMode(12)
+    assert factory.GetInterpolationMode() == vtk.VTK_RESLICE_CUBIC
+
+
+def test_probe_cache_hits_within_a_voxel(make_image):
+    image, array = make_image()
+    factory = MakeFactory(image)
+    centre = np.array(image.GetOrigin()) + \
+        np.array([3, 4, 5]) * image.GetSpacing()
+
+    factory.SetPointOfInterest(tuple(centre))
+    factory.SetPointOfInterest(tuple(centre + 0.1 * np.array(
+        image.GetSpacing())))
+    stats = factory.GetProbeCacheStatistics()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+    assert factory._Intensity == [array[5, 4, 3, 0]]
+
+
+def test_probe_cache_invalidation(make_image):
+    image, array = make_image()
+    factory = MakeFactory(image)
+    point = tuple(np.array(image.GetOrigin()) +
+                  np.array([3, 4, 5]) * image.GetSpacing())
+
+    factory.SetPointOfInterest(point)
+    assert factory._Intensity == [array[5, 4, 3, 0]]
+
+    # new scalars in the same image
+    view = factory._GetInputArray()
+    view[5, 4, 3, 0] = 42.0
+    image.Modified()
+    factory.SetPointOfInterest(point)
+    assert factory._Intensity == [42.0]
+
+    factory.SetShift(1.0)
+    factory.SetScale(2.0)
+    factory.SetPointOfInterest(point)
+    assert factory._Intensity == [85.0]
+
+    # a different input
+    other, otherArray = make_image(seed=3)
+    factory.SetInput(other)
+    factory.SetPointOfInterest(point)
+    assert factory._Intensity == [otherArray[5, 4, 3, 0] * 2.0 + 1.0]
+
+    assert factory.GetProbeCacheStatistics()['hits'] == 0
+
+
+def test_probe_cache_size(make_image, random_points):
+    image, array = make_image()
+    factory = MakeFactory(image)
+    factory.SetProbeCacheSize(4)
+    for point in random_points(image, 10, 0.0):
+        factory.SetPointOfInterest(tuple(point))
+    assert factory.GetProbeCacheStatistics()['entries'] <= 4
+
+    factory.SetProbeCacheSize(0)
+    assert factory.GetProbeCacheStatistics()['entries'] == 0
+
+
+@pytest.mark.parametrize('dimension', [2, 3])
+@pytest.mark.parametrize('shape, label, count', [
+    ((12, 14, 16), '3x3x3', 27),
+    ((1, 14, 16), '3x3', 9),
+])
+def test_neighbourhood_statistics(make_image, dimension, shape, label, count):
+    image, array = make_image(shape)
+    factory = MakeFactory(image, dimension=dimension)
+    factory.SetNeighbourhoodSize(2)
+    factory.SetShift(1.0)
+    factory.SetScale(-2.0)
+    assert factory.GetNeighbourhoodSize() == 3
+
+    k = min(shape[0] - 1, 5)
+    point = np.array(image.GetOrigin()) + \
+        np.array([3, 4, k]) * image.GetSpacing()
+    factory.SetPointOfInterest(tuple(point))
+
+    window = array[max(k - 1, 0):k + 2, 3:6, 2:5].reshape(-1) * -2.0 + 1.0
+    stats = factory.GetNeighbourhoodStatistics()
+    assert stats['count'] == count
+    assert np.allclose(stats['mean'], window.mean())
+    assert np.allclose(stats['std'], window.std(), rtol=1e-4)
+    assert np.allclose(stats['min'], window.min())
+    assert np.allclose(stats['max'], window.max())
+    assert '\n%s mean: ' % label in factory._Text
+
+
+def test_sample_line(make_image, reslice_at):
+    image, array = make_image(components=2)
+    p0 = np.array(image.GetOrigin()) + np.array([1, 2, 3]) * image.GetSpacing()
+    p1 = np.array(image.GetOrigin()) + np.array([9, 2, 3]) * image.GetSpacing()
+
+    factory = MakeFactory(image)
+    distances, values = factory.SampleLine(p0, p1, 9)
+
+    assert np.allclose(distances, np.arange(9) * image.GetSpacing()[0])
+    assert np.array_equal(values, array[3, 2, 1:10])
+
+
+def test_sample_polyline(make_image):
+    image, array = make_image()
+    spacing = np.array(image.GetSpacing())
+    vertices = np.array(image.GetOrigin()) + \
+        np.array([[1, 2, 3], [5, 2, 3], [5, 6, 3]]) * spacing
+
+    factory = MakeFactory(image)
+    distances, values = factory.SamplePolyline(vertices, spacing[0])
+
+    # 4 voxels along x, then 4 voxels of 1.5 steps along y
+    assert np.allclose(distances, np.arange(11) * spacing[0])
+    assert np.array_equal(values[:5, 0], array[3, 2, 1:6, 0])
+    assert values[-1, 0] == array[3, 6, 5, 0]
+
+
+@pytest.mark.parametrize('vertices', [np.zeros((0, 3)), [(1.0, 2.0, 3.0)]])
+def test_sample_polyline_without_segments(make_image, vertices):
+    image, array = make_image()
+    factory = MakeFactory(image)
+    distances, values = factory.SamplePolyline(vertices, 1.0)
+    assert len(distances) == len(values) == len(vertices)
+
+
+def test_probe_series(make_image, random_points):
+    image, array = make_image()
+    series = [make_image(seed=t)[0] for t in range(4)]
+    point = random_points(image, 1, 1.0)[0]
+
+    expected = []
+    for i in series:
+        factory = MakeFactory(i)
+        factory.SetInterpolationModeToLinear()
+        expected.append(factory.ProbePoints([point])[0, 0] * 2.0 + 1.0)
+
+    factory = MakeFactory(image)
+    factory.SetInterpolationModeToLinear()
+    factory.SetShift(1.0)
+    factory.SetScale(2.0)
+
+    # a list of images
+    factory.SetInputSeries(series)
+    assert np.allclose(factory.ProbeSeries(point)[:, 0], expected)
+
+    # a (t, z, y, x) array with the geometry of the input
+    factory.SetInputSeries(np.stack(
+        [i.GetPointData().GetScalars() for i in series]).reshape(
+            4, 12, 14, 16))
+    assert np.allclose(factory.ProbeSeries(point)[:, 0], expected)
+
+    # defaults to the point of interest
+    factory.SetPointOfInterest(tuple(point))
+    assert np.allclose(factory.ProbeSeries()[:, 0], expected)
+
+
+def test_probe_series_timepoint_not_in_memory(make_image):
+    series = [make_image(seed=t)[0] for t in range(3)]
+    series[1] = vtk.vtkImageData()
+
+    factory = MakeFactory(series[0])
+    factory.SetInputSeries(series)
+    values = factory.ProbeSeries(series[0].GetCenter())
+    assert values.shape == (3, 1)
+    assert np.isnan(values[1, 0]) and not np.isnan(values[[0, 2], 0]).any()
+
+
+def test_probe_series_without_series(make_image):
+    image, array = make_image()
+    factory = MakeFactory(image)
+    assert factory.ProbeSeries((0.0, 0.0, 0.0)).shape == (0, 0)
+
+
+def test_unchanged_text_is_not_modified(make_image):
+    image, array = make_image()
+    factory = MakeFactory(image)
+    point = tuple(np.array(image.GetOrigin()) +
+                  np.array([3, 4, 5]) * image.GetSpacing())
+
+    factory.SetPointOfInterest(point)
+    text = factory._Text
+    mtime = factory.GetMTime()
+    factory.SetPointOfInterest(point)
+    assert factory._Text == text
+    assert factory.GetMTime() == mtime
+
+    factory.SetMeasurementUnits('pixel')
+    factory.SetPointOfInterest(point)
+    assert '(3.0, 4.0, 5.0) (pixel)' in factory._Text
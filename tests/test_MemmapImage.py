@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+import vtk
+from vtk.util import numpy_support
+
+from vtkEVS import ImageProbe
+from vtkEVS import IntensityAnnotateFactory
+from vtkEVS import MemmapImage
+
+
+def MakeArray(shape=(20, 24, 28)):
+    rng = np.random.RandomState(0)
+    return rng.randint(0, 4096, shape).astype(np.uint16)
+
+
+def ToArray(image):
+    e = image.GetExtent()
+    shape = (e[5] - e[4] + 1, e[3] - e[2] + 1, e[1] - e[0] + 1)
+    return numpy_support.vtk_to_numpy(
+        image.GetPointData().GetScalars()).reshape(shape)
+
+
+@pytest.fixture
+def memmap(tmp_path):
+    array = MakeArray()
+    filename = str(tmp_path / 'volume.raw')
+    array.tofile(filename)
+    nz, ny, nx = array.shape
+    image = MemmapImage.MemmapImage(filename, (nx, ny, nz),
+                                    spacing=(0.5, 0.5, 2.0),
+                                    origin=(1.0, 2.0, 3.0),
+                                    dtype=np.uint16)
+    return image, array
+
+
+def test_geometry(memmap):
+    image, array = memmap
+    nz, ny, nx = array.shape
+    assert image.GetDimensions() == (nx, ny, nz)
+    assert image.GetExtent() == (0, nx - 1, 0, ny - 1, 0, nz - 1)
+    assert image.GetScalarType() == vtk.VTK_UNSIGNED_SHORT
+    assert image.GetBounds()[4:] == (3.0, 3.0 + 2.0 * (nz - 1))
+
+
+def test_sub_image(memmap):
+    image, array = memmap
+    sub = image.GetSubImage((2, 9, -5, 4, 7, 7))
+    assert sub.GetExtent() == (2, 9, 0, 4, 7, 7)
+    assert np.array_equal(ToArray(sub), array[7:8, 0:5, 2:10])
+    assert np.array_equal(ToArray(image.GetSliceImage(0, 3)),
+                          array[:, :, 3:4])
+
+
+def test_streams_update_extent(memmap):
+    image, array = memmap
+    extents = []
+    image.AddObserver(
+        'EndEvent',
+        lambda o, e: extents.append(o.GetOutputDataObject(0).GetExtent()))
+
+    reslice = vtk.vtkImageReslice()
+    reslice.SetInputConnection(image.GetOutputPort())
+    reslice.SetOutputDimensionality(2)
+    reslice.SetInterpolationModeToNearestNeighbor()
+    axes = vtk.vtkMatrix4x4()
+    axes.SetElement(2, 3, 3.0 + 2.0 * 11)
+    reslice.SetResliceAxes(axes)
+    reslice.Update()
+
+    # only the slab for slice 11 is read from the map
+    assert extents[-1][4:] == (11, 11)
+    assert np.array_equal(ToArray(reslice.GetOutput())[0], array[11])
+
+
+def test_probe_without_loading(memmap):
+    image, array = memmap
+    index = np.array([[3.0, 4.0, 5.0], [27.0, 23.0, 19.0]])
+    values = ImageProbe.sample(ImageProbe.get_scalar_array(image), index)
+    assert list(values[:, 0]) == [array[5, 4, 3], array[19, 23, 27]]
+
+
+def test_factory_probes_memmap(memmap):
+    image, array = memmap
+    factory = IntensityAnnotateFactory.IntensityAnnotateFactory()
+    factory.SetInput(image)
+
+    index = np.array([[3, 4, 5], [27, 23, 19]])
+    points = np.array(image.GetOrigin()) + index * image.GetSpacing()
+    expected = array[index[:, 2], index[:, 1], index[:, 0]]
+
+    assert list(factory.ProbePoints(points)[:, 0]) == list(expected)
+    for point, value in zip(points, expected):
+        factory.SetPointOfInterest(tuple(point))
+        assert factory._Intensity == [value]
+        # through the pipeline, as for volumes that aren't in memory
+        assert factory._ProbeWithReslice(*point) == [value]
+
+
+@pytest.mark.parametrize('mode', [vtk.VTK_IMAGE_SLAB_MAX,
+                                  vtk.VTK_IMAGE_SLAB_MIN,
+                                  vtk.VTK_IMAGE_SLAB_MEAN])
+def test_slab_reslice(memmap, mode):
+    image, array = memmap
+    first, last = 4, 9
+
+    reslice = vtk.vtkImageReslice()
+    reslice.SetInputConnection(image.GetOutputPort())
+    reslice.SetOutputDimensionality(2)
+    reslice.SetOutputScalarType(vtk.VTK_DOUBLE)
+    reslice.SetSlabMode(mode)
+    reslice.SetSlabNumberOfSlices(last - first + 1)
+    axes = vtk.vtkMatrix4x4()
+    axes.SetElement(2, 3, 3.0 + 2.0 * 0.5 * (first + last))
+    reslice.SetResliceAxes(axes)
+    reslice.Update()
+
+    expected = ImageProbe.slab_projection(
+        image.GetScalarArray(), 2, first, last, mode)[..., 0]
+    assert np.allclose(ToArray(reslice.GetOutput())[0], expected)
@@ -0,0 +1,61 @@
+import numpy as np
+import vtk
+
+from vtkEVS import MultiIntensityAnnotateFactory
+
+
+def MakeFactory(*inputs):
+    factory = MultiIntensityAnnotateFactory.MultiIntensityAnnotateFactory()
+    for input in inputs:
+        factory.AddInput(*input)
+    return factory
+
+
+def test_probe_volumes(make_image, random_points):
+    image1, array1 = make_image(seed=1)
+    image2, array2 = make_image(components=2, seed=2)
+    points = random_points(image1, 20, 0.0)
+    index = np.floor(
+        (points - image1.GetOrigin()) / image1.GetSpacing() + 0.5).astype(int)
+
+    factory = MakeFactory((image1, 'CT', -1000.0, 2.0),
+                          (image2, 'PET', 0.0, 0.5))
+    values = factory.ProbeVolumes(points)
+
+    assert np.allclose(
+        values[0], array1[index[:, 2], index[:, 1], index[:, 0]] * 2 - 1000)
+    assert np.allclose(
+        values[1], array2[index[:, 2], index[:, 1], index[:, 0]] * 0.5)
+    assert np.array_equal(factory.ProbePoints(points), values[0])
+
+
+def test_annotation(make_image):
+    image1, array1 = make_image(seed=1)
+    image2, array2 = make_image(seed=2)
+    point = np.array(image1.GetOrigin()) + \
+        np.array([3, 4, 5]) * image1.GetSpacing()
+
+    factory = MakeFactory((image1, 'CT'), (image2, 'PET'))
+    factory.SetShift(100.0)
+    factory.SetScale(2.0)
+    factory.SetInputShiftScale(1, 1.0, -1.0)
+    factory.SetPointOfInterest(tuple(point))
+
+    expected = [array1[5, 4, 3, 0] * 2.0 + 100.0, 1.0 - array2[5, 4, 3, 0]]
+    assert np.allclose(factory.GetIntensities(), [[v] for v in expected])
+    assert factory._Text.startswith(
+        'CT: %1.3f\nPET: %1.3f\n' % tuple(expected))
+
+
+def test_probe_volume_not_in_memory(make_image, reslice_at, random_points,
+                                    monkeypatch):
+    image1, array1 = make_image(seed=1)
+    image2, array2 = make_image(components=2, seed=2)
+    points = random_points(image1, 20, 0.0)
+
+    factory = MakeFactory((image1, 'CT'), (image2, 'PET', 5.0, 2.0))
+    monkeypatch.setattr(factory._Volumes[1], 'GetArray', lambda: None)
+
+    values = factory.ProbeVolumes(points)
+    assert np.array_equal(
+        values[1], reslice_at(image2, points, vtk.VTK_RESLICE_NEAREST) * 2 + 5)
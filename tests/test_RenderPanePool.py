@@ -0,0 +1,69 @@
+import vtk
+
+from vtkEVS import RenderPanePool
+
+
+class Pane(object):
+
+    """Stand-in for EVSRenderPane2D, recording Attach() and Detach()."""
+
+    created = 0
+
+    def __init__(self, parent, name=None, index=0):
+        Pane.created += 1
+        self._parent = parent
+        self._name = name
+        self._index = index
+        self._Renderer = vtk.vtkRenderer()
+        self.attached = True
+        self.tornDown = False
+
+    def GetName(self):
+        return self._name
+
+    def GetImageIndex(self):
+        return self._index
+
+    def Detach(self):
+        self.attached = False
+
+    def Attach(self, parent, viewport=None):
+        self._parent = parent
+        if viewport is not None:
+            self._Renderer.SetViewport(viewport)
+        self.attached = True
+
+    def tearDown(self):
+        self.tornDown = True
+
+
+def test_acquire_release_and_reacquire():
+    Pane.created = 0
+    pool = RenderPanePool.RenderPanePool(Pane)
+
+    axial = pool.Acquire('window1', (0.0, 0.0, 0.5, 1.0), name='axial',
+                         index=0)
+    coronal = pool.Acquire('window1', name='coronal', index=0)
+    assert Pane.created == 2
+    assert axial._Renderer.GetViewport() == (0.0, 0.0, 0.5, 1.0)
+
+    pool.Release(axial)
+    pool.Release(coronal)
+    assert not axial.attached and not coronal.attached
+    assert pool.GetNumberOfPanes() == 2
+
+    # the released pane with the same name and index is reused
+    pane = pool.Acquire('window2', (0.5, 0.0, 1.0, 1.0), name='axial',
+                        index=0)
+    assert pane is axial and pane.attached
+    assert pane._parent == 'window2'
+    assert pane._Renderer.GetViewport() == (0.5, 0.0, 1.0, 1.0)
+    assert pool.GetNumberOfPanes() == 1
+
+    # a different image index needs a new pane
+    other = pool.Acquire('window2', name='axial', index=1)
+    assert other is not axial and Pane.created == 3
+
+    pool.Clear()
+    assert coronal.tornDown and not axial.tornDown
+    assert pool.GetNumberOfPanes() == 0
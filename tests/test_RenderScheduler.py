@@ -0,0 +1,77 @@
+import pytest
+
+wx = pytest.importorskip('wx')
+
+from vtkEVS import RenderScheduler
+
+
+class Window(object):
+
+    def __init__(self):
+        self.renders = 0
+
+    def Render(self):
+        self.renders += 1
+
+
+class Renderer(object):
+
+    def __init__(self, window):
+        self._Window = window
+
+    def GetRenderWindow(self):
+        return self._Window
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    # without a wx.App, requests are rendered immediately
+    monkeypatch.setattr(wx, 'GetApp', lambda: None)
+    return RenderScheduler.RenderScheduler()
+
+
+def test_batch_renders_each_window_once(scheduler):
+    w1, w2 = Window(), Window()
+    calls = []
+
+    with scheduler.Batch():
+        for i in range(50):
+            scheduler.RequestRender(Renderer(w1))
+            scheduler.RequestRender(w2, lambda: calls.append(1))
+        assert w1.renders == 0
+
+    assert (w1.renders, w2.renders) == (1, 1)
+    assert len(calls) == 50
+    assert scheduler.GetStatistics() == {'requests': 100, 'renders': 2}
+
+
+def test_nested_batches_flush_at_the_end(scheduler):
+    window = Window()
+    with scheduler.Batch():
+        with scheduler.Batch():
+            scheduler.RequestRender(window)
+        assert window.renders == 0
+    assert window.renders == 1
+
+
+def test_factory_renders_all_of_its_windows(scheduler):
+    class Factory(object):
+        pass
+
+    w1, w2 = Window(), Window()
+    factory = Factory()
+    factory._Renderers = [Renderer(w1), Renderer(w2), Renderer(w1)]
+    scheduler.RequestRender(factory)
+    assert (w1.renders, w2.renders) == (1, 1)
+
+
+def test_failed_render_does_not_stop_others(scheduler):
+    class Broken(Window):
+        def Render(self):
+            raise RuntimeError()
+
+    window = Window()
+    with scheduler.Batch():
+        scheduler.RequestRender(Broken())
+        scheduler.RequestRender(window)
+    assert window.renders == 1
@@ -0,0 +1,29 @@
+import json
+
+import pytest
+
+from vtkEVS import ResliceBenchmark
+
+
+@pytest.mark.parametrize('interpolation', ['nearest', 'linear', 'cubic'])
+def test_interpolation(interpolation):
+    image = ResliceBenchmark.MakeVolume(8)
+    reslicer = ResliceBenchmark.MakeReslicer(image, 'oblique', interpolation)
+    assert reslicer.GetInterpolationMode() == \
+        ResliceBenchmark.INTERPOLATION_MODES[interpolation]
+    reslicer.Update()
+    assert reslicer.GetOutput().GetDimensions() == (8, 8, 1)
+
+
+def test_main(tmp_path, capsys):
+    filename = str(tmp_path / 'results.json')
+    assert ResliceBenchmark.main(
+        ['--sizes', '8', '--threads', '1', '2', '--slices', '2',
+         '--interpolation', 'nearest', '--json', filename]) == 0
+
+    with open(filename) as f:
+        results = json.load(f)
+    assert [(r['orientation'], r['threads']) for r in results] == [
+        ('axial', 1), ('axial', 2), ('oblique', 1), ('oblique', 2)]
+    assert results[0]['speedup'] == 1.0
+    assert len(capsys.readouterr().out.splitlines()) == 5
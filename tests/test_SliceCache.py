@@ -0,0 +1,199 @@
+import time
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+
+from vtkEVS import MemmapImage
+from vtkEVS import SliceCache
+
+
+def MakeArray(shape=(32, 64, 64)):
+    z, y, x = np.indices(shape)
+    return ((x + 2 * y + 3 * z) % 251 + 1).astype(np.uint8)
+
+
+def MakeReslicer(connection=None, data=None):
+    reslicer = vtk.vtkImageReslice()
+    if connection is not None:
+        reslicer.SetInputConnection(connection)
+    else:
+        reslicer.SetInputData(data)
+    reslicer.SetOutputDimensionality(2)
+    reslicer.SetResliceAxes(vtk.vtkMatrix4x4())
+    return reslicer
+
+
+def SetSlice(reslicer, z):
+    reslicer.GetResliceAxes().SetElement(2, 3, z)
+    reslicer.Modified()
+
+
+def GetArray(stage):
+    stage.Update()
+    image = stage.GetOutputDataObject(0)
+    return numpy_support.vtk_to_numpy(image.GetPointData().GetScalars())
+
+
+def WaitForEntries(cache, n, timeout=5.0):
+    end = time.time() + timeout
+    while len(cache) < n and time.time() < end:
+        time.sleep(0.01)
+    return len(cache)
+
+
+def test_cache_lru_and_budget():
+    image = vtk.vtkImageData()
+    image.SetDimensions(64, 64, 1)
+    image.AllocateScalars(vtk.VTK_UNSIGNED_CHAR, 1)
+    nbytes = image.GetActualMemorySize() * 1024
+
+    cache = SliceCache.SliceCache(size=2 * nbytes)
+    cache.Put('a', image)
+    cache.Put('b', image)
+    assert cache.Get('a') is image
+    cache.Put('c', image)
+
+    # 'b' was the least recently used
+    assert 'b' not in cache
+    assert 'a' in cache and 'c' in cache
+    assert cache.GetMemorySize() == 2 * nbytes
+
+    stats = cache.GetStatistics()
+    assert stats['hits'] == 1 and stats['misses'] == 0
+
+
+def test_stage_matches_reslicer():
+    array = MakeArray()
+    source = MemmapImage.MemmapImage(array=array)
+    reslicer = MakeReslicer(source.GetOutputPort())
+    stage = SliceCache.ResliceCacheStage(reslicer, SliceCache.SliceCache())
+
+    for z in (5, 12, 5):
+        SetSlice(reslicer, z)
+        assert np.array_equal(GetArray(stage), array[z].ravel())
+
+
+def test_streamed_revisits_hit():
+    array = MakeArray()
+    source = MemmapImage.MemmapImage(array=array)
+    reslicer = MakeReslicer(source.GetOutputPort())
+    cache = SliceCache.SliceCache()
+    stage = SliceCache.ResliceCacheStage(reslicer, cache)
+
+    for z in (10, 11, 10, 11):
+        SetSlice(reslicer, z)
+        assert np.array_equal(GetArray(stage), array[z].ravel())
+
+    stats = cache.GetStatistics()
+    assert stats['misses'] == 2
+    assert stats['hits'] == 2
+    assert stats['entries'] == 2
+
+
+def test_revisit_does_not_execute_reslicer():
+    array = MakeArray()
+    reslicer = MakeReslicer(data=MemmapImage.MemmapImage(
+        array=array).GetSubImage((0, 63, 0, 63, 0, 31)))
+    stage = SliceCache.ResliceCacheStage(reslicer, SliceCache.SliceCache())
+    extents = []
+    reslicer.AddObserver(
+        'EndEvent', lambda o, e: extents.append(o.GetOutput().GetExtent()))
+
+    SetSlice(reslicer, 3)
+    GetArray(stage)
+    SetSlice(reslicer, 4)
+    GetArray(stage)
+    SetSlice(reslicer, 3)
+    assert np.array_equal(GetArray(stage), array[3].ravel())
+
+    # on the hit, the reslicer was asked for an empty extent
+    assert extents[-1] == (0, -1, 0, -1, 0, -1)
+
+
+def test_upstream_change_invalidates():
+    source = vtk.vtkImageGaussianSource()
+    source.SetWholeExtent(0, 63, 0, 63, 0, 15)
+    source.SetCenter(32, 32, 8)
+    source.SetStandardDeviation(16)
+    source.SetMaximum(255)
+    shift = vtk.vtkImageShiftScale()
+    shift.SetInputConnection(source.GetOutputPort())
+    shift.SetOutputScalarTypeToFloat()
+    reslicer = MakeReslicer(shift.GetOutputPort())
+    stage = SliceCache.ResliceCacheStage(reslicer, SliceCache.SliceCache())
+    SetSlice(reslicer, 4)
+    before = GetArray(stage).mean()
+
+    # two filters upstream of the reslicer
+    source.SetMaximum(1000)
+    after = GetArray(stage).mean()
+
+    reslicer.Update()
+    expected = numpy_support.vtk_to_numpy(
+        reslicer.GetOutput().GetPointData().GetScalars()).mean()
+    assert after != before
+    assert after == expected
+
+
+def test_modified_input_data_invalidates():
+    array = MakeArray()
+    image = MemmapImage.MemmapImage(array=array).GetSubImage(
+        (0, 63, 0, 63, 0, 31))
+    reslicer = MakeReslicer(data=image)
+    cache = SliceCache.SliceCache()
+    stage = SliceCache.ResliceCacheStage(reslicer, cache)
+    SetSlice(reslicer, 7)
+    GetArray(stage)
+
+    scalars = numpy_support.vtk_to_numpy(
+        image.GetPointData().GetScalars())
+    scalars[:] = 0
+    image.Modified()
+
+    assert GetArray(stage).max() == 0
+    assert cache.GetStatistics()['entries'] == 1
+
+
+def test_prefetch_matches_reslicer():
+    array = MakeArray()
+    image = MemmapImage.MemmapImage(array=array).GetSubImage(
+        (0, 63, 0, 63, 0, 31))
+    reslicer = MakeReslicer(data=image)
+    cache = SliceCache.SliceCache()
+    stage = SliceCache.ResliceCacheStage(reslicer, cache)
+    prefetcher = SliceCache.SlicePrefetcher(cache)
+
+    try:
+        SetSlice(reslicer, 10)
+        GetArray(stage)
+        prefetcher.Prefetch(reslicer, 0, [1, 2])
+        assert WaitForEntries(cache, 3) == 3
+    finally:
+        prefetcher.Stop()
+
+    cache.ResetStatistics()
+    for z in (11, 12):
+        SetSlice(reslicer, z)
+        assert np.array_equal(GetArray(stage), array[z].ravel())
+    assert cache.GetStatistics()['hits'] == 2
+
+
+def test_prefetch_skips_streamed_input():
+    array = MakeArray()
+    source = MemmapImage.MemmapImage(array=array)
+    reslicer = MakeReslicer(source.GetOutputPort())
+    cache = SliceCache.SliceCache()
+    stage = SliceCache.ResliceCacheStage(reslicer, cache)
+    prefetcher = SliceCache.SlicePrefetcher(cache)
+
+    try:
+        SetSlice(reslicer, 10)
+        GetArray(stage)
+        prefetcher.Prefetch(reslicer, 0, [1, 2])
+        time.sleep(0.1)
+    finally:
+        prefetcher.Stop()
+
+    assert len(cache) == 1
+    SetSlice(reslicer, 12)
+    assert np.array_equal(GetArray(stage), array[12].ravel())
@@ -0,0 +1,186 @@
+import numpy as np
+import pytest
+import vtk
+from vtk.util import numpy_support
+
+wx = pytest.importorskip('wx')
+
+from vtkEVS import SliceCache
+from vtkEVS import SliceStackExporter
+
+
+class Plane(object):
+
+    """Stand-in for the EVSSlicePlaneFactory of a pane."""
+
+    def __init__(self, reslicer, actor, renderer):
+        self._Reslicer = reslicer
+        self._Transform = vtk.vtkTransform()
+        self._ActorDict = {renderer: [actor]}
+
+    def GetImageReslicers(self):
+        return {0: self._Reslicer}
+
+    def GetNormal(self):
+        return (0.0, 0.0, 1.0)
+
+    def GetTransform(self):
+        return self._Transform
+
+
+class Pane(object):
+
+    """Stand-in for an EVSRenderPane2D that shows an axial slice."""
+
+    def __init__(self, image, index, cache=False):
+        self._Image = image
+
+        self._Reslicer = vtk.vtkImageReslice()
+        self._Reslicer.SetInputData(image)
+        self._Reslicer.SetOutputDimensionality(2)
+        self._Reslicer.SetResliceAxes(vtk.vtkMatrix4x4())
+
+        table = vtk.vtkLookupTable()
+        table.SetRange(-100, 100)
+        table.SetSaturationRange(0, 0)
+        table.SetValueRange(0, 1)
+        table.Build()
+        colors = vtk.vtkImageMapToColors()
+        colors.SetLookupTable(table)
+        if cache:
+            self._Stage = SliceCache.ResliceCacheStage(
+                self._Reslicer, SliceCache.SliceCache(), 0)
+            colors.SetInputConnection(self._Stage.GetOutputPort())
+        else:
+            colors.SetInputConnection(self._Reslicer.GetOutputPort())
+        actor = vtk.vtkImageActor()
+        actor.GetMapper().SetInputConnection(colors.GetOutputPort())
+
+        self._Renderer = vtk.vtkRenderer()
+        self._Renderer.AddViewProp(actor)
+        self._Window = vtk.vtkRenderWindow()
+        self._Window.SetOffScreenRendering(1)
+        self._Window.SetSize(64, 48)
+        self._Window.AddRenderer(self._Renderer)
+        self._Renders = 0
+        self._Renderer.AddObserver('StartEvent', self._OnRender)
+
+        self._Plane = Plane(self._Reslicer, actor, self._Renderer)
+        self.SetSliceIndex(index)
+        camera = self._Renderer.GetActiveCamera()
+        camera.ParallelProjectionOn()
+        self._Renderer.ResetCamera(image.GetBounds())
+
+    def _OnRender(self, renderer, event):
+        self._Renders += 1
+
+    def SetSliceIndex(self, index):
+        self._Index = index
+        self._Reslicer.GetResliceAxes().SetElement(
+            2, 3, self._Image.GetOrigin()[2] +
+            index * self._Image.GetSpacing()[2])
+        self._Reslicer.Modified()
+
+    def GetSliceIndex(self):
+        return self._Index
+
+    def GetSliceGeometry(self):
+        return (self._Image.GetSpacing(), self._Image.GetOrigin(),
+                self._Image.GetExtent(), 2, 1)
+
+
+def ReadImage(filename):
+    reader = vtk.vtkPNGReader()
+    reader.SetFileName(filename)
+    reader.Update()
+    image = reader.GetOutput()
+    width, height, _ = image.GetDimensions()
+    return numpy_support.vtk_to_numpy(
+        image.GetPointData().GetScalars()).reshape(height, width, -1)
+
+
+def Export(pane, filename, *args, **kw):
+    results = []
+    exporter = SliceStackExporter.SliceStackExporter(
+        pane, filename, *args, **kw)
+    exporter.Start(results.append)
+    assert not exporter.IsRunning()
+    assert exporter.GetProgress() == 1.0
+    return results[0]
+
+
+@pytest.fixture(autouse=True)
+def no_app(monkeypatch):
+    # without a wx.App, the export runs to completion in Start()
+    monkeypatch.setattr(wx, 'GetApp', lambda: None)
+
+
+@pytest.mark.parametrize('cache', [False, True])
+def test_export_leaves_the_pane_alone(make_image, tmp_path, cache):
+    image, array = make_image()
+    pane = Pane(image, 5, cache)
+    axes = [pane._Reslicer.GetResliceAxes().GetElement(i, 3)
+            for i in range(3)]
+
+    filenames = Export(pane, str(tmp_path / 'slice.png'), 3, 7,
+                       processes=1)
+
+    assert filenames == [str(tmp_path / 'slice_{:04d}.png'.format(i))
+                         for i in range(3, 8)]
+    assert pane._Renders == 0
+    assert pane.GetSliceIndex() == 5
+    assert [pane._Reslicer.GetResliceAxes().GetElement(i, 3)
+            for i in range(3)] == axes
+
+    frames = [ReadImage(f) for f in filenames]
+    assert frames[0].shape == (48, 64, 3)
+    # the lookup table of the pane is used, and each slice is different
+    assert np.array_equal(frames[2][..., 0], frames[2][..., 1])
+    assert len(set(f.tobytes() for f in frames)) == 5
+
+    # and looks as it does in the pane
+    pane.SetSliceIndex(7)
+    capture = vtk.vtkWindowToImageFilter()
+    capture.SetInput(pane._Window)
+    capture.SetInputBufferTypeToRGB()
+    capture.ReadFrontBufferOff()
+    capture.Update()
+    shown = numpy_support.vtk_to_numpy(
+        capture.GetOutput().GetPointData().GetScalars())
+    assert np.array_equal(frames[4].reshape(-1, 3), shown)
+
+
+def test_export_matches_the_displayed_slice(make_image, tmp_path):
+    image, array = make_image()
+    pane = Pane(image, 5)
+    filenames = Export(pane, str(tmp_path / 'stack%02d.png'), 8, 2, -3,
+                       magnification=2, processes=2)
+    assert filenames == [str(tmp_path / 'stack{:02d}.png'.format(i))
+                         for i in (8, 5, 2)]
+
+    for index, filename in zip((8, 5, 2), filenames):
+        pane.SetSliceIndex(index)
+        single = Export(pane, str(tmp_path / 'single.png'), magnification=2)
+        assert single == [str(tmp_path / 'single.png')]
+
+        frame = ReadImage(filename)
+        assert frame.shape == (96, 128, 3)
+        assert np.array_equal(frame, ReadImage(single[0]))
+
+
+def test_unsupported_file_type(make_image, tmp_path):
+    image, array = make_image()
+    with pytest.raises(ValueError):
+        SliceStackExporter.SliceStackExporter(
+            Pane(image, 5), str(tmp_path / 'slice.jpg'))
+
+
+def test_export_tiff(make_image, tmp_path):
+    image, array = make_image()
+    filenames = Export(Pane(image, 5), str(tmp_path / 'slice.tiff'), 4, 5)
+
+    reader = vtk.vtkTIFFReader()
+    for filename in filenames:
+        reader.SetFileName(filename)
+        reader.Update()
+        assert reader.GetOutput().GetDimensions() == (64, 48, 1)
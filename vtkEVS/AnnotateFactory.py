@@ -42,6 +42,7 @@ from __future__ import division
 
 from past.utils import old_div
 from vtkAtamai import ActorFactory
+from . import Instrumentation
 import vtk
 from zope import component
 
@@ -129,7 +130,9 @@ class AnnotateFactory(ActorFactory.ActorFactory):
             renderer: a VTK renderer
         """
         ActorFactory.ActorFactory.AddToRenderer(self, renderer)
-        renderer.AddObserver('StartEvent', self.OnRenderEvent)
+        renderer.AddObserver('StartEvent', Instrumentation.Instrumented(
+            'factory/' + Instrumentation.GetCallbackName(self.OnRenderEvent),
+            self.OnRenderEvent))
 
     def AddObserver(self, event, callback):
         return self._TextActor.AddObserver(event, callback)
@@ -137,10 +140,16 @@ class AnnotateFactory(ActorFactory.ActorFactory):
     def SetText(self, text=" "):
         """Specify the text to be displayed by this actor
 
+        Unchanged text is ignored, so that the actor isn't marked as modified
+        and re-rendered for nothing.
+
         Args:
             text (str): The text to display
 
         """
+        if text == self._Text:
+            return
+
         self.Modified()
         self._Text = text
         self._TextMapper.SetInput(self._Text)
@@ -190,6 +190,31 @@ class EVSOrthoPlanesFactory(OrthoPlanesFactory.OrthoPlanesFactory):
             except:
                 logger.exception("EVSOrthoPlanesFactory")
 
+    def SetNumberOfThreads(self, n):
+        """Set the number of threads used by the reslicers of all planes."""
+        for plane in self._Planes:
+            plane.SetNumberOfThreads(n)
+
+    def GetNumberOfThreads(self):
+        return self._Planes[0].GetNumberOfThreads()
+
+    def SetSplitMode(self, mode):
+        """Set the thread split mode of the reslicers of all planes."""
+        for plane in self._Planes:
+            plane.SetSplitMode(mode)
+
+    def SetSplitModeToSlab(self):
+        self.SetSplitMode(EVSSlicePlaneFactory.EVSSlicePlaneFactory.SPLIT_SLAB)
+
+    def SetSplitModeToBeam(self):
+        self.SetSplitMode(EVSSlicePlaneFactory.EVSSlicePlaneFactory.SPLIT_BEAM)
+
+    def SetSplitModeToBlock(self):
+        self.SetSplitMode(EVSSlicePlaneFactory.EVSSlicePlaneFactory.SPLIT_BLOCK)
+
+    def GetSplitMode(self):
+        return self._Planes[0].GetSplitMode()
+
     def GetIntersections(self):
         return self._Intersections
 
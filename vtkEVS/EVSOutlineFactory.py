@@ -40,6 +40,7 @@
 #
 
 from vtkAtamai import OutlineFactory
+from . import RenderScheduler
 
 
 class EVSOutlineFactory(OutlineFactory.OutlineFactory):
@@ -61,4 +62,4 @@ class EVSOutlineFactory(OutlineFactory.OutlineFactory):
         """Toggle the current opacity of the outline."""
         self._Property.SetOpacity(1 - self.GetOpacity())
         self.Modified()
-        self.Render()
+        RenderScheduler.RequestRender(self)
@@ -52,8 +52,12 @@ See Also:
 """
 from __future__ import print_function
 
+import collections
 import logging
+import math
 import os
+import time
+import numpy as np
 import vtk
 import wx
 from vtkAtamai import RenderPane2D, RenderPane
@@ -65,8 +69,90 @@ from PI.visualization.MicroView import LayoutMenuManager
 
 from zope import component, event
 
+from . import EVSFileDialog
+from . import Instrumentation
+from . import RenderPanePool
+from . import RenderScheduler
+from . import SliceStackExporter
+
 logger = logging.getLogger(__name__)
 
+# cursors shared by all panes, see _GetCursors()
+_Cursors = None
+
+
+def _GetCursors():
+    """Return the dictionary of pane cursors, loading them on first use.
+
+    The default cursors are overridden by any Cursors/<action>.gif images
+    found on disk.  The images are only read once per process.
+
+    """
+    global _Cursors
+
+    if _Cursors is not None:
+        return _Cursors
+
+    # create some default cursors
+    if 'phoenix' in wx.version():
+        _func = wx.Cursor
+    else:
+        _func = wx.StockCursor
+
+    cursors = {'winlev': _func(wx.CURSOR_ARROW),
+               'rotate': _func(wx.CURSOR_ARROW),
+               'zoom': _func(wx.CURSOR_MAGNIFIER),
+               'pan': _func(wx.CURSOR_HAND),
+               'slice': _func(wx.CURSOR_ARROW),
+               'spin': _func(wx.CURSOR_ARROW),
+               }
+    # override some of the default with cursor if we find them on disk
+    for action in ('pan', 'winlev', 'zoom', 'slice', 'spin'):
+        filename = os.path.join('Cursors', '%s.gif' % action)
+        if os.path.exists(filename):
+            try:
+                image = wx.Image(filename)
+                if 'phoenix' in wx.version():
+                    image.SetOption(wx.IMAGE_OPTION_CUR_HOTSPOT_X, 1)
+                    image.SetOption(wx.IMAGE_OPTION_CUR_HOTSPOT_Y, 1)
+                    cursors[action] = wx.Cursor(image)
+                else:
+                    image.SetOptionInt(wx.IMAGE_OPTION_CUR_HOTSPOT_X, 1)
+                    image.SetOptionInt(wx.IMAGE_OPTION_CUR_HOTSPOT_Y, 1)
+                    cursors[action] = wx.CursorFromImage(image)
+            except:
+                logger.exception("EVSRenderPane2D")
+
+    _Cursors = cursors
+    return _Cursors
+
+
+# vtkAtamai has no API to remove a pane from its window: a RenderPane adds
+# itself to the _RenderPanes list of its parent when it is created, and the
+# window routes events to the panes in that list, and to the ones held in
+# its _CurrentRenderPane and _FocusRenderPane attributes.  Detach() and
+# Attach() therefore depend on these private attributes of the vtkAtamai
+# window classes, and must be revisited if they change.
+
+def _ConnectPane(parent, pane):
+    """Add pane to the panes that parent routes events to."""
+
+    if pane not in parent._RenderPanes:
+        parent._RenderPanes.append(pane)
+
+
+def _DisconnectPane(parent, pane):
+    """Stop parent from routing events to pane."""
+
+    if pane in parent._RenderPanes:
+        parent._RenderPanes.remove(pane)
+
+    # the pane may be the one that has the focus, or holds a drag
+    if parent._CurrentRenderPane is pane:
+        parent._CurrentRenderPane = None
+    if parent._FocusRenderPane is pane:
+        parent._FocusRenderPane = None
+
 
 class EVSRenderPane2D(RenderPane2D.RenderPane2D):
 
@@ -88,6 +174,9 @@ class EVSRenderPane2D(RenderPane2D.RenderPane2D):
         # event object
         self._eventObject = vtk.vtkObject()
 
+        # see Detach() and Attach()
+        self._Attached = True
+
         # OrthoPlaneFactory -- we need to set the orthocenter
         self.__orthoPlanes = None
 
@@ -96,39 +185,73 @@ class EVSRenderPane2D(RenderPane2D.RenderPane2D):
         # the Button 1 action binding
         self._B1Action = 'pan'
 
-        # create some default cursors
-        if 'phoenix' in wx.version():
-            _func = wx.Cursor
-        else:
-            _func = wx.StockCursor
-
         # keep track of whether mouse moved during right click events
         self._right_click_x = None
         self._right_click_y = None
 
-        self._cursors = {'winlev': _func(wx.CURSOR_ARROW),
-                         'rotate': _func(wx.CURSOR_ARROW),
-                         'zoom': _func(wx.CURSOR_MAGNIFIER),
-                         'pan': _func(wx.CURSOR_HAND),
-                         'slice': _func(wx.CURSOR_ARROW),
-                         'spin': _func(wx.CURSOR_ARROW),
-                         }
-        # override some of the default with cursor if we find them on disk
-        for action in ('pan', 'winlev', 'zoom', 'slice', 'spin'):
-            filename = os.path.join('Cursors', '%s.gif' % action)
-            if os.path.exists(filename):
-                try:
-                    image = wx.Image(filename)
-                    if 'phoenix' in wx.version():
-                        image.SetOption(wx.IMAGE_OPTION_CUR_HOTSPOT_X, 1)
-                        image.SetOption(wx.IMAGE_OPTION_CUR_HOTSPOT_Y, 1)
-                        self._cursors[action] = wx.Cursor(image)
-                    else:
-                        image.SetOptionInt(wx.IMAGE_OPTION_CUR_HOTSPOT_X, 1)
-                        image.SetOptionInt(wx.IMAGE_OPTION_CUR_HOTSPOT_Y, 1)
-                        self._cursors[action] = wx.CursorFromImage(image)
-                except:
-                    logger.exception("EVSRenderPane2D")
+        # motion events find the cursor position by intersecting the camera
+        # ray with the slice plane, rather than by picking every actor
+        self._UseAnalyticCursorPosition = True
+        self._DisplayToWorldKey = None
+        self._DisplayToWorldMatrix = None
+
+        # cached image geometry - see GetSliceGeometry()
+        self._SliceGeometryKey = None
+        self._SliceGeometry = None
+
+        # keyboard pushes are accumulated and applied once per frame
+        self._PushInterval = 1.0 / 60.0
+        self._PendingSlices = 0
+        self._PushTimer = None
+        self._LastPushTime = 0.0
+
+        # cine playback - see StartCine()
+        self._CineTimer = None
+        self._CineFPS = 0.0
+        self._CineStep = 1
+        self._CineLoop = True
+        self._CineStartTime = 0.0
+        self._CineFrames = 0
+        self._CineShownFrames = 0
+        self._CineDroppedFrames = 0
+
+        # motion event coalescing - see SetCoalesceMotionEvents()
+        self._CoalesceMotionEvents = False
+        self._MotionEventInterval = 1.0 / 60.0
+        self._PendingMotionEvent = None
+        self._MotionEventTimer = None
+        self._LastMotionEventTime = 0.0
+        self._DroppedMotionEvents = 0
+
+        # reduced resolution during interaction - see
+        # SetProgressiveRendering()
+        self._ProgressiveRendering = False
+        self._TargetFrameTime = 1.0 / 30.0
+        self._MaxDownSampleFactor = 8
+        self._ProgressiveFactor = 1
+        self._RefineDelay = 0.25
+        self._RefineTimer = None
+        self._Interacting = False
+        self._Dragging = False
+        self._FullFrameTime = 0.0
+        self._RenderStartTime = None
+        self._RenderObservers = []
+
+        # render timing, recorded when instrumentation is enabled
+        self._InstrumentationObservers = Instrumentation.ObserveRenderer(
+            self._Renderer, 'render/{}'.format(self._pane_name))
+
+        # linked panes - see LinkPane()
+        self._LinkedPanes = collections.OrderedDict()
+        self._LinkCameraObserver = None
+        self._LinkSyncing = False
+        self._LinkSyncScheduled = False
+        self._PendingLinkCamera = False
+        self._PendingLinkDistance = 0.0
+        self._LinkPushResidual = 0.0
+
+        # the cursors are shared by all panes
+        self._cursors = dict(_GetCursors())
 
         # ---------------------------------------------------------------------
         # Set up some zope event handlers
@@ -147,7 +270,78 @@ class EVSRenderPane2D(RenderPane2D.RenderPane2D):
     def SetTrackedSlicePlaneIndex(self, idx):
         self._tracked_sliceplane_index = idx
 
+    def _StopTimers(self):
+        """Stop cine playback and drop any pending motion events or pushes."""
+
+        self.StopCine()
+        for timer in (self._MotionEventTimer, self._PushTimer,
+                      self._RefineTimer):
+            if timer is not None:
+                timer.Stop()
+        self._MotionEventTimer = None
+        self._PushTimer = None
+        self._RefineTimer = None
+        self._PendingMotionEvent = None
+        self._PendingSlices = 0
+
+    def Detach(self):
+        """Remove the pane from its window, keeping it for later reuse.
+
+        The pane keeps its renderer, actor factories and camera, so that it
+        can be shown again with Attach() without being rebuilt.  The window
+        no longer routes events to the pane.
+
+        """
+        if not self._Attached:
+            return
+
+        self._StopTimers()
+        _DisconnectPane(self._parent, self)
+
+        renwin = self._Renderer.GetRenderWindow()
+        if renwin is not None:
+            renwin.RemoveRenderer(self._Renderer)
+
+        # a detached pane mustn't respond to menu requests
+        gsm = component.getGlobalSiteManager()
+        gsm.unregisterHandler(self.ShowContextSensitiveMenu)
+
+        # the parent is kept, so that an event that was already queued for
+        # the pane can still set the cursor
+        self._Attached = False
+        self._DisplayToWorldKey = None
+
+    def Attach(self, parent, viewport=None):
+        """Show a pane that was removed with Detach() in a window.
+
+        Args:
+            parent: the render window widget to show the pane in
+            viewport (tuple): optional (xmin, ymin, xmax, ymax) viewport
+
+        """
+        if self._Attached:
+            self.Detach()
+
+        self._parent = parent
+        if viewport is not None:
+            self._Renderer.SetViewport(viewport)
+        parent.GetRenderWindow().AddRenderer(self._Renderer)
+        _ConnectPane(parent, self)
+
+        component.provideHandler(self.ShowContextSensitiveMenu)
+        self._Attached = True
+
+    def IsAttached(self):
+        return self._Attached
+
     def tearDown(self):
+        self._StopTimers()
+        self.UnlinkAllPanes()
+        self.SetProgressiveRendering(False)
+        for tag in self._InstrumentationObservers:
+            self._Renderer.RemoveObserver(tag)
+        self._InstrumentationObservers = []
+
         try:
             super(EVSRenderPane2D, self).tearDown()
 
@@ -177,6 +371,31 @@ class EVSRenderPane2D(RenderPane2D.RenderPane2D):
     def AddObserver(self, evt, command):
         self._eventObject.AddObserver(evt, command)
 
+    def BindEvent(self, event, method):
+        """Bind an event handler, timing it when instrumentation is enabled."""
+
+        if method is not None:
+            name = Instrumentation.GetCallbackName(method)
+            if '-Motion' in event:
+                method = self._WrapDragMotion(method)
+            method = Instrumentation.Instrumented('event/' + name, method)
+        super(EVSRenderPane2D, self).BindEvent(event, method)
+
+    def _WrapDragMotion(self, method):
+        """Return a drag motion handler that first resumes interaction.
+
+        A drag that is held still is refined to full resolution after a
+        moment, so reduced resolution rendering has to be restarted when
+        the drag moves again.
+
+        """
+        def DragMotion(evt):
+            if self._Dragging:
+                self._BeginInteraction()
+            return method(evt)
+
+        return DragMotion
+
     def BindDefaultInteraction(self):
         super(EVSRenderPane2D, self).BindDefaultInteraction()
         self.BindPanToButton(1)
@@ -230,6 +449,97 @@ class EVSRenderPane2D(RenderPane2D.RenderPane2D):
                     return info.position
         return None
 
+    def SetUseAnalyticCursorPosition(self, yesno):
+        """Choose how mouse motion events find the cursor position
+
+        Args:
+            yesno (bool): if True, intersect the camera ray under the cursor
+                with the slice plane.  If False, pick (see GetCursorPosition)
+
+        """
+        self._UseAnalyticCursorPosition = bool(yesno)
+
+    def GetUseAnalyticCursorPosition(self):
+        return self._UseAnalyticCursorPosition
+
+    def GetCursorPositionOnPlane(self, evt):
+        """Return cursor position on the slice plane, without picking.
+
+        The camera ray under the cursor is intersected with the current slice
+        plane.  The result is in the same coordinates as GetCursorPosition(),
+        and is None if the cursor isn't over the image.
+
+        """
+
+        if self._Plane is None:
+            return None
+
+        matrix = self._GetDisplayToWorldMatrix()
+        if matrix is None:
+            return None
+
+        # display to view coordinates, same convention as DoSmartPick
+        x0, y0 = self._Renderer.GetOrigin()
+        w, h = self._Renderer.GetSize()
+        vx = 2.0 * (evt.x - x0) / w - 1.0
+        vy = 2.0 * (evt.y - y0) / h - 1.0
+
+        # the ray from the near to the far clipping plane, in world coords
+        near = matrix.dot((vx, vy, -1.0, 1.0))
+        far = matrix.dot((vx, vy, 1.0, 1.0))
+        near = near[:3] / near[3]
+        far = far[:3] / far[3]
+
+        transform = self._Plane.GetTransform()
+        origin = np.array(transform.TransformPoint(self._Plane.GetOrigin()))
+        normal = np.array(self._Plane.GetTransformedNormal())
+
+        direction = far - near
+        denom = normal.dot(direction)
+        if denom == 0.0:
+            return None
+
+        world = near + direction * (normal.dot(origin - near) / denom)
+        position = transform.GetInverse().TransformPoint(*world)
+
+        # picking only hits the plane where it shows the image, use the
+        # whole extent, since a streamed input only holds the last slab read
+        spacing, image_origin, extent, axis, sign = self.GetSliceGeometry()
+        for i in range(3):
+            lo = image_origin[i] + extent[2 * i] * spacing[i]
+            hi = image_origin[i] + extent[2 * i + 1] * spacing[i]
+            tol = 0.5 * abs(spacing[i])
+            if position[i] < min(lo, hi) - tol or \
+                    position[i] > max(lo, hi) + tol:
+                return None
+
+        return position
+
+    def _GetDisplayToWorldMatrix(self):
+        """Return the view-to-world matrix of the camera as a NumPy array.
+
+        The matrix is recomputed only when the camera or the renderer
+        geometry has changed since the last call.
+
+        """
+        renderer = self._Renderer
+        w, h = renderer.GetSize()
+        if w == 0 or h == 0:
+            return None
+
+        camera = renderer.GetActiveCamera()
+        aspect = renderer.GetTiledAspectRatio()
+        key = (camera.GetMTime(), w, h, renderer.GetOrigin(), aspect)
+
+        if key != self._DisplayToWorldKey:
+            m = camera.GetCompositeProjectionTransformMatrix(aspect, -1, 1)
+            m = np.array([[m.GetElement(i, j) for j in range(4)]
+                          for i in range(4)])
+            self._DisplayToWorldMatrix = np.linalg.inv(m)
+            self._DisplayToWorldKey = key
+
+        return self._DisplayToWorldMatrix
+
     def DoStartMotion(self, evt):
 
         if evt.num == 1:
@@ -251,6 +561,9 @@ class EVSRenderPane2D(RenderPane2D.RenderPane2D):
         if evt.num in (1, 2):
             self._parent.SetCursor(curs)
 
+        self._Dragging = True
+        self._BeginInteraction()
+
         RenderPane.RenderPane.DoStartMotion(self, evt)
 
     @component.adapter(ShowContextSensitiveMenuCommand)
@@ -295,8 +608,14 @@ class EVSRenderPane2D(RenderPane2D.RenderPane2D):
         self._parent.SetCursor(curs)
         RenderPane.RenderPane.DoEndMotion(self, evt)
 
+        self._Dragging = False
+        self._EndInteraction()
+
     def DoStartAction(self, evt):
 
+        self._Dragging = True
+        self._BeginInteraction()
+
         super(EVSRenderPane2D, self).DoStartAction(evt)
         self._parent.SetCursor(self._cursors['slice'])
 
@@ -305,6 +624,122 @@ class EVSRenderPane2D(RenderPane2D.RenderPane2D):
         super(EVSRenderPane2D, self).DoEndAction(evt)
         self._parent.SetCursor(wx.StockCursor(wx.CURSOR_ARROW))
 
+        self._Dragging = False
+        self._EndInteraction()
+
+    def SetProgressiveRendering(self, yesno, fps=30.0, max_factor=8):
+        """Render the slice at reduced resolution while interacting.
+
+        During drags (pan, zoom, window/level, actions) and slice scrolling
+        the slice plane is resliced with a downsample factor, chosen from
+        the measured frame time so that the pane keeps up with fps.  A
+        full resolution pass is rendered when the interaction ends, or
+        after it has been idle for a moment.
+
+        Args:
+            yesno (bool): enable or disable progressive rendering
+            fps (float): the frame rate to aim for during interaction
+            max_factor (int): the largest downsample factor to use
+
+        """
+        self._TargetFrameTime = 1.0 / fps
+        self._MaxDownSampleFactor = max(1, int(max_factor))
+
+        if bool(yesno) == self._ProgressiveRendering:
+            return
+        self._ProgressiveRendering = bool(yesno)
+
+        for tag in self._RenderObservers:
+            self._Renderer.RemoveObserver(tag)
+        self._RenderObservers = []
+
+        if self._ProgressiveRendering:
+            self._RenderObservers = [
+                self._Renderer.AddObserver('StartEvent', self._OnRenderStart),
+                self._Renderer.AddObserver('EndEvent', self._OnRenderEnd)]
+        else:
+            self._EndInteraction()
+
+    def GetProgressiveRendering(self):
+        return self._ProgressiveRendering
+
+    def GetProgressiveFactor(self):
+        """Return the downsample factor used for interactive frames."""
+        return self._ProgressiveFactor
+
+    def _BeginInteraction(self):
+        """Switch to reduced resolution, and restart the idle timer."""
+
+        if not self._ProgressiveRendering or self._Plane is None:
+            return
+
+        if not self._Interacting:
+            self._Interacting = True
+
+            # start from the factor that would meet the target frame time
+            if self._FullFrameTime > 0:
+                factor = int(math.ceil(math.sqrt(
+                    self._FullFrameTime / self._TargetFrameTime)))
+                self._ProgressiveFactor = min(max(factor, 1),
+                                              self._MaxDownSampleFactor)
+            self._Plane.SetDownSampleFactor(self._ProgressiveFactor)
+
+        self._RestartRefineTimer()
+
+    def _RestartRefineTimer(self):
+        if self._RefineTimer is not None:
+            self._RefineTimer.Stop()
+        self._RefineTimer = wx.CallLater(
+            int(self._RefineDelay * 1000), self._OnRefineTimer)
+
+    def _OnRefineTimer(self):
+        self._RefineTimer = None
+        self._EndInteraction()
+
+    def _EndInteraction(self):
+        """Return to full resolution and render the refinement pass."""
+
+        if self._RefineTimer is not None:
+            self._RefineTimer.Stop()
+            self._RefineTimer = None
+
+        if not self._Interacting:
+            return
+
+        self._Interacting = False
+        if self._Plane is not None:
+            self._Plane.SetDownSampleFactor(1)
+            RenderScheduler.RequestRender(self._Renderer)
+
+    def _OnRenderStart(self, obj, evt):
+        self._RenderStartTime = time.perf_counter()
+
+    def _OnRenderEnd(self, obj, evt):
+        if self._RenderStartTime is None:
+            return
+
+        elapsed = time.perf_counter() - self._RenderStartTime
+        self._RenderStartTime = None
+
+        if not self._Interacting:
+            if self._Plane is not None and \
+                    self._Plane.GetDownSampleFactor() == 1:
+                self._FullFrameTime = elapsed
+            return
+
+        # the render time scales roughly with the number of pixels, i.e.
+        # with the square of the downsample factor
+        ratio = elapsed / self._TargetFrameTime
+        factor = self._ProgressiveFactor
+        if ratio > 1.5 or (ratio < 0.5 and factor > 1):
+            factor = int(round(factor * math.sqrt(ratio)))
+            factor = min(max(factor, 1), self._MaxDownSampleFactor)
+            if factor != self._ProgressiveFactor:
+                self._ProgressiveFactor = factor
+                self._Plane.SetDownSampleFactor(factor)
+
+        self._RestartRefineTimer()
+
     def DoPickActor(self, evt):
 
         super(EVSRenderPane2D, self).DoPickActor(evt)
@@ -346,53 +781,368 @@ class EVSRenderPane2D(RenderPane2D.RenderPane2D):
     def SetPlaneIntersections(self, planeintersections):
         self._PlaneIntersections = planeintersections
 
+    def GetSliceGeometry(self):
+        """Return the geometry of the image shown on the slice plane.
+
+        The geometry is read from the pipeline information of the producer of
+        the plane's input, rather than from its output, which only covers the
+        last update extent of a streamed input such as a MemmapImage.  It is
+        cached, and only re-read when the producer or the plane normal has
+        changed.
+
+        Returns:
+            tuple: (spacing, origin, extent, axis, sign) where axis is the
+            index of the image axis the plane is stepped along, and sign is the
+            direction of an increment along that axis
+
+        """
+        producer = self._Plane.GetInputConnection().GetProducer()
+        Normal = tuple(self._Plane.GetNormal())
+        key = (producer, producer.GetMTime(), Normal)
+
+        if key != self._SliceGeometryKey:
+            producer.UpdateInformation()
+            info = producer.GetOutputInformation(0)
+
+            if ((Normal[0] == 0) and (Normal[1] == 0)):
+                axis, sign = 2, 1
+            elif ((Normal[0] == 0) and (Normal[2] == 0)):
+                axis, sign = 1, -1
+            else:
+                axis, sign = 0, 1
+
+            self._SliceGeometry = (
+                info.Get(vtk.vtkDataObject.SPACING()),
+                info.Get(vtk.vtkDataObject.ORIGIN()),
+                info.Get(vtk.vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT()),
+                axis, sign)
+            self._SliceGeometryKey = key
+
+        return self._SliceGeometry
+
     def DecrementPush(self, evt, factor=1):
+        self.PushSlices(-factor)
 
-        alg = self._Plane.GetInputConnection()
-        producer = alg.GetProducer()
-        producer.UpdateInformation()
-        image_data = producer.GetOutputDataObject(0)
+    def IncrementPush(self, evt, factor=1):
+        self.PushSlices(factor)
 
-        spacing = image_data.GetSpacing()
+    def PushSlices(self, n):
+        """Move the slice plane by n slices.
 
-        Normal = self._Plane.GetNormal()
-        UseSpacing = self._Plane.GetUseSpacing()
-        self._Plane.SetUseSpacing(True)
+        Pushes that arrive within one display frame of each other, e.g. from
+        an auto-repeating key, are accumulated and applied as a single push
+        and render.
+
+        Args:
+            n (int): number of slices to move, negative to move backwards
+
+        """
+        self._PendingSlices += n
+        self._BeginInteraction()
+
+        if self._PushTimer is not None:
+            # a push is already scheduled for this frame
+            return
 
-        if ((Normal[0] == 0) and (Normal[1] == 0)):
-            distance = -spacing[2] * factor
-        elif ((Normal[0] == 0) and (Normal[2] == 0)):
-            distance = spacing[1] * factor
+        wait = self._PushInterval - \
+            (time.perf_counter() - self._LastPushTime)
+        if wait <= 0:
+            self._FlushPush()
         else:
-            distance = -spacing[0] * factor
-        self._Plane.Push(distance)
+            self._PushTimer = wx.CallLater(
+                max(1, int(wait * 1000)), self._FlushPush)
 
-        self._Plane.SetUseSpacing(UseSpacing)
-        self._Plane.Render(self._Renderer)
+    def _FlushPush(self):
+        """Apply all accumulated slice pushes and render once."""
 
-    def IncrementPush(self, evt, factor=1):
+        self._PushTimer = None
+        n = self._PendingSlices
+        self._PendingSlices = 0
+
+        if n == 0 or not hasattr(self, '_eventObject'):
+            return
 
-        alg = self._Plane.GetInputConnection()
-        producer = alg.GetProducer()
-        producer.UpdateInformation()
-        image_data = producer.GetOutputDataObject(0)
+        self._LastPushTime = time.perf_counter()
 
-        spacing = image_data.GetSpacing()
+        distance = self._PushPlane(n)
+
+        if self._LinkedPanes:
+            self._PendingLinkDistance += distance
+            self._ScheduleLinkSync()
+
+        # start reslicing the next slices once this one is on screen
+        RenderScheduler.RequestRender(
+            self._Renderer, self._Plane.PrefetchSlices)
+
+    def _PushPlane(self, n):
+        """Move the slice plane by n slices, without rendering.
+
+        Returns:
+            float: the distance the plane was pushed
+
+        """
+        spacing, origin, extent, axis, sign = self.GetSliceGeometry()
+        distance = sign * self._Plane.GetSliceSpacing() * n
 
-        Normal = self._Plane.GetNormal()
         UseSpacing = self._Plane.GetUseSpacing()
         self._Plane.SetUseSpacing(True)
+        self._Plane.Push(distance)
+        self._Plane.SetUseSpacing(UseSpacing)
+
+        return distance
+
+    def SetSliceIndex(self, index):
+        """Move the slice plane to a slice index, without rendering.
+
+        Observers of the plane, such as the other panes that show it, are
+        notified as for any other push.
+
+        """
+
+        spacing, origin, extent, axis, sign = self.GetSliceGeometry()
+        direction = int(math.copysign(1, sign * self._Plane.GetNormal()[axis]))
+        n = (index - self.GetSliceIndex()) * direction
+        if n:
+            self._PushPlane(n)
+
+    def LinkPane(self, pane, camera=True, slices=True):
+        """Link the view of another pane to this one, in both directions.
+
+        Zooming or panning either pane is copied to the other, and so are
+        slice pushes, as a distance so that volumes with different spacing
+        stay at the same position.  Linked panes are updated at most once
+        per frame of the pane being interacted with.
+
+        Args:
+            pane (EVSRenderPane2D): the pane to link
+            camera (bool): link the parallel scale and focal point
+            slices (bool): link slice pushes
+
+        """
+        if pane is self:
+            return
+
+        self._LinkedPanes[pane] = (camera, slices)
+        pane._LinkedPanes[self] = (camera, slices)
+        self._ObserveLinkCamera()
+        pane._ObserveLinkCamera()
+
+    def UnlinkPane(self, pane):
+        self._LinkedPanes.pop(pane, None)
+        pane._LinkedPanes.pop(self, None)
+        self._ObserveLinkCamera()
+        pane._ObserveLinkCamera()
+
+    def UnlinkAllPanes(self):
+        for pane in list(self._LinkedPanes):
+            self.UnlinkPane(pane)
+
+    def GetLinkedPanes(self):
+        return list(self._LinkedPanes)
 
-        if ((Normal[0] == 0) and (Normal[1] == 0)):
-            distance = spacing[2] * factor
-        elif ((Normal[0] == 0) and (Normal[2] == 0)):
-            distance = -spacing[1] * factor
+    def _ObserveLinkCamera(self):
+        """Observe the camera if, and only if, a camera link exists."""
+
+        if self._LinkCameraObserver is not None:
+            camera, tag = self._LinkCameraObserver
+            camera.RemoveObserver(tag)
+            self._LinkCameraObserver = None
+
+        if any(camera for camera, slices in self._LinkedPanes.values()):
+            camera = self._Renderer.GetActiveCamera()
+            self._LinkCameraObserver = (camera, camera.AddObserver(
+                'ModifiedEvent', self._OnLinkCameraModified))
+
+    def _OnLinkCameraModified(self, obj, evt):
+        # ignore changes made by a linked pane, to avoid feedback
+        if self._LinkSyncing:
+            return
+
+        self._PendingLinkCamera = True
+        self._ScheduleLinkSync()
+
+    def _ScheduleLinkSync(self):
+        if self._LinkSyncScheduled:
+            return
+
+        self._LinkSyncScheduled = True
+        if wx.GetApp() is None:
+            self._SyncLinkedPanes()
         else:
-            distance = spacing[0] * factor
-        self._Plane.Push(distance)
+            wx.CallAfter(self._SyncLinkedPanes)
 
-        self._Plane.SetUseSpacing(UseSpacing)
-        self._Plane.Render(self._Renderer)
+    def _SyncLinkedPanes(self):
+        """Copy all camera and slice changes since the last sync to linked panes."""
+
+        self._LinkSyncScheduled = False
+        camera = self._PendingLinkCamera
+        distance = self._PendingLinkDistance
+        self._PendingLinkCamera = False
+        self._PendingLinkDistance = 0.0
+
+        if not hasattr(self, '_eventObject'):
+            return
+
+        source = self._Renderer.GetActiveCamera()
+
+        for pane, (link_camera, link_slice) in list(self._LinkedPanes.items()):
+            # changes made here must not be passed on again, neither by the
+            # pane's camera observer nor by observers of its plane
+            pane._LinkSyncing = True
+            try:
+                if camera and link_camera:
+                    pane._FollowCamera(source)
+                if distance and link_slice:
+                    pane._FollowPush(distance)
+            except Exception:
+                logger.exception("EVSRenderPane2D: linked pane update failed")
+            finally:
+                pane._LinkSyncing = False
+
+            RenderScheduler.RequestRender(pane._Renderer)
+
+    def _FollowCamera(self, source):
+        """Match the zoom and in-plane focal point of another camera."""
+
+        camera = self._Renderer.GetActiveCamera()
+        camera.SetParallelScale(source.GetParallelScale())
+
+        # move within the view plane only, so that the depth is unchanged
+        focal = np.array(camera.GetFocalPoint())
+        position = np.array(camera.GetPosition())
+        direction = np.array(camera.GetDirectionOfProjection())
+        delta = np.array(source.GetFocalPoint()) - focal
+        delta -= np.dot(delta, direction) * direction
+
+        camera.SetFocalPoint(focal + delta)
+        camera.SetPosition(position + delta)
+
+    def _FollowPush(self, distance):
+        """Push the plane by distance, carrying over any snapping error."""
+
+        spacing, origin, extent, axis, sign = self.GetSliceGeometry()
+
+        target = distance + self._LinkPushResidual
+        position = self._Plane.GetSlicePosition()
+        self._Plane.Push(target)
+        moved = self._Plane.GetSlicePosition() - position
+
+        # a residual larger than a slice means the plane hit the end
+        self._LinkPushResidual = target - moved
+        if abs(self._LinkPushResidual) >= spacing[axis]:
+            self._LinkPushResidual = 0.0
+
+    def GetSliceIndex(self):
+        """Return the index of the displayed slice along the stepping axis."""
+
+        spacing, origin, extent, axis, sign = self.GetSliceGeometry()
+
+        # the plane counts slices along its normal, which may point in the
+        # negative direction of the axis
+        if self._Plane.GetNormal()[axis] < 0:
+            return -self._Plane.GetSliceIndex()
+        return self._Plane.GetSliceIndex()
+
+    def StartCine(self, fps=20.0, step=1, loop=True):
+        """Start stepping through the slices at a fixed frame rate.
+
+        Slices are pushed through the same path as IncrementPush().  When
+        rendering can't keep up, frames are skipped rather than queued, so
+        that playback speed stays at the requested rate.
+
+        Args:
+            fps (float): target frame rate
+            step (int): slices to advance per frame, negative to play backwards
+            loop (bool): wrap around at the end of the volume, otherwise stop
+
+        """
+        self.StopCine()
+
+        self._CineFPS = float(fps)
+        self._CineStep = int(step)
+        self._CineLoop = loop
+        self._CineStartTime = time.perf_counter()
+        self._CineFrames = 0
+        self._CineShownFrames = 0
+        self._CineDroppedFrames = 0
+
+        self._CineTimer = wx.CallLater(
+            max(1, int(1000.0 / self._CineFPS)), self._OnCineTimer)
+
+    def StopCine(self):
+        if self._CineTimer is not None:
+            self._CineTimer.Stop()
+            self._CineTimer = None
+
+    def IsCineRunning(self):
+        return self._CineTimer is not None
+
+    def GetCineStatistics(self):
+        """Return cine playback statistics
+
+        Returns:
+            dict: 'target_fps', 'achieved_fps', 'frames' shown and 'dropped'
+            frames since StartCine() was called
+
+        """
+        elapsed = time.perf_counter() - self._CineStartTime
+        achieved = 0.0
+        if elapsed > 0 and self._CineShownFrames:
+            achieved = self._CineShownFrames / elapsed
+
+        return {'target_fps': self._CineFPS,
+                'achieved_fps': achieved,
+                'frames': self._CineShownFrames,
+                'dropped': self._CineDroppedFrames}
+
+    def _OnCineTimer(self):
+
+        self._CineTimer = None
+        if not hasattr(self, '_eventObject'):
+            return
+
+        # the frame that should be on screen now
+        now = time.perf_counter()
+        frame = int((now - self._CineStartTime) * self._CineFPS)
+        n = frame - self._CineFrames
+
+        if n > 0:
+            self._CineDroppedFrames += n - 1
+            self._CineFrames = frame
+            if not self._StepCine(n * self._CineStep):
+                return
+            self._CineShownFrames += 1
+
+        # schedule the next frame relative to the start time, not to now
+        wait = (frame + 1) / self._CineFPS - \
+            (time.perf_counter() - self._CineStartTime)
+        self._CineTimer = wx.CallLater(
+            max(1, int(wait * 1000)), self._OnCineTimer)
+
+    def _StepCine(self, n):
+        """Push n slices for cine playback, wrapping or stopping at the end.
+
+        Returns:
+            bool: False if playback has reached the end and stopped
+
+        """
+        spacing, origin, extent, axis, sign = self.GetSliceGeometry()
+        lo, hi = extent[2 * axis], extent[2 * axis + 1]
+
+        # direction of an increment, in slice index units
+        direction = int(math.copysign(1, sign * self._Plane.GetNormal()[axis]))
+
+        index = self.GetSliceIndex()
+        target = index + direction * n
+
+        if target < lo or target > hi:
+            if not self._CineLoop:
+                self.StopCine()
+                return False
+            target = lo + (target - lo) % (hi - lo + 1)
+
+        self.PushSlices((target - index) * direction)
+        return True
 
     def PriorDecrementPush(self, evt):
         self.DecrementPush(evt, 10)
@@ -401,47 +1151,130 @@ class EVSRenderPane2D(RenderPane2D.RenderPane2D):
         self.IncrementPush(evt, 10)
 
     def HomeDecrementPush(self, evt):
-
-        alg = self._Plane.GetInputConnection()
-        producer = alg.GetProducer()
-        producer.UpdateInformation()
-        image_data = producer.GetOutputDataObject(0)
-
-        Normal = self._Plane.GetNormal()
-        extent = image_data.GetExtent()
-        if ((Normal[0] == 0) and (Normal[1] == 0)):
-            self.DecrementPush(evt, extent[5])
-        elif ((Normal[0] == 0) and (Normal[2] == 0)):
-            self.DecrementPush(evt, extent[3])
-        else:
-            self.DecrementPush(evt, extent[1])
+        spacing, origin, extent, axis, sign = self.GetSliceGeometry()
+        self.DecrementPush(evt, extent[2 * axis + 1])
 
     def EndIncrementPush(self, evt):
-
-        alg = self._Plane.GetInputConnection()
-        producer = alg.GetProducer()
-        producer.UpdateInformation()
-        image_data = producer.GetOutputDataObject(0)
-
-        Normal = self._Plane.GetNormal()
-        extent = image_data.GetExtent()
-        if ((Normal[0] == 0) and (Normal[1] == 0)):
-            self.IncrementPush(evt, extent[5])
-        elif ((Normal[0] == 0) and (Normal[2] == 0)):
-            self.IncrementPush(evt, extent[3])
-        else:
-            self.IncrementPush(evt, extent[1])
+        spacing, origin, extent, axis, sign = self.GetSliceGeometry()
+        self.IncrementPush(evt, extent[2 * axis + 1])
 
     # Save the scene in the selected view port
     def SavePlaneAsImage(self, evt):
-        print("to be implement in application")
+        """Prompt for a file name and save the displayed plane as an image."""
+
+        filetypes = collections.OrderedDict()
+        filetypes['PNG'] = ['.png']
+        filetypes['TIFF'] = ['.tif', '.tiff']
+
+        filename = EVSFileDialog.asksaveasfilename(
+            message='Save plane as image', filetypes=filetypes)
+        if not filename:
+            return
+
+        if not os.path.splitext(filename)[1]:
+            filename += '.png'
+
+        try:
+            self.ExportSlices(filename)
+        except ValueError as e:
+            logger.error("SavePlaneAsImage: {}".format(e))
+
+    def ExportSlices(self, filename, first=None, last=None, step=1,
+                     magnification=1, callback=None):
+        """Write a range of slices along the plane to a PNG or TIFF stack.
+
+        The slices are rendered offscreen, with private copies of the
+        plane's reslicers and of the camera, and the images are encoded in
+        a pool of worker processes.  The plane isn't moved and the pane
+        isn't rendered, so the pane can be used during the export.  See
+        SliceStackExporter for how the file names are formed.
+
+        Args:
+            filename (str): a .png or .tif file name
+            first (int): first slice index, defaults to the displayed slice
+            last (int): last slice index, defaults to first
+            step (int): export every step'th slice
+            magnification (int): scale factor for the images
+            callback: called with the list of files written when done
+
+        Returns:
+            SliceStackExporter: the running export, which can be cancelled
+
+        """
+        exporter = SliceStackExporter.SliceStackExporter(
+            self, filename, first, last, step, magnification)
+        exporter.Start(callback)
+        return exporter
 
     def SetPaneName(self, PaneName):
         self.PaneName = PaneName
 
+    def SetCoalesceMotionEvents(self, yesno, fps=60.0):
+        """Turn motion event coalescing on or off
+
+        When on, MouseMoveEvent observers are called at most once per display
+        frame, with the most recent cursor position only.  Motion events that
+        arrive in between are dropped.
+
+        Args:
+            yesno (bool): coalesce motion events
+            fps (float): maximum rate at which MouseMoveEvent is invoked
+
+        """
+        self._CoalesceMotionEvents = bool(yesno)
+        self._MotionEventInterval = 1.0 / fps
+
+    def GetCoalesceMotionEvents(self):
+        return self._CoalesceMotionEvents
+
+    def GetDroppedMotionEventCount(self):
+        """Return the number of motion events dropped by coalescing."""
+        return self._DroppedMotionEvents
+
+    def ResetDroppedMotionEventCount(self):
+        self._DroppedMotionEvents = 0
+
     def OnMouseMove(self, evt):
 
-        position = self.GetCursorPosition(evt)
+        if not self._CoalesceMotionEvents:
+            self._DispatchMouseMove(evt)
+            return
+
+        if self._PendingMotionEvent is not None:
+            self._DroppedMotionEvents += 1
+        self._PendingMotionEvent = evt
+
+        if self._MotionEventTimer is not None:
+            # a dispatch is already scheduled for this frame
+            return
+
+        wait = self._MotionEventInterval - \
+            (time.perf_counter() - self._LastMotionEventTime)
+        if wait <= 0:
+            self._FlushMouseMove()
+        else:
+            self._MotionEventTimer = wx.CallLater(
+                max(1, int(wait * 1000)), self._FlushMouseMove)
+
+    def _FlushMouseMove(self):
+        """Dispatch the most recent pending motion event, if any."""
+
+        self._MotionEventTimer = None
+        evt = self._PendingMotionEvent
+        self._PendingMotionEvent = None
+
+        if evt is None or not hasattr(self, '_eventObject'):
+            return
+
+        self._LastMotionEventTime = time.perf_counter()
+        self._DispatchMouseMove(evt)
+
+    def _DispatchMouseMove(self, evt):
+
+        if self._UseAnalyticCursorPosition and self._Plane is not None:
+            position = self.GetCursorPositionOnPlane(evt)
+        else:
+            position = self.GetCursorPosition(evt)
         self._eventObject.position = position
         self._eventObject.evt = evt
         self._eventObject.InvokeEvent('MouseMoveEvent')
@@ -454,3 +1287,18 @@ class EVSRenderPane2D(RenderPane2D.RenderPane2D):
         be careful with the reference count.
         """
         return self.__orthoPlanes
+
+
+class EVSRenderPane2DPool(RenderPanePool.RenderPanePool):
+
+    """A pool of detached EVSRenderPane2D panes, for reuse across layouts.
+
+    When the layout changes, panes that are no longer shown are passed to
+    Release() instead of being torn down.  Acquire() re-attaches a released
+    pane with the same name and image index, along with its actor factories,
+    and only creates a new pane when there is none to reuse.
+
+    """
+
+    def __init__(self):
+        RenderPanePool.RenderPanePool.__init__(self, EVSRenderPane2D)
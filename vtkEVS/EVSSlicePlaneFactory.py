@@ -42,7 +42,11 @@ from __future__ import division
 
 from past.utils import old_div
 import logging
+import math
+import vtk
 from vtkAtamai import SlicePlaneFactory
+from . import ImageProbe
+from . import SliceCache
 
 logger = logging.getLogger(__name__)
 
@@ -51,14 +55,43 @@ class EVSSlicePlaneFactory(SlicePlaneFactory.SlicePlaneFactory):
 
     """Extends the basic functionality of the Atamai SlicePlaneFactory class."""
 
+    # split modes of vtkThreadedImageAlgorithm, see SetSplitMode()
+    SPLIT_SLAB = 0
+    SPLIT_BEAM = 1
+    SPLIT_BLOCK = 2
+
     def __init__(self):
         SlicePlaneFactory.SlicePlaneFactory.__init__(self)
 
         self.__UseSpacing = False
         self._PlaneIntersections = None
         self._sampleFactor = 1.0
+        self._BaseOutputExtents = {}
+
+        # cached input spacing and origin, see _GetInputGeometry()
+        self._InputGeometryKey = None
+        self._InputGeometry = None
+
+        # thick slab projection - see SetSlabThickness()
+        self._SlabThickness = 0.0
+        self._SlabMode = vtk.VTK_IMAGE_SLAB_MAX
+
+        # reslicer threading, None leaves the VTK default
+        self._NumberOfThreads = None
+        self._SplitMode = None
+
+        # cache of resliced images, and the stages that serve them
+        self._SliceCache = SliceCache.SliceCache()
+        self._SliceCacheStages = {}
+        self._SlicePrefetcher = SliceCache.SlicePrefetcher(self._SliceCache)
+        self._PrefetchCount = 4
 
     def tearDown(self):
+        self._SlicePrefetcher.Stop()
+        for stage in self._SliceCacheStages.values():
+            stage.RemoveAllInputConnections(0)
+        self._SliceCacheStages = {}
+        self._SliceCache.Clear()
         SlicePlaneFactory.SlicePlaneFactory.tearDown(self)
         self.RemoveAllEventHandlers()
         self.RemoveAllObservers()
@@ -68,18 +101,29 @@ class EVSSlicePlaneFactory(SlicePlaneFactory.SlicePlaneFactory):
 
         For Texture downsampling.  Set to > 1 to downsample textures and conserve memory
 
-        TODO: is this still needed?
+        The factor is applied to the full resolution output extent, so it
+        can be changed repeatedly, e.g. during interaction, without the
+        extent shrinking further each time.
 
         """
-        self._sampleFactor = v
+        if v == self._sampleFactor:
+            return
+
         for name in self._ImageReslicers:
             rs = self._ImageReslicers[name]
             spacing = rs.GetInput().GetSpacing()
-            e = list(rs.GetOutputExtent())
+            if self._sampleFactor == 1 or name not in self._BaseOutputExtents:
+                self._BaseOutputExtents[name] = rs.GetOutputExtent()
+            e = list(self._BaseOutputExtents[name])
             for i in [1, 3, 5]:
                 e[i] = int(old_div(e[i], float(v)))
             rs.SetOutputSpacing(spacing[0] * v, spacing[1] * v, spacing[2] * v)
             rs.SetOutputExtent(e)
+        self._sampleFactor = v
+
+        # the slab slice spacing is relative to the output spacing
+        if self._SlabThickness > 0:
+            self._UpdateSlab()
 
     def GetDownSampleFactor(self):
         return self._sampleFactor
@@ -87,6 +131,22 @@ class EVSSlicePlaneFactory(SlicePlaneFactory.SlicePlaneFactory):
     def SetPlaneIntersections(self, planeintersections):
         self._PlaneIntersections = planeintersections
 
+    def _GetInputGeometry(self):
+        """Return the (spacing, origin) of the input to the first reslicer.
+
+        The values are cached, and only re-read when the input has changed.
+
+        """
+        input = self._ImageReslicers[0].GetInput()
+        key = (input, input.GetMTime())
+
+        if key != self._InputGeometryKey:
+            self._ImageReslicers[0].UpdateInformation()
+            self._InputGeometry = (input.GetSpacing(), input.GetOrigin())
+            self._InputGeometryKey = key
+
+        return self._InputGeometry
+
     def ToggleUseSpacing(self):
         self.SetUseSpacing(not self.GetUseSpacing())
 
@@ -104,23 +164,9 @@ class EVSSlicePlaneFactory(SlicePlaneFactory.SlicePlaneFactory):
         if UseSpacing is False:
             self.__UseSpacing = False
         else:
-            input = self._ImageReslicers[0].GetInput()
-            # input.UpdateInformation()  # VTK-6 figure out what to do with
-            # this
-            spacing = input.GetSpacing()
-            origin = input.GetOrigin()
-
-            SlicePosition = self.GetSlicePosition()
-            Normal = self.GetNormal()
-            if ((Normal[0] == 0) and (Normal[1] == 0)):
-                diff = (round(old_div((SlicePosition - origin[2]), spacing[2])) -
-                        (old_div((SlicePosition - origin[2]), spacing[2]))) * spacing[2]
-            elif ((Normal[0] == 0) and (Normal[2] == 0)):
-                diff = ((old_div((SlicePosition - origin[1]), spacing[1])) -
-                        round(old_div((SlicePosition - origin[1]), spacing[1]))) * spacing[1]
-            else:
-                diff = (round(old_div((SlicePosition - origin[0]), spacing[0])) -
-                        (old_div((SlicePosition - origin[0]), spacing[0]))) * spacing[0]
+            # move the plane onto the nearest slice
+            index = self._GetExactSliceIndex()
+            diff = (round(index) - index) * self.GetSliceSpacing()
 
             self.Push(diff)
             self.__UseSpacing = True
@@ -128,6 +174,44 @@ class EVSSlicePlaneFactory(SlicePlaneFactory.SlicePlaneFactory):
     def GetUseSpacing(self):
         return self.__UseSpacing
 
+    def GetSliceSpacing(self):
+        """Return the distance between slices along the plane normal.
+
+        For an oblique normal n this is the effective spacing
+        |n| / sqrt(sum((n_i / s_i)**2)) of the input voxel grid.
+
+        """
+        spacing, origin = self._GetInputGeometry()
+        normal = self.GetNormal()
+
+        length = math.sqrt(sum(n * n for n in normal))
+        return old_div(length, math.sqrt(
+            sum(old_div(n, s) ** 2 for n, s in zip(normal, spacing))))
+
+    def _GetExactSliceIndex(self):
+        """Return the position of the plane in units of the slice spacing."""
+
+        spacing, origin = self._GetInputGeometry()
+        normal = self.GetNormal()
+        position = self.GetOrigin()
+
+        length = math.sqrt(sum(n * n for n in normal))
+        distance = old_div(
+            sum((p - o) * n for p, o, n in zip(position, origin, normal)),
+            length)
+        return old_div(distance, self.GetSliceSpacing())
+
+    def GetSliceIndex(self):
+        """Return the integer index of the slice, counted along the normal.
+
+        The index is the same for every orientation, oblique or not, and
+        doesn't drift with repeated pushes, so it can be used as a key by
+        slice caches and cine tools.  Slice 0 passes through the input
+        origin.
+
+        """
+        return int(round(self._GetExactSliceIndex()))
+
     def Push(self, distance):
         """Move the selected slice plane a given distance"""
 
@@ -136,25 +220,316 @@ class EVSSlicePlaneFactory(SlicePlaneFactory.SlicePlaneFactory):
             return
 
         if self.__UseSpacing is True:
-            input = self._ImageReslicers[0].GetInput()
-            self._ImageReslicers[0].UpdateInformation()
-            # input.UpdateInformation()  # TODO: VTK-6 fix required here
-            spacing = input.GetSpacing()
-
-            Normal = self.GetNormal()
-            if ((Normal[0] == 0) and (Normal[1] == 0)):
-                SpacingDistance = round(
-                    old_div(distance, spacing[2])) * spacing[2]
-            elif ((Normal[0] == 0) and (Normal[2] == 0)):
-                SpacingDistance = round(
-                    old_div(distance, spacing[1])) * spacing[1]
-            else:
-                SpacingDistance = round(
-                    old_div(distance, spacing[0])) * spacing[0]
+            # snap to the slice nearest the target, so that rounding errors
+            # don't accumulate over many pushes
+            step = self.GetSliceSpacing()
+            index = self._GetExactSliceIndex()
+            target = round(index + old_div(distance, step))
+            SpacingDistance = (target - index) * step
+
+            if SpacingDistance == 0.0:
+                return
         else:
             SpacingDistance = distance
 
-        return SlicePlaneFactory.SlicePlaneFactory.Push(self, distance)
+        return SlicePlaneFactory.SlicePlaneFactory.Push(self, SpacingDistance)
 
     def GetImageReslicers(self):
         return self._ImageReslicers
+
+    def SetSlabThickness(self, thickness):
+        """Set the thickness of the displayed slab, in world units.
+
+        The slices within the slab, centred on the plane and spaced by
+        GetSliceSpacing(), are combined according to the slab mode by
+        vtkImageReslice in a single pass.  Set to 0 to show a single slice.
+
+        """
+        thickness = max(0.0, float(thickness))
+        if thickness == self._SlabThickness:
+            return
+        self._SlabThickness = thickness
+        self._UpdateSlab()
+
+    def GetSlabThickness(self):
+        return self._SlabThickness
+
+    def SetSlabMode(self, mode):
+        """Set how the slab is projected, e.g. vtk.VTK_IMAGE_SLAB_MAX."""
+
+        if mode not in (vtk.VTK_IMAGE_SLAB_MIN, vtk.VTK_IMAGE_SLAB_MAX,
+                        vtk.VTK_IMAGE_SLAB_MEAN, vtk.VTK_IMAGE_SLAB_SUM):
+            logger.error("SetSlabMode: invalid mode {}".format(mode))
+            return
+        self._SlabMode = mode
+        self._UpdateSlab()
+
+    def SetSlabModeToMax(self):
+        self.SetSlabMode(vtk.VTK_IMAGE_SLAB_MAX)
+
+    def SetSlabModeToMin(self):
+        self.SetSlabMode(vtk.VTK_IMAGE_SLAB_MIN)
+
+    def SetSlabModeToMean(self):
+        self.SetSlabMode(vtk.VTK_IMAGE_SLAB_MEAN)
+
+    def GetSlabMode(self):
+        return self._SlabMode
+
+    def GetSlabNumberOfSlices(self):
+        """Return the number of slices in the slab, at the input spacing."""
+        if self._SlabThickness <= 0:
+            return 1
+        return max(1, int(round(
+            old_div(self._SlabThickness, self.GetSliceSpacing()))))
+
+    def _UpdateSlab(self):
+        """Apply the slab thickness and mode to all of the reslicers."""
+
+        step = self.GetSliceSpacing()
+
+        for name in self._ImageReslicers:
+            rs = self._ImageReslicers[name]
+            rs.SetSlabMode(self._SlabMode)
+
+            if self._SlabThickness <= 0:
+                rs.SetSlabNumberOfSlices(1)
+                continue
+
+            # the reslicer spaces slab slices by a fraction of its output
+            # z spacing, which should match the spacing along the normal
+            rs.UpdateInformation()
+            zspacing = rs.GetOutputInformation(0).Get(
+                vtk.vtkDataObject.SPACING())[2]
+            fraction = min(1.0, old_div(step, zspacing))
+            rs.SetSlabSliceSpacingFraction(fraction)
+            rs.SetSlabNumberOfSlices(max(1, int(round(
+                old_div(self._SlabThickness, fraction * zspacing)))))
+
+    def SetNumberOfThreads(self, n):
+        """Set the number of threads used by each reslicer.
+
+        Set to 0 to use vtkMultiThreader's global default, which is the
+        number of cores unless VTK_MAX_THREADS says otherwise.
+
+        """
+        n = int(n)
+        if n <= 0:
+            n = vtk.vtkMultiThreader.GetGlobalDefaultNumberOfThreads()
+        self._NumberOfThreads = n
+        self._UpdateThreading()
+
+    def GetNumberOfThreads(self):
+        if self._NumberOfThreads is None:
+            for rs in self._ImageReslicers.values():
+                return rs.GetNumberOfThreads()
+        return self._NumberOfThreads
+
+    def SetSplitMode(self, mode):
+        """Set how the output extent is divided between threads.
+
+        The modes are those of vtkThreadedImageAlgorithm: 0 (slab), 1 (beam)
+        and 2 (block).  A single output slice has one slab, so for 2D
+        reslicing the slab mode splits by rows.
+
+        """
+        if mode not in (self.SPLIT_SLAB, self.SPLIT_BEAM, self.SPLIT_BLOCK):
+            logger.error("SetSplitMode: invalid mode {}".format(mode))
+            return
+        self._SplitMode = mode
+        self._UpdateThreading()
+
+    def SetSplitModeToSlab(self):
+        self.SetSplitMode(self.SPLIT_SLAB)
+
+    def SetSplitModeToBeam(self):
+        self.SetSplitMode(self.SPLIT_BEAM)
+
+    def SetSplitModeToBlock(self):
+        self.SetSplitMode(self.SPLIT_BLOCK)
+
+    def GetSplitMode(self):
+        if self._SplitMode is None:
+            for rs in self._ImageReslicers.values():
+                return rs.GetSplitMode()
+        return self._SplitMode
+
+    def _UpdateThreading(self):
+        """Apply the thread count and split mode to all of the reslicers."""
+
+        for name in self._ImageReslicers:
+            rs = self._ImageReslicers[name]
+            if self._NumberOfThreads is not None:
+                rs.SetNumberOfThreads(self._NumberOfThreads)
+            if self._SplitMode is not None:
+                rs.SetSplitMode(self._SplitMode)
+
+    def GetSlabArray(self):
+        """Return the slab projection of an axis-aligned plane as an array.
+
+        The projection is computed with a NumPy reduction over a view of the
+        input volume (see ImageProbe.slab_projection), which for a
+        MemmapImage input only reads the slab from disk.  The array is in
+        the orientation of the volume, with the slab axis removed.
+
+        Returns:
+            numpy.ndarray: the projected slab, or None if the plane is
+            oblique or the input isn't held in memory
+
+        """
+        normal = self.GetNormal()
+        axes = [i for i in range(3) if normal[i] != 0]
+        if len(axes) != 1:
+            return None
+        axis = axes[0]
+
+        # prefer the array behind an array-backed source, e.g. MemmapImage
+        rs = self._ImageReslicers[0]
+        source = rs.GetInputAlgorithm()
+        if not hasattr(source, 'GetScalarArray'):
+            source = rs.GetInput()
+        array = ImageProbe.get_scalar_array(source)
+        if array is None:
+            return None
+
+        spacing, origin = self._GetInputGeometry()
+        extent = source.GetExtent()
+        center = int(round(old_div(self.GetOrigin()[axis] - origin[axis],
+                                   spacing[axis]))) - extent[2 * axis]
+
+        n = 1
+        if self._SlabThickness > 0:
+            n = max(1, int(round(old_div(self._SlabThickness,
+                                         spacing[axis]))))
+        first = center - (n - 1) // 2
+
+        return ImageProbe.slab_projection(
+            array, axis, first, first + n - 1, self._SlabMode)
+
+    def SetPrefetchCount(self, n):
+        """Set the number of slices to prefetch in the scroll direction.
+
+        Prefetched slices are resliced on a worker thread and kept in the
+        slice cache, so that they can be displayed without reslicing when
+        the plane is pushed onto them.  Set to 0 to disable prefetching.
+
+        """
+        self._PrefetchCount = int(n)
+        if self._PrefetchCount <= 0:
+            self._SlicePrefetcher.Cancel()
+
+    def GetPrefetchCount(self):
+        return self._PrefetchCount
+
+    def SetSliceCacheSize(self, size):
+        """Set the memory budget of the slice cache, in bytes."""
+        self._SliceCache.SetSize(size)
+
+    def GetSliceCacheSize(self):
+        return self._SliceCache.GetSize()
+
+    def GetSliceCache(self):
+        return self._SliceCache
+
+    def GetSliceCacheStatistics(self):
+        """Return the hits, misses, hit rate and bytes held by the slice cache.
+
+        Set the cache size to 0 to disable caching.
+
+        """
+        return self._SliceCache.GetStatistics()
+
+    def ResetSliceCacheStatistics(self):
+        self._SliceCache.ResetStatistics()
+
+    def ClearSliceCache(self):
+        self._SlicePrefetcher.Cancel()
+        self._SliceCache.Clear()
+
+    def PrefetchSlices(self, direction=None):
+        """Start reslicing the slices ahead of the current one.
+
+        Args:
+            direction (int): +1 or -1 to prefetch towards increasing or
+                decreasing slice index, by default the direction in which
+                the plane was last pushed
+
+        """
+        if self._PrefetchCount <= 0:
+            return
+
+        self._InsertSliceCacheStages()
+
+        for name, stage in self._SliceCacheStages.items():
+            d = direction or stage.GetDirection()
+            if not d:
+                continue
+            offsets = [d * (i + 1) for i in range(self._PrefetchCount)]
+            self._SlicePrefetcher.Prefetch(stage.GetReslicer(), name, offsets)
+
+    def _MakeActors(self):
+        actors = SlicePlaneFactory.SlicePlaneFactory._MakeActors(self)
+        self._UpdateThreading()
+        self._InsertSliceCacheStages(actors)
+        return actors
+
+    def _InsertSliceCacheStages(self, actors=None):
+        """Place a cache stage after each reslicer that doesn't have one.
+
+        The pipelines of the actors are searched for the filters that
+        consume the output of the reslicers, and these are reconnected to
+        the output of a SliceCache.ResliceCacheStage instead.
+
+        """
+        reslicers = {}
+        for name in self._ImageReslicers:
+            rs = self._ImageReslicers[name]
+            stage = self._SliceCacheStages.get(name)
+            if stage is None or stage.GetReslicer() is not rs:
+                reslicers[rs] = name
+        if not reslicers:
+            return
+
+        if actors is None:
+            actors = [a for l in self._ActorDict.values() for a in l]
+
+        pending = []
+        for actor in actors:
+            if hasattr(actor, 'GetTexture') and actor.GetTexture():
+                pending.append(actor.GetTexture())
+            if hasattr(actor, 'GetMapper') and actor.GetMapper():
+                pending.append(actor.GetMapper())
+
+        visited = set()
+        while pending:
+            algorithm = pending.pop()
+            if algorithm in visited:
+                continue
+            visited.add(algorithm)
+
+            for port in range(algorithm.GetNumberOfInputPorts()):
+                connections = [algorithm.GetInputConnection(port, i) for i in
+                               range(algorithm.GetNumberOfInputConnections(port))]
+                replaced = False
+                for i, connection in enumerate(connections):
+                    producer = connection.GetProducer()
+                    if producer not in reslicers:
+                        pending.append(producer)
+                        continue
+
+                    name = reslicers[producer]
+                    stage = self._SliceCacheStages.get(name)
+                    if stage is None or stage.GetReslicer() is not producer:
+                        if stage is not None:
+                            stage.RemoveAllInputConnections(0)
+                        stage = SliceCache.ResliceCacheStage(
+                            producer, self._SliceCache, name)
+                        self._SliceCacheStages[name] = stage
+                    connections[i] = stage.GetOutputPort()
+                    replaced = True
+
+                if replaced:
+                    # reconnect in order, since ports may be repeatable
+                    algorithm.RemoveAllInputConnections(port)
+                    for connection in connections:
+                        algorithm.AddInputConnection(port, connection)
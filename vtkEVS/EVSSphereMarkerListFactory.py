@@ -43,6 +43,7 @@ from __future__ import division
 from builtins import range
 from past.utils import old_div
 from vtkAtamai import ActorFactory, SphereMarkFactory
+from . import RenderScheduler
 
 
 class EVSSphereMarkerListFactory(ActorFactory.ActorFactory):
@@ -119,7 +120,7 @@ class EVSSphereMarkerListFactory(ActorFactory.ActorFactory):
     def SetSphereOpacity(self, i, a):
         self.SphereMarkList[i].SetOpacity(a)
         self.Modified()
-        self.Render()
+        RenderScheduler.RequestRender(self)
 
     # Insert a sphere into the list of spheres and display it.
     def InsertSphere(self, x, y, z, r, g, b, a, i):
@@ -133,7 +134,7 @@ class EVSSphereMarkerListFactory(ActorFactory.ActorFactory):
 
         self.AddChild(self.SphereMarkList[i])
         self.Modified()
-        self.Render()
+        RenderScheduler.RequestRender(self)
 
     # Append a sphere to the list of spheres but don't display it.
     def AddSphere(self, x, y, z):
@@ -153,7 +154,7 @@ class EVSSphereMarkerListFactory(ActorFactory.ActorFactory):
         self.SphereMarkList[i].SetPosition((x, y, z))
         self.SphereMarkList[i].SetOpacity(1.0)
         self.Modified()
-        self.Render()
+        RenderScheduler.RequestRender(self)
 
     def SetSphereToEdit(self, i):
         self.SphereToEdit = i
@@ -168,7 +169,7 @@ class EVSSphereMarkerListFactory(ActorFactory.ActorFactory):
             if len(self.SphereMarkList) == 0:
                 self.SphereCounter = 0
             self.Modified()
-            self.Render()
+            RenderScheduler.RequestRender(self)
             return 1
         else:
             return 0
@@ -177,7 +178,7 @@ class EVSSphereMarkerListFactory(ActorFactory.ActorFactory):
         for i in range(len(self.SphereMarkList)):
             self.RemoveChild(self.SphereMarkList[i])
         self.Modified()
-        self.Render()
+        RenderScheduler.RequestRender(self)
         self.SphereMarkList = []
         self.SphereCounter = 0
         self.SetSphereToEdit(-1)
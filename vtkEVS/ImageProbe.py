@@ -0,0 +1,437 @@
+# =========================================================================
+#
+# Copyright (c) 2011-2022 Parallax Innovations Inc.
+#
+# Use, modification and redistribution of the software, in source or
+# binary forms, are permitted provided that the following terms and
+# conditions are met:
+#
+# 1) Redistribution of the source code, in verbatim or modified
+#    form, must retain the above copyright notice, this license,
+#    the following disclaimer, and any notices that refer to this
+#    license and/or the following disclaimer.
+#
+# 2) Redistribution in binary form must include the above copyright
+#    notice, a copy of this license and the following disclaimer
+#    in the documentation or with other materials provided with the
+#    distribution.
+#
+# 3) Modified copies of the source code must be clearly marked as such,
+#    and must not be misrepresented as verbatim copies of the source code.
+#
+# EXCEPT WHEN OTHERWISE STATED IN WRITING BY THE COPYRIGHT HOLDERS AND/OR
+# OTHER PARTIES, THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES PROVIDE THE
+# SOFTWARE "AS IS" WITHOUT EXPRESSED OR IMPLIED WARRANTY INCLUDING, BUT
+# NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE.  IN NO EVENT UNLESS AGREED TO IN WRITING WILL
+# ANY COPYRIGHT HOLDER OR OTHER PARTY WHO MAY MODIFY AND/OR REDISTRIBUTE
+# THE SOFTWARE UNDER THE TERMS OF THIS LICENSE BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED
+# TO, LOSS OF DATA OR DATA BECOMING INACCURATE OR LOSS OF PROFIT OR
+# BUSINESS INTERRUPTION) ARISING IN ANY WAY OUT OF THE USE OR INABILITY TO
+# USE THE SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+#
+# =========================================================================
+
+"""
+ImageProbe - vectorized NumPy sampling of vtkImageData scalars.
+
+  The functions in this module read image values straight from a NumPy
+  view of the image scalars, so that many points can be probed without
+  running a vtkImageReslice pipeline update for each one.
+
+  Scalar arrays are always returned with shape (z, y, x, components) and
+  points are always N x 3 arrays of (x, y, z) world coordinates.
+
+  Nearest neighbour, trilinear and tricubic (Catmull-Rom) sampling are
+  supported.  Neighbours are clamped at the image boundary, so that 2D
+  images (a single slice thick) can be interpolated within the slice.
+
+See Also:
+
+  IntensityAnnotateFactory
+
+"""
+
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+
+# number of points processed at once by the interpolating samplers
+_CHUNK_SIZE = 65536
+
+
+def get_scalar_array(image):
+    """Return a zero-copy view of the point scalars of an image.
+
+    Args:
+        image: a vtkImageData or a MemmapImage
+
+    Returns:
+        numpy.ndarray: a (z, y, x, c) view of the scalars, or None if the
+        image has no scalars in memory
+
+    """
+    if image is None:
+        return None
+
+    # MemmapImage and similar array-backed images
+    if hasattr(image, 'GetScalarArray'):
+        return image.GetScalarArray()
+
+    scalars = image.GetPointData().GetScalars()
+    if scalars is None:
+        return None
+
+    e = image.GetExtent()
+    nx, ny, nz = e[1] - e[0] + 1, e[3] - e[2] + 1, e[5] - e[4] + 1
+    nc = scalars.GetNumberOfComponents()
+    if min(nx, ny, nz) <= 0 or scalars.GetNumberOfTuples() != nx * ny * nz:
+        return None
+
+    return numpy_support.vtk_to_numpy(scalars).reshape(nz, ny, nx, nc)
+
+
+def is_axis_aligned(image):
+    """Return True if the image axes are aligned with the world axes.
+
+    Args:
+        image: a vtkImageData
+
+    Returns:
+        bool: False if the image has a non-identity direction matrix
+
+    """
+    if not hasattr(image, 'GetDirectionMatrix'):
+        return True
+    return bool(image.GetDirectionMatrix().IsIdentity())
+
+
+def get_index_matrix(image):
+    """Return the 4x4 matrix that maps world coordinates to array indices.
+
+    The resulting continuous indices are (x, y, z) offsets relative to
+    the first voxel of the image extent.
+
+    Args:
+        image: a vtkImageData
+
+    Returns:
+        numpy.ndarray: 4x4 homogeneous matrix
+
+    """
+    origin = np.array(image.GetOrigin(), dtype=np.float64)
+    spacing = np.array(image.GetSpacing(), dtype=np.float64)
+    e = image.GetExtent()
+
+    direction = np.eye(3)
+    if hasattr(image, 'GetDirectionMatrix'):
+        m = image.GetDirectionMatrix()
+        direction = np.array([[m.GetElement(i, j) for j in range(3)]
+                              for i in range(3)])
+
+    # world = origin + direction * (spacing * index)
+    rotation = np.linalg.inv(direction) / spacing[:, np.newaxis]
+
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation
+    matrix[:3, 3] = -rotation.dot(origin) - np.array(e[0::2])
+
+    return matrix
+
+
+def world_to_index(image, points):
+    """Convert an N x 3 array of world coordinates to continuous indices.
+
+    Args:
+        image: a vtkImageData
+        points: N x 3 array of (x, y, z) world coordinates
+
+    Returns:
+        numpy.ndarray: N x 3 array of (i, j, k) continuous array indices
+
+    """
+    matrix = get_index_matrix(image)
+    return points.dot(matrix[:3, :3].T) + matrix[:3, 3]
+
+
+def transform_points(transform, points):
+    """Apply a VTK transform to an N x 3 array of points in one call.
+
+    Args:
+        transform: any vtkAbstractTransform, or None
+        points: N x 3 array of (x, y, z) coordinates
+
+    Returns:
+        numpy.ndarray: N x 3 array of transformed coordinates
+
+    """
+    if transform is None:
+        return points
+
+    inPoints = vtk.vtkPoints()
+    inPoints.SetData(numpy_support.numpy_to_vtk(
+        np.ascontiguousarray(points, dtype=np.float64), deep=1))
+    outPoints = vtk.vtkPoints()
+    outPoints.SetDataTypeToDouble()
+    transform.TransformPoints(inPoints, outPoints)
+
+    return numpy_support.vtk_to_numpy(outPoints.GetData()).reshape(-1, 3)
+
+
+def sample_nearest(array, indices, background=0.0):
+    """Nearest-neighbour lookup of an N x 3 array of continuous indices.
+
+    Points that fall outside of the image are set to the background
+    value, in the same way as vtkImageReslice.
+
+    Args:
+        array: (z, y, x, c) scalar array
+        indices: N x 3 array of continuous (i, j, k) indices
+        background (float): value assigned to points outside of the image
+
+    Returns:
+        numpy.ndarray: N x C array of doubles
+
+    """
+    # vtkImageReslice rounds half-way cases up
+    idx = np.floor(indices + 0.5).astype(np.intp)
+    shape = np.array(array.shape[2::-1])
+
+    inside = np.all((idx >= 0) & (idx < shape), axis=1)
+
+    values = np.full((len(idx), array.shape[3]), background,
+                     dtype=np.float64)
+    idx = idx[inside]
+    values[inside] = array[idx[:, 2], idx[:, 1], idx[:, 0]]
+
+    return values
+
+
+def neighbourhood_statistics(array, index, size):
+    """Return statistics over a size x size x size window around a voxel.
+
+    The window is a strided view of the scalar array, clipped at the image
+    boundary.  For 2D images the window is a single slice thick.
+
+    Args:
+        array: (z, y, x, c) scalar array
+        index: integer (i, j, k) index of the centre voxel
+        size (int): window size, in voxels, along each axis
+
+    Returns:
+        dict: 'mean', 'std', 'min' and 'max' arrays with one value per
+        component, and the number of voxels 'count', or None if the window
+        lies entirely outside of the image
+
+    """
+    half = size // 2
+    i, j, k = index
+
+    window = array[max(k - half, 0):max(k + half + 1, 0),
+                   max(j - half, 0):max(j + half + 1, 0),
+                   max(i - half, 0):max(i + half + 1, 0)]
+    if window.size == 0:
+        return None
+
+    window = window.reshape(-1, array.shape[3])
+
+    return {'mean': window.mean(axis=0, dtype=np.float64),
+            'std': window.std(axis=0, dtype=np.float64),
+            'min': window.min(axis=0).astype(np.float64),
+            'max': window.max(axis=0).astype(np.float64),
+            'count': len(window)}
+
+
+def _linear_weights(t):
+    """Return the 2 linear interpolation weights for fractional offsets t."""
+    return np.stack((1.0 - t, t), axis=-1)
+
+
+def _cubic_weights(t):
+    """Return the 4 Catmull-Rom weights for fractional offsets t."""
+    t2 = t * t
+    t3 = t2 * t
+    return np.stack((-0.5 * t3 + t2 - 0.5 * t,
+                     1.5 * t3 - 2.5 * t2 + 1.0,
+                     -1.5 * t3 + 2.0 * t2 + 0.5 * t,
+                     0.5 * t3 - 0.5 * t2), axis=-1)
+
+
+def _sample_separable(array, indices, background, taps, weights):
+    """Separable interpolation with a *taps* wide kernel along each axis."""
+
+    shape = np.array(array.shape[2::-1])
+
+    # tolerate points up to half a voxel beyond the edge, like nearest
+    # neighbour sampling does
+    inside = np.all((indices >= -0.5) & (indices <= shape - 0.5), axis=1)
+
+    values = np.full((len(indices), array.shape[3]), background,
+                     dtype=np.float64)
+
+    offsets = np.arange(taps) - (taps - 1) // 2
+    pts = np.nonzero(inside)[0]
+
+    for start in range(0, len(pts), _CHUNK_SIZE):
+        chunk = pts[start:start + _CHUNK_SIZE]
+        f = indices[chunk]
+        base = np.floor(f)
+        w = weights(f - base)
+
+        # neighbour indices along each axis, clamped to the image
+        idx = base.astype(np.intp)[:, :, np.newaxis] + offsets
+        idx = np.clip(idx, 0, shape[np.newaxis, :, np.newaxis] - 1)
+
+        block = array[idx[:, 2, :, np.newaxis, np.newaxis],
+                      idx[:, 1, np.newaxis, :, np.newaxis],
+                      idx[:, 0, np.newaxis, np.newaxis, :]]
+
+        values[chunk] = np.einsum('nk,nj,ni,nkjic->nc',
+                                  w[:, 2], w[:, 1], w[:, 0], block)
+
+    return values
+
+
+def sample_linear(array, indices, background=0.0):
+    """Trilinear interpolation of an N x 3 array of continuous indices.
+
+    Args:
+        array: (z, y, x, c) scalar array
+        indices: N x 3 array of continuous (i, j, k) indices
+        background (float): value assigned to points outside of the image
+
+    Returns:
+        numpy.ndarray: N x C array of doubles
+
+    """
+    return _sample_separable(array, indices, background, 2, _linear_weights)
+
+
+def sample_cubic(array, indices, background=0.0):
+    """Tricubic (Catmull-Rom) interpolation of continuous indices.
+
+    Args:
+        array: (z, y, x, c) scalar array
+        indices: N x 3 array of continuous (i, j, k) indices
+        background (float): value assigned to points outside of the image
+
+    Returns:
+        numpy.ndarray: N x C array of doubles
+
+    """
+    return _sample_separable(array, indices, background, 4, _cubic_weights)
+
+
+def sample(array, indices, mode=vtk.VTK_RESLICE_NEAREST, background=0.0):
+    """Sample an N x 3 array of continuous indices.
+
+    Args:
+        array: (z, y, x, c) scalar array
+        indices: N x 3 array of continuous (i, j, k) indices
+        mode (int): VTK_RESLICE_NEAREST, VTK_RESLICE_LINEAR or
+            VTK_RESLICE_CUBIC
+        background (float): value assigned to points outside of the image
+
+    Returns:
+        numpy.ndarray: N x C array of doubles
+
+    """
+    if mode == vtk.VTK_RESLICE_LINEAR:
+        return sample_linear(array, indices, background)
+    elif mode == vtk.VTK_RESLICE_CUBIC:
+        return sample_cubic(array, indices, background)
+    return sample_nearest(array, indices, background)
+
+
+def sample_series(stack, index, mode=vtk.VTK_RESLICE_NEAREST, background=0.0):
+    """Sample every timepoint of a 4D series at a single continuous index.
+
+    The neighbourhood of the point is gathered from all timepoints with a
+    single fancy-indexing operation, so a memory-mapped stack only reads the
+    pages that hold those voxels.
+
+    Args:
+        stack: (t, z, y, x, c) array, e.g. a numpy.memmap of the series
+        index: continuous (i, j, k) index, shared by all timepoints
+        mode (int): VTK_RESLICE_NEAREST, VTK_RESLICE_LINEAR or
+            VTK_RESLICE_CUBIC
+        background (float): value returned if the point is outside of the
+            image
+
+    Returns:
+        numpy.ndarray: T x C array of doubles
+
+    """
+    f = np.asarray(index, dtype=np.float64)
+    shape = np.array(stack.shape[3:0:-1])
+    outside = np.full((stack.shape[0], stack.shape[4]), background,
+                      dtype=np.float64)
+
+    if mode not in (vtk.VTK_RESLICE_LINEAR, vtk.VTK_RESLICE_CUBIC):
+        i, j, k = np.floor(f + 0.5).astype(np.intp)
+        if not np.all((np.array((i, j, k)) >= 0) &
+                      (np.array((i, j, k)) < shape)):
+            return outside
+        return stack[:, k, j, i].astype(np.float64)
+
+    if not np.all((f >= -0.5) & (f <= shape - 0.5)):
+        return outside
+
+    if mode == vtk.VTK_RESLICE_LINEAR:
+        taps, weights = 2, _linear_weights
+    else:
+        taps, weights = 4, _cubic_weights
+
+    base = np.floor(f)
+    w = weights(f - base)
+    idx = base.astype(np.intp)[:, np.newaxis] + \
+        (np.arange(taps) - (taps - 1) // 2)
+    idx = np.clip(idx, 0, shape[:, np.newaxis] - 1)
+
+    block = stack[:, idx[2, :, np.newaxis, np.newaxis],
+                  idx[1, np.newaxis, :, np.newaxis],
+                  idx[0, np.newaxis, np.newaxis, :]]
+
+    return np.einsum('k,j,i,tkjic->tc', w[2], w[1], w[0], block)
+
+
+def slab_projection(array, axis, first, last, mode=vtk.VTK_IMAGE_SLAB_MAX):
+    """Project a slab of axis-aligned slices in a single vectorized pass.
+
+    The reduction runs over a view of the volume, so only the slab is
+    read, e.g. from a numpy.memmap.
+
+    Args:
+        array: (z, y, x, c) array of the volume
+        axis (int): 0, 1 or 2 for slices perpendicular to x, y or z
+        first, last (int): range of slice indices, inclusive; clipped to
+            the volume
+        mode (int): VTK_IMAGE_SLAB_MAX, VTK_IMAGE_SLAB_MIN,
+            VTK_IMAGE_SLAB_MEAN or VTK_IMAGE_SLAB_SUM
+
+    Returns:
+        numpy.ndarray: the projected slab, the array with the slab axis
+        removed, or None if the slab is outside of the volume
+
+    """
+    dim = 2 - axis
+    first = max(first, 0)
+    last = min(last, array.shape[dim] - 1)
+    if first > last:
+        return None
+
+    index = [slice(None)] * 4
+    index[dim] = slice(first, last + 1)
+    slab = array[tuple(index)]
+
+    if mode == vtk.VTK_IMAGE_SLAB_MAX:
+        return slab.max(axis=dim)
+    elif mode == vtk.VTK_IMAGE_SLAB_MIN:
+        return slab.min(axis=dim)
+    elif mode == vtk.VTK_IMAGE_SLAB_MEAN:
+        return slab.mean(axis=dim, dtype=np.float64)
+    elif mode == vtk.VTK_IMAGE_SLAB_SUM:
+        return slab.sum(axis=dim, dtype=np.float64)
+
+    raise ValueError("slab_projection: unknown mode {}".format(mode))
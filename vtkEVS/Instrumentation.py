@@ -0,0 +1,232 @@
+# =========================================================================
+#
+# Copyright (c) 2011-2022 Parallax Innovations Inc.
+#
+# Use, modification and redistribution of the software, in source or
+# binary forms, are permitted provided that the following terms and
+# conditions are met:
+#
+# 1) Redistribution of the source code, in verbatim or modified
+#    form, must retain the above copyright notice, this license,
+#    the following disclaimer, and any notices that refer to this
+#    license and/or the following disclaimer.
+#
+# 2) Redistribution in binary form must include the above copyright
+#    notice, a copy of this license and the following disclaimer
+#    in the documentation or with other materials provided with the
+#    distribution.
+#
+# 3) Modified copies of the source code must be clearly marked as such,
+#    and must not be misrepresented as verbatim copies of the source code.
+#
+# EXCEPT WHEN OTHERWISE STATED IN WRITING BY THE COPYRIGHT HOLDERS AND/OR
+# OTHER PARTIES, THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES PROVIDE THE
+# SOFTWARE "AS IS" WITHOUT EXPRESSED OR IMPLIED WARRANTY INCLUDING, BUT
+# NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE.  IN NO EVENT UNLESS AGREED TO IN WRITING WILL
+# ANY COPYRIGHT HOLDER OR OTHER PARTY WHO MAY MODIFY AND/OR REDISTRIBUTE
+# THE SOFTWARE UNDER THE TERMS OF THIS LICENSE BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED
+# TO, LOSS OF DATA OR DATA BECOMING INACCURATE OR LOSS OF PROFIT OR
+# BUSINESS INTERRUPTION) ARISING IN ANY WAY OUT OF THE USE OR INABILITY TO
+# USE THE SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+#
+# =========================================================================
+
+"""
+Instrumentation - opt-in timing of renders and event handlers.
+
+  Instrumentation collects wall-clock durations into named rolling
+  histograms, which can be queried from Python or dumped as JSON.  It is
+  disabled by default, in which case the instrumented callbacks cost a
+  single flag check.
+
+  Render times are measured from a renderer's StartEvent to its EndEvent,
+  for renderers passed to ObserveRenderer().  Callbacks such as factory
+  OnRenderEvent methods and pane event handlers are measured by wrapping
+  them with Instrumented().
+
+Functions:
+
+  Enable(*yesno*) -- turn instrumentation on or off
+  IsEnabled() -- return whether instrumentation is on
+  Record(*name*, *seconds*) -- add a duration to a histogram
+  Instrumented(*name*, *callback*) -- wrap a callback so its time is recorded
+  ObserveRenderer(*renderer*, *name*) -- record the render time of a renderer
+  GetStatistics(*name*=None) -- return the statistics of one or all histograms
+  Reset() -- discard all recorded durations
+  DumpJSON(*filename*=None) -- return, and optionally save, the statistics
+
+"""
+
+import collections
+import functools
+import json
+import threading
+import time
+
+# upper edges of the histogram bins, in milliseconds
+BIN_EDGES = (0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0, 200.0,
+             500.0, 1000.0, float('inf'))
+
+# number of recent samples kept by each histogram
+WINDOW_SIZE = 1000
+
+_Enabled = False
+_Lock = threading.Lock()
+_Histograms = collections.OrderedDict()
+
+
+class RollingHistogram(object):
+
+    """A histogram of the most recent durations recorded under one name.
+
+    Parameters:
+        size : the number of recent samples to keep
+
+    """
+
+    def __init__(self, size=WINDOW_SIZE):
+        self._Samples = collections.deque(maxlen=size)
+        self._Total = 0
+
+    def Add(self, ms):
+        self._Samples.append(ms)
+        self._Total += 1
+
+    def GetStatistics(self):
+        """Return a dict describing the samples in the window.
+
+        The durations are in milliseconds.  'total' counts every sample
+        ever added, the other values only those in the window.
+
+        """
+        samples = sorted(self._Samples)
+        n = len(samples)
+        stats = {'total': self._Total, 'count': n}
+        if n == 0:
+            return stats
+
+        def percentile(p):
+            return samples[min(n - 1, int(p * n))]
+
+        # the last bin has no upper edge, which is None in the output
+        counts = [0] * len(BIN_EDGES)
+        i = 0
+        for ms in samples:
+            while ms > BIN_EDGES[i]:
+                i += 1
+            counts[i] += 1
+
+        stats.update({'mean': sum(samples) / n,
+                      'min': samples[0],
+                      'max': samples[-1],
+                      'p50': percentile(0.5),
+                      'p90': percentile(0.9),
+                      'p99': percentile(0.99),
+                      'histogram': [[edge if edge < BIN_EDGES[-1] else None,
+                                     count] for edge, count in
+                                    zip(BIN_EDGES, counts) if count]})
+        return stats
+
+
+def Enable(yesno=True):
+    global _Enabled
+    _Enabled = bool(yesno)
+
+
+def IsEnabled():
+    return _Enabled
+
+
+def Record(name, seconds):
+    """Add a duration, in seconds, to the histogram called name."""
+
+    with _Lock:
+        histogram = _Histograms.get(name)
+        if histogram is None:
+            histogram = _Histograms[name] = RollingHistogram()
+        histogram.Add(seconds * 1000.0)
+
+
+def Instrumented(name, callback):
+    """Return a wrapper of callback that records its duration under name."""
+
+    @functools.wraps(callback)
+    def wrapper(*args, **kw):
+        if not _Enabled:
+            return callback(*args, **kw)
+        t0 = time.perf_counter()
+        try:
+            return callback(*args, **kw)
+        finally:
+            Record(name, time.perf_counter() - t0)
+
+    return wrapper
+
+
+def GetCallbackName(callback):
+    """Return a 'Class.method' style name for a callback."""
+
+    obj = getattr(callback, '__self__', None)
+    if obj is not None:
+        return '{}.{}'.format(type(obj).__name__, callback.__name__)
+    return getattr(callback, '__qualname__', repr(callback))
+
+
+def ObserveRenderer(renderer, name):
+    """Record the StartEvent to EndEvent time of renderer under name.
+
+    Returns:
+        list: the observer tags, for renderer.RemoveObserver()
+
+    """
+    start = [None]
+
+    def OnStart(obj, event):
+        if _Enabled:
+            start[0] = time.perf_counter()
+
+    def OnEnd(obj, event):
+        if start[0] is not None:
+            Record(name, time.perf_counter() - start[0])
+            start[0] = None
+
+    # observe before, and after, every other render observer
+    return [renderer.AddObserver('StartEvent', OnStart, 1000.0),
+            renderer.AddObserver('EndEvent', OnEnd, -1000.0)]
+
+
+def GetStatistics(name=None):
+    """Return the statistics of the histogram called name, or of all of them.
+
+    Returns:
+        dict: see RollingHistogram.GetStatistics(), or a dict of these
+        keyed by name
+
+    """
+    with _Lock:
+        if name is not None:
+            histogram = _Histograms.get(name)
+            return histogram.GetStatistics() if histogram else None
+        return collections.OrderedDict(
+            (n, h.GetStatistics()) for n, h in _Histograms.items())
+
+
+def Reset():
+    with _Lock:
+        _Histograms.clear()
+
+
+def DumpJSON(filename=None):
+    """Return the statistics of all histograms as JSON.
+
+    Args:
+        filename (str): also write the JSON to this file
+
+    """
+    text = json.dumps(GetStatistics(), indent=2)
+    if filename is not None:
+        with open(filename, 'w') as f:
+            f.write(text)
+    return text
@@ -44,14 +44,49 @@ from __future__ import absolute_import
 from builtins import range
 from past.utils import old_div
 from . import AnnotateFactory
+from . import ImageProbe
+from . import MemmapImage
+import collections
+import logging
+import math
+import numpy as np
 import vtk
 
+logger = logging.getLogger(__name__)
+
+
+def SetResliceInput(reslice, input):
+    """Connect a vtkImageData, a MemmapImage or None to a reslice filter."""
+
+    if isinstance(input, MemmapImage.MemmapImage):
+        reslice.SetInputConnection(input.GetOutputPort())
+    elif vtk.vtkVersion().GetVTKMajorVersion() > 5:
+        reslice.SetInputData(input)
+    else:
+        reslice.SetInput(input)
+
 
 class IntensityAnnotateFactory(AnnotateFactory.AnnotateFactory):
 
     """Displays intensity, or gray scale value, of the point of interest at the specified location in the window.
 
-    vtkImageReslice is used to calculate the intensity at the point of interest.
+    For inputs that are in memory, the intensity at the point of interest is
+    read directly from a NumPy view of the input scalars, using nearest
+    neighbour, trilinear or tricubic interpolation (see SetInterpolationMode).
+    Oblique inputs are handled through their direction matrix.
+    vtkImageReslice is only used for inputs whose scalars aren't in memory.
+    ProbePoints() samples many points at once from a NumPy view of the input,
+    and SampleLine() and SamplePolyline() use it to sample line profiles.
+    ProbeSeries() returns the values at a point across a dynamic (4D) series
+    of inputs (see SetInputSeries).
+
+    Probe results are kept in a small LRU cache, keyed by voxel index (or by
+    position when interpolating), input MTime, shift, scale and interpolation
+    mode, so that cursor jitter within a voxel doesn't probe the input again.
+
+    Optionally, the mean, standard deviation, minimum and maximum over a
+    k x k (x k) neighbourhood of the point of interest are displayed as well
+    (see SetNeighbourhoodSize).
 
     Parameters:
         dimension : 2 or 3. Specify 2D or 3D coordinates to display.
@@ -67,45 +102,135 @@ class IntensityAnnotateFactory(AnnotateFactory.AnnotateFactory):
         self._Scale = 1.0
 
         self._Input = None
+        self._InputArray = None
+        self._InputArrayMTime = None
+        self._InputSeries = None
+        self._SeriesArrays = []
         self._defaultLabel = 'Gray Scale Value'
 
+        self._InterpolationMode = vtk.VTK_RESLICE_NEAREST
+
         self._Reslice = vtk.vtkImageReslice()
         self._Reslice.SetOutputExtent(0, 0, 0, 0, 0, 0)
-        self._Reslice.InterpolateOff()
         # HQ: vtkImageReslice doesn't work well for 2D image when interpolate is on.
-        # self._Reslice.SetInterpolationModeToLinear()
+        # Interpolation is normally done by ImageProbe instead, which clamps at
+        # the image boundary; the reslicer only handles inputs not in memory.
+        self._Reslice.SetInterpolationMode(self._InterpolationMode)
         self._Dimension = dimension
 
         self._Point = None
         self._Intensity = None
         self.measurementUnit = 'mm'
 
+        # neighbourhood statistics - disabled by default
+        self._NeighbourhoodSize = 1
+        self._Statistics = None
+
+        # annotation format strings, see _GetTextTemplate()
+        self._TextTemplates = {}
+
+        # LRU cache of probed values
+        self._ProbeCache = collections.OrderedDict()
+        self._ProbeCacheSize = 256
+        self._ProbeCacheMTime = None
+        self._ProbeCacheHits = 0
+        self._ProbeCacheMisses = 0
+
     def SetInterpolate(self, interpolation):
-        self._Reslice.SetInterpolate(interpolation)
+        """Turn linear interpolation on or off
+
+        Args:
+            interpolation (bool): if True, use linear interpolation, otherwise
+                use nearest neighbour
+
+        """
+        if interpolation:
+            self.SetInterpolationMode(vtk.VTK_RESLICE_LINEAR)
+        else:
+            self.SetInterpolationMode(vtk.VTK_RESLICE_NEAREST)
 
     def GetInterpolate(self):
-        return self._Reslice.GetInterpolate()
+        return int(self._InterpolationMode != vtk.VTK_RESLICE_NEAREST)
+
+    def SetInterpolationMode(self, mode):
+        """Set the interpolation mode used to probe the input
+
+        Args:
+            mode (int): VTK_RESLICE_NEAREST, VTK_RESLICE_LINEAR or
+                VTK_RESLICE_CUBIC
+
+        """
+        if mode not in (vtk.VTK_RESLICE_NEAREST, vtk.VTK_RESLICE_LINEAR,
+                        vtk.VTK_RESLICE_CUBIC):
+            logger.error(
+                "SetInterpolationMode: unknown mode {}".format(mode))
+            return
+        self._InterpolationMode = mode
+        self._Reslice.SetInterpolationMode(mode)
+
+    def SetInterpolationModeToNearestNeighbor(self):
+        self.SetInterpolationMode(vtk.VTK_RESLICE_NEAREST)
+
+    def SetInterpolationModeToLinear(self):
+        self.SetInterpolationMode(vtk.VTK_RESLICE_LINEAR)
+
+    def SetInterpolationModeToCubic(self):
+        self.SetInterpolationMode(vtk.VTK_RESLICE_CUBIC)
+
+    def GetInterpolationMode(self):
+        return self._InterpolationMode
 
     def GetInterpolation(self):
-        return self._reslice.GetInterpolation()
+        return self._InterpolationMode
 
     def SetInput(self, input):
+        """Set the image to probe
+
+        Args:
+            input: a vtkImageData, or a MemmapImage for volumes that are
+                probed straight from a memory-mapped file
+
+        """
 
         self._Point = None
         self._Intensity = None
+        self._Statistics = None
         self._Input = input
-        self._Reslice.SetInput(input)
+        self._InputArray = None
+        self._InputArrayMTime = None
+        SetResliceInput(self._Reslice, input)
+        self.ClearProbeCache()
 
     def GetInput(self):
         return self._Input
 
+    def SetInputSeries(self, series):
+        """Set the timepoints of a dynamic (4D) acquisition for ProbeSeries()
+
+        Args:
+            series: a sequence of vtkImageData, one per timepoint, or a
+                (t, z, y, x[, c]) NumPy array, such as a numpy.memmap of the
+                whole series.  A NumPy series has the geometry of the current
+                input (see SetInput)
+
+        """
+        self._InputSeries = series
+        self._SeriesArrays = []
+
+    def GetInputSeries(self):
+        return self._InputSeries
+
     def SetShift(self, shift):
+        if shift != self._Shift:
+            self.ClearProbeCache()
         self._Shift = shift
 
     def GetShift(self):
         return self._Shift
 
     def SetScale(self, scale):
+        if scale != self._Scale:
+            self.ClearProbeCache()
         self._Scale = scale
 
     def GetScale(self):
@@ -133,31 +258,398 @@ class IntensityAnnotateFactory(AnnotateFactory.AnnotateFactory):
         if self._Transform:
             x, y, z = self._Transform.TransformPoint(x, y, z)
 
-        self._Reslice.SetOutputOrigin(x, y, z)
-
         # handle the case where our input is Null
-        o = self._Reslice.GetInput()
-        if o is None:
+        if self._Input is None:
             return
 
-        o.Update()
-        self._Reslice.GetOutput().SetUpdateExtent(0, 0, 0, 0, 0, 0)
-        self._Reslice.GetOutput().Update()
+        key = self._GetProbeCacheKey(x, y, z)
+        entry = self._ProbeCache.get(key)
 
-        numC = self._Reslice.GetOutput().GetNumberOfScalarComponents()
+        if entry is None:
+            self._ProbeCacheMisses += 1
 
-        val = []
-        for i in range(numC):
-            try:
-                v = self._Reslice.GetOutput().GetScalarComponentAsDouble(
-                    0, 0, 0, i)
-            except AttributeError:
-                v = self._Reslice.GetOutput().GetScalarComponentAsFloat(
-                    0, 0, 0, i)
-            val.append(v * self._Scale + self._Shift)
+            val = self._ProbeWithArray(x, y, z)
+            if val is None:
+                val = self._ProbeWithReslice(x, y, z)
+            if val is None:
+                return
+
+            val = [v * self._Scale + self._Shift for v in val]
+            stats = self._ProbeNeighbourhood(x, y, z)
+
+            if self._ProbeCacheSize > 0:
+                self._ProbeCache[key] = (val, stats)
+                if len(self._ProbeCache) > self._ProbeCacheSize:
+                    self._ProbeCache.popitem(last=False)
+        else:
+            self._ProbeCacheHits += 1
+            self._ProbeCache.move_to_end(key)
+            val, stats = entry
 
+        self._Statistics = stats
         self.RefreshText(val, position)
 
+    def SetNeighbourhoodSize(self, size):
+        """Set the size of the neighbourhood used for intensity statistics
+
+        Args:
+            size (int): width of the neighbourhood in voxels.  Even sizes are
+                rounded up to the next odd size.  Set to 1 to disable
+                neighbourhood statistics
+
+        """
+        size = max(1, int(size))
+        if size % 2 == 0:
+            size += 1
+        if size != self._NeighbourhoodSize:
+            self._NeighbourhoodSize = size
+            self._Statistics = None
+            self.ClearProbeCache()
+
+    def GetNeighbourhoodSize(self):
+        return self._NeighbourhoodSize
+
+    def GetNeighbourhoodStatistics(self):
+        """Return the neighbourhood statistics at the point of interest
+
+        Returns:
+            dict: shifted and scaled 'mean', 'std', 'min' and 'max' lists,
+            with one value per component, and the voxel 'count'.  None if
+            statistics are disabled or unavailable
+
+        """
+        return self._Statistics
+
+    def _ProbeNeighbourhood(self, x, y, z):
+        """Compute neighbourhood statistics around an (already transformed) point.
+
+        Returns:
+            dict: see GetNeighbourhoodStatistics()
+
+        """
+        if self._NeighbourhoodSize <= 1:
+            return None
+
+        array = self._GetInputArray()
+        if array is None:
+            return None
+
+        index = ImageProbe.world_to_index(
+            self._Input, np.array([[x, y, z]], dtype=np.float64))[0]
+        index = tuple(int(math.floor(v + 0.5)) for v in index)
+
+        stats = ImageProbe.neighbourhood_statistics(
+            array, index, self._NeighbourhoodSize)
+        if stats is None:
+            return None
+
+        lo = stats['min'] * self._Scale + self._Shift
+        hi = stats['max'] * self._Scale + self._Shift
+
+        return {'mean': list(stats['mean'] * self._Scale + self._Shift),
+                'std': list(stats['std'] * abs(self._Scale)),
+                'min': list(np.minimum(lo, hi)),
+                'max': list(np.maximum(lo, hi)),
+                'count': stats['count']}
+
+    def SetProbeCacheSize(self, size):
+        """Set the maximum number of probe results to cache
+
+        Args:
+            size (int): number of cached results.  Set to 0 to disable caching
+
+        """
+        self._ProbeCacheSize = max(0, int(size))
+        while len(self._ProbeCache) > self._ProbeCacheSize:
+            self._ProbeCache.popitem(last=False)
+
+    def GetProbeCacheSize(self):
+        return self._ProbeCacheSize
+
+    def ClearProbeCache(self):
+        """Discard all cached probe results.  Hit and miss counts are kept."""
+        self._ProbeCache.clear()
+        self._ProbeCacheMTime = None
+
+    def GetProbeCacheStatistics(self):
+        """Return probe cache statistics
+
+        Returns:
+            dict: 'hits', 'misses', 'entries' and 'size' of the probe cache
+
+        """
+        return {'hits': self._ProbeCacheHits,
+                'misses': self._ProbeCacheMisses,
+                'entries': len(self._ProbeCache),
+                'size': self._ProbeCacheSize}
+
+    def ResetProbeCacheStatistics(self):
+        self._ProbeCacheHits = 0
+        self._ProbeCacheMisses = 0
+
+    def _GetProbeCacheKey(self, x, y, z):
+        """Return the probe cache key for an (already transformed) point.
+
+        Nearest neighbour probes of axis-aligned inputs are keyed by voxel
+        index, all others by position.  The cache is emptied whenever the
+        input MTime changes.
+
+        """
+        mtime = self._Input.GetMTime()
+        if mtime != self._ProbeCacheMTime:
+            self._ProbeCache.clear()
+            self._ProbeCacheMTime = mtime
+
+        if self._InterpolationMode == vtk.VTK_RESLICE_NEAREST and \
+                ImageProbe.is_axis_aligned(self._Input):
+            x0, y0, z0 = self._Input.GetOrigin()
+            xstep, ystep, zstep = self._Input.GetSpacing()
+            point = (int(math.floor((x - x0) / xstep + 0.5)),
+                     int(math.floor((y - y0) / ystep + 0.5)),
+                     int(math.floor((z - z0) / zstep + 0.5)))
+        else:
+            point = (x, y, z)
+
+        return (point, mtime, self._Shift, self._Scale,
+                self._InterpolationMode, self._NeighbourhoodSize)
+
+    def ProbePoints(self, points):
+        """Return the intensities at a set of points in one vectorized pass.
+
+        Points are transformed by the current transform, and the values are
+        shifted and scaled, exactly as with SetPointOfInterest().
+
+        Args:
+            points: N x 3 array of (x, y, z) coordinates
+
+        Returns:
+            numpy.ndarray: N x C array of intensities, one column per
+            scalar component
+
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+        if self._Input is None:
+            return np.zeros((len(points), 0))
+
+        points = ImageProbe.transform_points(self._Transform, points)
+
+        array = self._GetInputArray()
+        if array is None:
+            # input isn't in memory - probe one point at a time
+            values = np.array([self._ProbeWithReslice(*p) for p in points],
+                              dtype=np.float64)
+        else:
+            values = ImageProbe.sample(
+                array, ImageProbe.world_to_index(self._Input, points),
+                self._InterpolationMode, self._Reslice.GetBackgroundLevel())
+
+        return values * self._Scale + self._Shift
+
+    def ProbeSeries(self, position=None):
+        """Return the intensity at a point for every timepoint of the series.
+
+        The point is transformed once, and the voxel index is computed once
+        for all timepoints that share the same geometry.
+
+        Args:
+            position: (x, y, z) point, or None for the current point of
+                interest
+
+        Returns:
+            numpy.ndarray: T x C array of shifted and scaled intensities.
+            Timepoints that aren't in memory are set to NaN
+
+        """
+        if position is None:
+            position = self._Point
+        if position is None or self._InputSeries is None:
+            return np.zeros((0, 0))
+
+        point = ImageProbe.transform_points(
+            self._Transform, np.array([position], dtype=np.float64))
+        background = self._Reslice.GetBackgroundLevel()
+
+        if isinstance(self._InputSeries, np.ndarray):
+            if self._Input is None:
+                return np.zeros((0, 0))
+            stack = self._InputSeries
+            if stack.ndim == 4:
+                stack = stack[..., np.newaxis]
+            index = ImageProbe.world_to_index(self._Input, point)[0]
+            values = ImageProbe.sample_series(
+                stack, index, self._InterpolationMode, background)
+            return values * self._Scale + self._Shift
+
+        arrays = self._GetSeriesArrays()
+        numC = max([a.shape[3] for a in arrays if a is not None] or [0])
+        values = np.full((len(arrays), numC), np.nan)
+
+        matrix = None
+        for t, (image, array) in enumerate(zip(self._InputSeries, arrays)):
+            if array is None:
+                continue
+            m = ImageProbe.get_index_matrix(image)
+            if matrix is None or not np.array_equal(m, matrix):
+                matrix = m
+                index = point.dot(matrix[:3, :3].T) + matrix[:3, 3]
+            values[t, :array.shape[3]] = ImageProbe.sample(
+                array, index, self._InterpolationMode, background)[0]
+
+        return values * self._Scale + self._Shift
+
+    def _GetSeriesArrays(self):
+        """Return cached NumPy views of the scalars of each timepoint."""
+
+        if len(self._SeriesArrays) != len(self._InputSeries):
+            self._SeriesArrays = [(None, None)] * len(self._InputSeries)
+
+        arrays = []
+        for t, image in enumerate(self._InputSeries):
+            mtime = image.GetMTime()
+            if self._SeriesArrays[t][0] != mtime:
+                self._SeriesArrays[t] = (
+                    mtime, ImageProbe.get_scalar_array(image))
+            arrays.append(self._SeriesArrays[t][1])
+
+        return arrays
+
+    def SampleLine(self, p0, p1, n):
+        """Sample an intensity profile along a straight line.
+
+        Args:
+            p0: (x, y, z) start point
+            p1: (x, y, z) end point
+            n (int): number of evenly spaced samples, including end points
+
+        Returns:
+            tuple: (distances, values) where distances is an array of n
+            distances from p0, and values is an n x C array of intensities
+
+        """
+        p0 = np.asarray(p0, dtype=np.float64)
+        p1 = np.asarray(p1, dtype=np.float64)
+
+        t = np.linspace(0.0, 1.0, max(int(n), 1))
+        points = p0 + t[:, np.newaxis] * (p1 - p0)
+
+        return t * np.linalg.norm(p1 - p0), self.ProbePoints(points)
+
+    def SamplePolyline(self, points, step):
+        """Sample an intensity profile along a polyline at a fixed step.
+
+        Args:
+            points: M x 3 array of polyline vertices
+            step (float): distance between samples along the polyline
+
+        Returns:
+            tuple: (distances, values) where distances is an array of
+            distances along the polyline, and values is the matching N x C
+            array of intensities.  The last vertex is always sampled.  Both
+            are empty if there are no vertices
+
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+        if len(points) == 0:
+            return np.zeros(0), self.ProbePoints(points)
+
+        # arc length at each vertex
+        lengths = np.r_[0.0, np.cumsum(
+            np.linalg.norm(np.diff(points, axis=0), axis=1))]
+        total = lengths[-1]
+
+        if total == 0.0 or step <= 0.0:
+            distances = lengths[:1]
+        else:
+            distances = np.arange(0.0, total, step)
+            if total - distances[-1] > 1e-9 * total:
+                distances = np.r_[distances, total]
+
+        samples = np.column_stack(
+            [np.interp(distances, lengths, points[:, i]) for i in range(3)])
+
+        return distances, self.ProbePoints(samples)
+
+    def _GetInputArray(self):
+        """Return a cached (z, y, x, c) NumPy view of the input scalars.
+
+        The view is refreshed whenever the input's MTime changes.
+
+        """
+        if self._Input is None:
+            return None
+
+        mtime = self._Input.GetMTime()
+        if mtime != self._InputArrayMTime:
+            self._InputArray = ImageProbe.get_scalar_array(self._Input)
+            self._InputArrayMTime = mtime
+
+        return self._InputArray
+
+    def _ProbeWithArray(self, x, y, z):
+        """Probe a single (already transformed) point without a pipeline update.
+
+        The voxel index is computed from the input origin and spacing and the
+        value is read from a NumPy view of the input scalars.  When
+        interpolation is on, or the input is oblique, the index is computed
+        from the full index matrix and the value is sampled by ImageProbe.
+
+        Returns:
+            list: the raw scalar components, or None if the input scalars
+            aren't in memory and the caller must fall back to vtkImageReslice
+
+        """
+        array = self._GetInputArray()
+        if array is None:
+            return None
+
+        if self._InterpolationMode != vtk.VTK_RESLICE_NEAREST or \
+                not ImageProbe.is_axis_aligned(self._Input):
+            index = ImageProbe.world_to_index(
+                self._Input, np.array([[x, y, z]], dtype=np.float64))
+            return list(ImageProbe.sample(
+                array, index, self._InterpolationMode,
+                self._Reslice.GetBackgroundLevel())[0])
+
+        x0, y0, z0 = self._Input.GetOrigin()
+        xstep, ystep, zstep = self._Input.GetSpacing()
+        e = self._Input.GetExtent()
+
+        # vtkImageReslice rounds half-way cases up
+        i = int(math.floor((x - x0) / xstep + 0.5)) - e[0]
+        j = int(math.floor((y - y0) / ystep + 0.5)) - e[2]
+        k = int(math.floor((z - z0) / zstep + 0.5)) - e[4]
+
+        nz, ny, nx, numC = array.shape
+        if 0 <= i < nx and 0 <= j < ny and 0 <= k < nz:
+            return [float(v) for v in array[k, j, i]]
+
+        # outside of the image - match the reslice background level
+        return [self._Reslice.GetBackgroundLevel()] * numC
+
+    def _ProbeWithReslice(self, x, y, z):
+        """Probe a single (already transformed) point with vtkImageReslice.
+
+        Returns:
+            list: the raw scalar components, or None if there is no input
+
+        """
+
+        if self._Reslice.GetNumberOfInputConnections(0) == 0:
+            return None
+
+        self._Reslice.SetOutputOrigin(x, y, z)
+        self._Reslice.UpdateExtent((0, 0, 0, 0, 0, 0))
+
+        output = self._Reslice.GetOutput()
+
+        val = []
+        for i in range(output.GetNumberOfScalarComponents()):
+            val.append(output.GetScalarComponentAsDouble(0, 0, 0, i))
+
+        return val
+
     def SetPoint(self, x, y, z):
         "Compatibility method to replace PointSelectionFactory."
         self.SetPointOfInterest((x, y, x))
@@ -178,15 +670,71 @@ class IntensityAnnotateFactory(AnnotateFactory.AnnotateFactory):
                 self.measurementUnit))
             return
 
-        x0, y0, z0 = self._Input.GetOrigin()
-        xstep, ystep, zstep = self._Input.GetSpacing()
         type = self._Input.GetScalarType()
+        numC = self._Input.GetNumberOfScalarComponents()
+
+        template = self._GetTextTemplate(numC, type)
+        text = template % (tuple(self._Intensity) + self._GetPosition())
+
+        # neighbourhood statistics annotate
+        if self._Statistics is not None:
+            # the window spans every axis of the input that is more than one
+            # voxel thick, whatever the number of coordinates displayed
+            axes = sum(n > 1 for n in self._GetInputArray().shape[:3])
+            size = "x".join(["%d" % self._NeighbourhoodSize] * max(axes, 1))
+            text += "\n%s mean: %s, sd: %s\nmin: %s, max: %s" % (
+                size,
+                ", ".join("%1.3f" % v for v in self._Statistics['mean']),
+                ", ".join("%1.3f" % v for v in self._Statistics['std']),
+                ", ".join("%1.3f" % v for v in self._Statistics['min']),
+                ", ".join("%1.3f" % v for v in self._Statistics['max']))
+
+        self.SetText(text)
+
+    def _GetPosition(self):
+        """Return the point of interest in the current measurement units."""
 
         x, y, z = self._Point
 
-        # intensity annotate
-        numC = self._Input.GetNumberOfScalarComponents()
+        # position annotate
+        if self.measurementUnit != "mm":
+            x0, y0, z0 = self._Input.GetOrigin()
+            xstep, ystep, zstep = self._Input.GetSpacing()
+            x = old_div((x - x0), xstep)
+            y = old_div((y - y0), ystep)
+            z = old_div((z - z0), zstep)
 
+        if self._Dimension == 3:
+            return (x, y, z)
+        return (x, y)
+
+    def _GetPositionTemplate(self):
+        """Return the format string for the position line of the text."""
+
+        if self.measurementUnit == "mm":
+            if self._Dimension == 3:
+                return "(%.3f, %.3f, %.3f) (mm)"
+            return "(%.3f, %.3f) (mm)"
+
+        if self._Dimension == 3:
+            return "(%.1f, %.1f, %.1f) (pixel)"
+        return "(%.1f, %.1f) (pixel)"
+
+    def _GetTextTemplate(self, numC, type):
+        """Return the format string for the annotation text.
+
+        Templates are built once for each combination of number of
+        components, scalar type, measurement unit and dimension.
+
+        """
+        key = (numC, type, self.measurementUnit, self._Dimension)
+
+        template = self._TextTemplates.get(key)
+        if template is not None:
+            self._defaultLabel = template[0]
+            return template[1]
+
+        # intensity annotate
         if numC == 1:
             self._defaultLabel = 'Gray Scale Value'
         elif numC == 3:
@@ -197,25 +745,11 @@ class IntensityAnnotateFactory(AnnotateFactory.AnnotateFactory):
         if type == vtk.VTK_FLOAT:
             line1 = self._defaultLabel + ": " + \
                 (numC - 1) * '%1.3f, ' + '%1.3f\n'
-            line1 = line1 % tuple(self._Intensity)
         else:
             line1 = self._defaultLabel + ": " + \
                 (numC - 1) * '%1.0f, ' + '%1.0f\n'
-            line1 = line1 % tuple(self._Intensity)
 
-        # position annotate
-        if self.measurementUnit == "mm":
-            if self._Dimension == 3:
-                line2 = "(%.3f, %.3f, %.3f) (mm)" % (x, y, z)
-            else:
-                line2 = "(%.3f, %.3f) (mm)" % (x, y)
-        else:
-            x = old_div((x - x0), xstep)
-            y = old_div((y - y0), ystep)
-            z = old_div((z - z0), zstep)
-            if self._Dimension == 3:
-                line2 = "(%.1f, %.1f, %.1f) (pixel)" % (x, y, z)
-            else:
-                line2 = "(%.1f, %.1f) (pixel)" % (x, y)
+        template = line1 + self._GetPositionTemplate()
+        self._TextTemplates[key] = (self._defaultLabel, template)
 
-        self.SetText(line1 + line2)
+        return template
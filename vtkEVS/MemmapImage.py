@@ -0,0 +1,215 @@
+# =========================================================================
+#
+# Copyright (c) 2011-2022 Parallax Innovations Inc.
+#
+# Use, modification and redistribution of the software, in source or
+# binary forms, are permitted provided that the following terms and
+# conditions are met:
+#
+# 1) Redistribution of the source code, in verbatim or modified
+#    form, must retain the above copyright notice, this license,
+#    the following disclaimer, and any notices that refer to this
+#    license and/or the following disclaimer.
+#
+# 2) Redistribution in binary form must include the above copyright
+#    notice, a copy of this license and the following disclaimer
+#    in the documentation or with other materials provided with the
+#    distribution.
+#
+# 3) Modified copies of the source code must be clearly marked as such,
+#    and must not be misrepresented as verbatim copies of the source code.
+#
+# EXCEPT WHEN OTHERWISE STATED IN WRITING BY THE COPYRIGHT HOLDERS AND/OR
+# OTHER PARTIES, THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES PROVIDE THE
+# SOFTWARE "AS IS" WITHOUT EXPRESSED OR IMPLIED WARRANTY INCLUDING, BUT
+# NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE.  IN NO EVENT UNLESS AGREED TO IN WRITING WILL
+# ANY COPYRIGHT HOLDER OR OTHER PARTY WHO MAY MODIFY AND/OR REDISTRIBUTE
+# THE SOFTWARE UNDER THE TERMS OF THIS LICENSE BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED
+# TO, LOSS OF DATA OR DATA BECOMING INACCURATE OR LOSS OF PROFIT OR
+# BUSINESS INTERRUPTION) ARISING IN ANY WAY OUT OF THE USE OR INABILITY TO
+# USE THE SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+#
+# =========================================================================
+
+"""
+MemmapImage - a VTK image source backed by a memory-mapped raw volume.
+
+  MemmapImage maps a raw volume (or wraps an existing NumPy array, such as a
+  numpy.memmap) and produces vtkImageData on demand.  Only the update extent
+  requested by the downstream pipeline is copied out of the map, so an
+  axis-aligned vtkImageReslice, for example, only touches the pages that
+  hold the slab it needs.
+
+  MemmapImage also answers the geometry queries of vtkImageData (origin,
+  spacing, extent, scalar type), and can therefore be given directly to
+  IntensityAnnotateFactory.SetInput(), which probes the map through
+  GetScalarArray() without loading the volume.
+
+Initialization:
+
+  MemmapImage(filename, dimensions, spacing, origin, dtype)
+
+  or
+
+  MemmapImage(array=a, spacing=spacing, origin=origin)
+
+"""
+
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+from vtk.util.vtkAlgorithm import VTKPythonAlgorithmBase
+
+
+class MemmapImage(VTKPythonAlgorithmBase):
+
+    """A streaming VTK image source that reads from a memory-mapped volume.
+
+    Parameters:
+        filename : raw file to map, or None when array is given
+        dimensions : (nx, ny, nz) size of the volume in voxels
+        spacing : (sx, sy, sz) voxel size
+        origin : (x, y, z) position of the first voxel
+        dtype : NumPy data type of the voxels, including byte order
+        components : number of scalar components per voxel
+        offset : size, in bytes, of any header preceding the voxels
+        array : an existing (z, y, x[, c]) NumPy array to use instead of a file
+
+    """
+
+    def __init__(self, filename=None, dimensions=None,
+                 spacing=(1.0, 1.0, 1.0), origin=(0.0, 0.0, 0.0),
+                 dtype=np.uint16, components=1, offset=0, array=None):
+
+        VTKPythonAlgorithmBase.__init__(self, nInputPorts=0, nOutputPorts=1,
+                                        outputType='vtkImageData')
+
+        if array is None:
+            nx, ny, nz = dimensions
+            array = np.memmap(filename, dtype=dtype, mode='r', offset=offset,
+                              shape=(nz, ny, nx, components))
+        elif array.ndim == 3:
+            array = array[..., np.newaxis]
+
+        self._Array = array
+        self._Spacing = tuple(float(s) for s in spacing)
+        self._Origin = tuple(float(o) for o in origin)
+
+    def GetScalarArray(self):
+        """Return the (z, y, x, c) array that backs this image."""
+        return self._Array
+
+    def GetDimensions(self):
+        nz, ny, nx = self._Array.shape[:3]
+        return (nx, ny, nz)
+
+    def GetExtent(self):
+        nx, ny, nz = self.GetDimensions()
+        return (0, nx - 1, 0, ny - 1, 0, nz - 1)
+
+    def GetWholeExtent(self):
+        return self.GetExtent()
+
+    def GetSpacing(self):
+        return self._Spacing
+
+    def SetSpacing(self, *spacing):
+        if len(spacing) == 1:
+            spacing = spacing[0]
+        self._Spacing = tuple(float(s) for s in spacing)
+        self.Modified()
+
+    def GetOrigin(self):
+        return self._Origin
+
+    def SetOrigin(self, *origin):
+        if len(origin) == 1:
+            origin = origin[0]
+        self._Origin = tuple(float(o) for o in origin)
+        self.Modified()
+
+    def GetNumberOfScalarComponents(self):
+        return self._Array.shape[3]
+
+    def GetScalarType(self):
+        return numpy_support.get_vtk_array_type(self._Array.dtype)
+
+    def GetBounds(self):
+        e = self.GetExtent()
+        b = []
+        for i in range(3):
+            b.append(self._Origin[i] + e[2 * i] * self._Spacing[i])
+            b.append(self._Origin[i] + e[2 * i + 1] * self._Spacing[i])
+        return tuple(b)
+
+    def GetSubImage(self, extent):
+        """Copy a sub-extent of the volume into a new vtkImageData.
+
+        Args:
+            extent: (x0, x1, y0, y1, z0, z1) voxel extent, clipped to the
+                volume
+
+        Returns:
+            vtkImageData: the requested voxels, with matching geometry
+
+        """
+        we = self.GetExtent()
+        e = []
+        for i in range(3):
+            e.append(max(extent[2 * i], we[2 * i]))
+            e.append(min(extent[2 * i + 1], we[2 * i + 1]))
+
+        image = vtk.vtkImageData()
+        self._FillImage(image, e)
+
+        return image
+
+    def GetSliceImage(self, axis, index):
+        """Copy a single axis-aligned slice of the volume into a vtkImageData.
+
+        Args:
+            axis (int): 0, 1 or 2 for a slice perpendicular to x, y or z
+            index (int): slice index along that axis
+
+        Returns:
+            vtkImageData: a one-voxel-thick image of the slice
+
+        """
+        e = list(self.GetExtent())
+        e[2 * axis] = e[2 * axis + 1] = index
+        return self.GetSubImage(e)
+
+    def _FillImage(self, image, e):
+        """Copy the voxels within extent e into image."""
+
+        image.SetExtent(e)
+        image.SetSpacing(self._Spacing)
+        image.SetOrigin(self._Origin)
+
+        # only the pages that hold the sub-extent are read from the map
+        block = np.ascontiguousarray(
+            self._Array[e[4]:e[5] + 1, e[2]:e[3] + 1, e[0]:e[1] + 1])
+
+        scalars = numpy_support.numpy_to_vtk(
+            block.reshape(-1, block.shape[3]), deep=1)
+        scalars.SetName('scalars')
+        image.GetPointData().SetScalars(scalars)
+
+    def RequestInformation(self, request, inInfo, outInfo):
+        info = outInfo.GetInformationObject(0)
+        info.Set(vtk.vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT(),
+                 self.GetExtent(), 6)
+        info.Set(vtk.vtkDataObject.SPACING(), self._Spacing, 3)
+        info.Set(vtk.vtkDataObject.ORIGIN(), self._Origin, 3)
+        vtk.vtkDataObject.SetPointDataActiveScalarInfo(
+            info, self.GetScalarType(), self.GetNumberOfScalarComponents())
+        return 1
+
+    def RequestData(self, request, inInfo, outInfo):
+        info = outInfo.GetInformationObject(0)
+        output = vtk.vtkImageData.GetData(info)
+        e = info.Get(vtk.vtkStreamingDemandDrivenPipeline.UPDATE_EXTENT())
+        self._FillImage(output, e)
+        return 1
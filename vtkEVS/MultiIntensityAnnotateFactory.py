@@ -0,0 +1,263 @@
+# =========================================================================
+#
+# Copyright (c) 2011-2022 Parallax Innovations Inc.
+#
+# Use, modification and redistribution of the software, in source or
+# binary forms, are permitted provided that the following terms and
+# conditions are met:
+#
+# 1) Redistribution of the source code, in verbatim or modified
+#    form, must retain the above copyright notice, this license,
+#    the following disclaimer, and any notices that refer to this
+#    license and/or the following disclaimer.
+#
+# 2) Redistribution in binary form must include the above copyright
+#    notice, a copy of this license and the following disclaimer
+#    in the documentation or with other materials provided with the
+#    distribution.
+#
+# 3) Modified copies of the source code must be clearly marked as such,
+#    and must not be misrepresented as verbatim copies of the source code.
+#
+# EXCEPT WHEN OTHERWISE STATED IN WRITING BY THE COPYRIGHT HOLDERS AND/OR
+# OTHER PARTIES, THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES PROVIDE THE
+# SOFTWARE "AS IS" WITHOUT EXPRESSED OR IMPLIED WARRANTY INCLUDING, BUT
+# NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE.  IN NO EVENT UNLESS AGREED TO IN WRITING WILL
+# ANY COPYRIGHT HOLDER OR OTHER PARTY WHO MAY MODIFY AND/OR REDISTRIBUTE
+# THE SOFTWARE UNDER THE TERMS OF THIS LICENSE BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED
+# TO, LOSS OF DATA OR DATA BECOMING INACCURATE OR LOSS OF PROFIT OR
+# BUSINESS INTERRUPTION) ARISING IN ANY WAY OUT OF THE USE OR INABILITY TO
+# USE THE SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+#
+# =========================================================================
+
+from builtins import object
+from . import ImageProbe
+from . import IntensityAnnotateFactory
+import numpy as np
+import vtk
+
+
+class _ProbedVolume(object):
+
+    """One of the co-registered inputs of a MultiIntensityAnnotateFactory."""
+
+    def __init__(self, input, label, shift, scale):
+        self.input = input
+        self.label = label
+        self.shift = shift
+        self.scale = scale
+        self.array = None
+        self.arrayMTime = None
+
+        # only used for inputs that aren't in memory
+        self.reslice = vtk.vtkImageReslice()
+        self.reslice.SetOutputExtent(0, 0, 0, 0, 0, 0)
+        IntensityAnnotateFactory.SetResliceInput(self.reslice, input)
+
+    def GetArray(self):
+        mtime = self.input.GetMTime()
+        if mtime != self.arrayMTime:
+            self.array = ImageProbe.get_scalar_array(self.input)
+            self.arrayMTime = mtime
+        return self.array
+
+
+class MultiIntensityAnnotateFactory(IntensityAnnotateFactory.IntensityAnnotateFactory):
+
+    """Displays the intensities of several co-registered volumes at the point of interest.
+
+    All volumes share one transform and one annotation.  The point of interest
+    is transformed once, the voxel index is computed once for each distinct
+    image geometry, and all volumes are sampled from NumPy views of their
+    scalars, so a mouse move costs no pipeline updates at all for volumes that
+    are in memory.
+
+    The first input also provides the geometry for the position readout.
+
+    Parameters:
+        dimension : 2 or 3. Specify 2D or 3D coordinates to display.
+
+    """
+
+    def __init__(self, dimension=3):
+        IntensityAnnotateFactory.IntensityAnnotateFactory.__init__(
+            self, dimension)
+
+        self._Volumes = []
+        self._Intensities = None
+
+    def AddInput(self, input, label=None, shift=0.0, scale=1.0):
+        """Add a co-registered volume
+
+        Args:
+            input: a vtkImageData or MemmapImage
+            label (str): name shown in the annotation text
+            shift (float): shift applied to the values of this volume
+            scale (float): scale applied to the values of this volume
+
+        """
+        if label is None:
+            label = 'Volume %d' % (len(self._Volumes) + 1)
+
+        volume = _ProbedVolume(input, label, shift, scale)
+        volume.reslice.SetInterpolationMode(self._InterpolationMode)
+        self._Volumes.append(volume)
+
+        if len(self._Volumes) == 1:
+            IntensityAnnotateFactory.IntensityAnnotateFactory.SetInput(
+                self, input)
+            self._Shift = shift
+            self._Scale = scale
+
+    def SetInput(self, input):
+        self.RemoveAllInputs()
+        self.AddInput(input, shift=self._Shift, scale=self._Scale)
+
+    def RemoveAllInputs(self):
+        self._Volumes = []
+        self._Intensities = None
+        IntensityAnnotateFactory.IntensityAnnotateFactory.SetInput(self, None)
+
+    def SetShift(self, shift):
+        """Set the shift applied to the values of the first volume."""
+        IntensityAnnotateFactory.IntensityAnnotateFactory.SetShift(self, shift)
+        if self._Volumes:
+            self._Volumes[0].shift = shift
+
+    def SetScale(self, scale):
+        """Set the scale applied to the values of the first volume."""
+        IntensityAnnotateFactory.IntensityAnnotateFactory.SetScale(self, scale)
+        if self._Volumes:
+            self._Volumes[0].scale = scale
+
+    def SetInputShiftScale(self, index, shift, scale):
+        """Set the shift and scale applied to the values of one volume."""
+        volume = self._Volumes[index]
+        volume.shift = shift
+        volume.scale = scale
+        if index == 0:
+            self._Shift = shift
+            self._Scale = scale
+        self.ClearProbeCache()
+
+    def GetNumberOfInputs(self):
+        return len(self._Volumes)
+
+    def GetInputs(self):
+        return [v.input for v in self._Volumes]
+
+    def SetInterpolationMode(self, mode):
+        IntensityAnnotateFactory.IntensityAnnotateFactory.SetInterpolationMode(
+            self, mode)
+        for volume in self._Volumes:
+            volume.reslice.SetInterpolationMode(self._InterpolationMode)
+
+    def GetIntensities(self):
+        """Return the values at the point of interest
+
+        Returns:
+            list: one list of shifted and scaled components per volume
+
+        """
+        return self._Intensities
+
+    def SetPointOfInterest(self, position):
+        """ Set the point (x,y,z).
+
+        All volumes are sampled and the combined annotate text is set.
+
+        """
+
+        if not position:
+            self._Intensities = None
+            self.RefreshText()
+            return
+
+        if not self._Volumes:
+            return
+
+        values = self.ProbeVolumes([position])
+        self._Intensities = [list(v[0]) for v in values]
+
+        self.RefreshText(self._Intensities[0], position)
+
+    def ProbeVolumes(self, points):
+        """Return the intensities of every volume at a set of points.
+
+        Args:
+            points: N x 3 array of (x, y, z) coordinates
+
+        Returns:
+            list: one N x C array of shifted and scaled values per volume
+
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        points = ImageProbe.transform_points(self._Transform, points)
+
+        # volumes that share a geometry share the voxel indices
+        indices = {}
+
+        values = []
+        for volume in self._Volumes:
+            array = volume.GetArray()
+            background = volume.reslice.GetBackgroundLevel()
+
+            if array is None:
+                v = np.array([self._ResliceVolume(volume, *p) for p in points],
+                             dtype=np.float64)
+            else:
+                matrix = ImageProbe.get_index_matrix(volume.input)
+                key = matrix.tobytes()
+                if key not in indices:
+                    indices[key] = points.dot(matrix[:3, :3].T) + \
+                        matrix[:3, 3]
+                v = ImageProbe.sample(array, indices[key],
+                                      self._InterpolationMode, background)
+
+            values.append(v * volume.scale + volume.shift)
+
+        return values
+
+    def ProbePoints(self, points):
+        """Return the intensities of the first volume at a set of points."""
+        if not self._Volumes:
+            return np.zeros((len(points), 0))
+        return self.ProbeVolumes(points)[0]
+
+    def _ResliceVolume(self, volume, x, y, z):
+        """Probe a volume that isn't in memory at a single point."""
+
+        volume.reslice.SetOutputOrigin(x, y, z)
+        volume.reslice.UpdateExtent((0, 0, 0, 0, 0, 0))
+
+        output = volume.reslice.GetOutput()
+        return [output.GetScalarComponentAsDouble(0, 0, 0, i)
+                for i in range(output.GetNumberOfScalarComponents())]
+
+    def RefreshText(self, intensity=None, point=None):
+        "Update the combined text displayed on the screen."
+
+        self._Intensity = intensity
+        self._Point = point
+
+        if not self._Volumes or self._Point is None or \
+                self._Intensities is None:
+            self.SetText(self._defaultLabel + ":\n(x,y,z)(%s)" % (
+                self.measurementUnit))
+            return
+
+        lines = []
+        for volume, values in zip(self._Volumes, self._Intensities):
+            if volume.input.GetScalarType() == vtk.VTK_FLOAT:
+                fmt = '%1.3f'
+            else:
+                fmt = '%1.0f'
+            lines.append(volume.label + ": " +
+                         ", ".join(fmt % v for v in values))
+
+        lines.append(self._GetPositionTemplate() % self._GetPosition())
+
+        self.SetText("\n".join(lines))
@@ -79,6 +79,7 @@ from past.utils import old_div
 import math
 import vtk
 from vtkAtamai import ActorFactory
+from . import Instrumentation
 
 
 class OrthoPlanesIntersectionsFactory(ActorFactory.ActorFactory):
@@ -203,7 +204,9 @@ class OrthoPlanesIntersectionsFactory(ActorFactory.ActorFactory):
 
     def AddToRenderer(self, renderer):
         ActorFactory.ActorFactory.AddToRenderer(self, renderer)
-        renderer.AddObserver('StartEvent', self.OnRenderEvent)
+        renderer.AddObserver('StartEvent', Instrumentation.Instrumented(
+            'factory/' + Instrumentation.GetCallbackName(self.OnRenderEvent),
+            self.OnRenderEvent))
 
     def OnRenderEvent(self, ren, event):
 
@@ -25,6 +25,7 @@ from builtins import range
 from past.utils import old_div
 import vtk
 from vtkAtamai import ActorFactory
+from . import Instrumentation
 import math
 from vtk.util.colors import tomato, banana
 
@@ -540,7 +541,9 @@ class RectROIFactory(ActorFactory.ActorFactory):
 
     def AddToRenderer(self, renderer):
         ActorFactory.ActorFactory.AddToRenderer(self, renderer)
-        renderer.AddObserver('StartEvent', self.OnRenderEvent)
+        renderer.AddObserver('StartEvent', Instrumentation.Instrumented(
+            'factory/' + Instrumentation.GetCallbackName(self.OnRenderEvent),
+            self.OnRenderEvent))
 
     def RemoveFromRenderer(self, renderer):
         # self.RemoveStencilFromFilter()
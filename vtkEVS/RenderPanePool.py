@@ -0,0 +1,107 @@
+# =========================================================================
+#
+# Copyright (c) 2011-2022 Parallax Innovations Inc.
+#
+# Use, modification and redistribution of the software, in source or
+# binary forms, are permitted provided that the following terms and
+# conditions are met:
+#
+# 1) Redistribution of the source code, in verbatim or modified
+#    form, must retain the above copyright notice, this license,
+#    the following disclaimer, and any notices that refer to this
+#    license and/or the following disclaimer.
+#
+# 2) Redistribution in binary form must include the above copyright
+#    notice, a copy of this license and the following disclaimer
+#    in the documentation or with other materials provided with the
+#    distribution.
+#
+# 3) Modified copies of the source code must be clearly marked as such,
+#    and must not be misrepresented as verbatim copies of the source code.
+#
+# EXCEPT WHEN OTHERWISE STATED IN WRITING BY THE COPYRIGHT HOLDERS AND/OR
+# OTHER PARTIES, THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES PROVIDE THE
+# SOFTWARE "AS IS" WITHOUT EXPRESSED OR IMPLIED WARRANTY INCLUDING, BUT
+# NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE.  IN NO EVENT UNLESS AGREED TO IN WRITING WILL
+# ANY COPYRIGHT HOLDER OR OTHER PARTY WHO MAY MODIFY AND/OR REDISTRIBUTE
+# THE SOFTWARE UNDER THE TERMS OF THIS LICENSE BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED
+# TO, LOSS OF DATA OR DATA BECOMING INACCURATE OR LOSS OF PROFIT OR
+# BUSINESS INTERRUPTION) ARISING IN ANY WAY OUT OF THE USE OR INABILITY TO
+# USE THE SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+#
+# =========================================================================
+
+"""
+RenderPanePool - keep detached render panes for reuse across layouts.
+
+  Creating a render pane builds its renderer, camera and actor factories
+  and loads its input into them.  When the layout of a window changes,
+  panes that are no longer shown can be released to a pool instead of being
+  torn down, and acquired again, with everything they display, when a
+  layout shows a pane with the same name and image index.
+
+  Panes must provide GetName(), GetImageIndex(), Detach(), Attach(parent,
+  viewport) and tearDown(), as EVSRenderPane2D does.
+
+See Also:
+
+  EVSRenderPane2D.EVSRenderPane2DPool
+
+"""
+
+
+class RenderPanePool(object):
+
+    """A pool of detached render panes, keyed by pane name and image index.
+
+    Parameters:
+        paneClass : the class of new panes, called as paneClass(parent, **kw)
+
+    """
+
+    def __init__(self, paneClass):
+        self._PaneClass = paneClass
+        self._Panes = {}
+
+    def Acquire(self, parent, viewport=None, **kw):
+        """Return a pane for parent, reusing a released pane if possible.
+
+        Args:
+            parent: the render window widget to show the pane in
+            viewport (tuple): optional (xmin, ymin, xmax, ymax) viewport
+
+        The other keyword arguments are those of the pane class, and are only
+        used when a new pane is created.
+
+        """
+        key = (kw.get('name'), kw.get('index', 0))
+        panes = self._Panes.get(key)
+        if panes:
+            pane = panes.pop()
+            pane.Attach(parent, viewport)
+            return pane
+
+        pane = self._PaneClass(parent, **kw)
+        if viewport is not None:
+            pane._Renderer.SetViewport(viewport)
+        return pane
+
+    def Release(self, pane):
+        """Detach a pane and keep it for a later Acquire()."""
+
+        pane.Detach()
+        key = (pane.GetName(), pane.GetImageIndex())
+        self._Panes.setdefault(key, []).append(pane)
+
+    def GetNumberOfPanes(self):
+        return sum(len(panes) for panes in self._Panes.values())
+
+    def Clear(self):
+        """Tear down all of the released panes."""
+
+        for panes in self._Panes.values():
+            for pane in panes:
+                pane.tearDown()
+        self._Panes = {}
@@ -0,0 +1,171 @@
+# =========================================================================
+#
+# Copyright (c) 2011-2022 Parallax Innovations Inc.
+#
+# Use, modification and redistribution of the software, in source or
+# binary forms, are permitted provided that the following terms and
+# conditions are met:
+#
+# 1) Redistribution of the source code, in verbatim or modified
+#    form, must retain the above copyright notice, this license,
+#    the following disclaimer, and any notices that refer to this
+#    license and/or the following disclaimer.
+#
+# 2) Redistribution in binary form must include the above copyright
+#    notice, a copy of this license and the following disclaimer
+#    in the documentation or with other materials provided with the
+#    distribution.
+#
+# 3) Modified copies of the source code must be clearly marked as such,
+#    and must not be misrepresented as verbatim copies of the source code.
+#
+# EXCEPT WHEN OTHERWISE STATED IN WRITING BY THE COPYRIGHT HOLDERS AND/OR
+# OTHER PARTIES, THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES PROVIDE THE
+# SOFTWARE "AS IS" WITHOUT EXPRESSED OR IMPLIED WARRANTY INCLUDING, BUT
+# NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE.  IN NO EVENT UNLESS AGREED TO IN WRITING WILL
+# ANY COPYRIGHT HOLDER OR OTHER PARTY WHO MAY MODIFY AND/OR REDISTRIBUTE
+# THE SOFTWARE UNDER THE TERMS OF THIS LICENSE BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED
+# TO, LOSS OF DATA OR DATA BECOMING INACCURATE OR LOSS OF PROFIT OR
+# BUSINESS INTERRUPTION) ARISING IN ANY WAY OUT OF THE USE OR INABILITY TO
+# USE THE SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+#
+# =========================================================================
+
+"""
+RenderScheduler - coalesce render requests into one render per window.
+
+  Rather than rendering synchronously, factories and panes request a
+  render from the scheduler.  The requests are collected, and each render
+  window that was touched is rendered once, when the wx event loop is next
+  idle.  A batch of edits, e.g. inserting a hundred sphere markers from a
+  script, therefore costs a single render.
+
+  If no wx application is running, requests are rendered immediately,
+  unless they are made within a Batch() block, in which case they are
+  rendered when the block exits.
+
+Functions:
+
+  RequestRender(obj, callback) -- render an actor factory, renderer or
+                                  render window on the next idle
+  Flush() -- render all pending requests now
+  Batch() -- context manager that defers rendering until it exits
+
+"""
+
+import collections
+import contextlib
+import logging
+import wx
+
+logger = logging.getLogger(__name__)
+
+
+class RenderScheduler(object):
+
+    """Collect render requests and render each window once per frame."""
+
+    def __init__(self):
+        self._Pending = collections.OrderedDict()
+        self._Callbacks = []
+        self._Scheduled = False
+        self._BatchDepth = 0
+        self._Requests = 0
+        self._Renders = 0
+
+    def RequestRender(self, obj, callback=None):
+        """Request a render of obj on the next idle.
+
+        Args:
+            obj: an ActorFactory (all of the windows it is shown in), a
+                vtkRenderer or a vtkRenderWindow
+            callback: optional function to call once the render is done
+
+        """
+        if hasattr(obj, '_Renderers'):
+            windows = [r.GetRenderWindow() for r in obj._Renderers]
+        elif hasattr(obj, 'GetRenderWindow'):
+            windows = [obj.GetRenderWindow()]
+        else:
+            windows = [obj]
+
+        for window in windows:
+            if window is not None:
+                self._Pending[window] = None
+        if callback is not None:
+            self._Callbacks.append(callback)
+        self._Requests += 1
+
+        if self._BatchDepth:
+            return
+
+        if wx.GetApp() is None:
+            self.Flush()
+        elif not self._Scheduled:
+            self._Scheduled = True
+            wx.CallAfter(self.Flush)
+
+    def Flush(self):
+        """Render every window with a pending request, once."""
+
+        self._Scheduled = False
+
+        pending = list(self._Pending)
+        self._Pending.clear()
+        callbacks = self._Callbacks
+        self._Callbacks = []
+
+        for window in pending:
+            try:
+                window.Render()
+                self._Renders += 1
+            except Exception:
+                logger.exception("RenderScheduler: render failed")
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception("RenderScheduler: callback failed")
+
+    @contextlib.contextmanager
+    def Batch(self):
+        """Defer all render requests until the outermost Batch() exits."""
+
+        self._BatchDepth += 1
+        try:
+            yield self
+        finally:
+            self._BatchDepth -= 1
+            if self._BatchDepth == 0 and (self._Pending or self._Callbacks):
+                self.Flush()
+
+    def GetStatistics(self):
+        """Return the number of render 'requests' and actual 'renders'."""
+        return {'requests': self._Requests, 'renders': self._Renders}
+
+    def ResetStatistics(self):
+        self._Requests = 0
+        self._Renders = 0
+
+
+# the scheduler shared by all factories and panes
+_Scheduler = RenderScheduler()
+
+
+def GetRenderScheduler():
+    return _Scheduler
+
+
+def RequestRender(obj, callback=None):
+    _Scheduler.RequestRender(obj, callback)
+
+
+def Flush():
+    _Scheduler.Flush()
+
+
+def Batch():
+    return _Scheduler.Batch()
@@ -0,0 +1,252 @@
+# =========================================================================
+#
+# Copyright (c) 2011-2022 Parallax Innovations Inc.
+#
+# Use, modification and redistribution of the software, in source or
+# binary forms, are permitted provided that the following terms and
+# conditions are met:
+#
+# 1) Redistribution of the source code, in verbatim or modified
+#    form, must retain the above copyright notice, this license,
+#    the following disclaimer, and any notices that refer to this
+#    license and/or the following disclaimer.
+#
+# 2) Redistribution in binary form must include the above copyright
+#    notice, a copy of this license and the following disclaimer
+#    in the documentation or with other materials provided with the
+#    distribution.
+#
+# 3) Modified copies of the source code must be clearly marked as such,
+#    and must not be misrepresented as verbatim copies of the source code.
+#
+# EXCEPT WHEN OTHERWISE STATED IN WRITING BY THE COPYRIGHT HOLDERS AND/OR
+# OTHER PARTIES, THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES PROVIDE THE
+# SOFTWARE "AS IS" WITHOUT EXPRESSED OR IMPLIED WARRANTY INCLUDING, BUT
+# NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE.  IN NO EVENT UNLESS AGREED TO IN WRITING WILL
+# ANY COPYRIGHT HOLDER OR OTHER PARTY WHO MAY MODIFY AND/OR REDISTRIBUTE
+# THE SOFTWARE UNDER THE TERMS OF THIS LICENSE BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED
+# TO, LOSS OF DATA OR DATA BECOMING INACCURATE OR LOSS OF PROFIT OR
+# BUSINESS INTERRUPTION) ARISING IN ANY WAY OUT OF THE USE OR INABILITY TO
+# USE THE SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+#
+# =========================================================================
+
+"""
+ResliceBenchmark - measure how slice reslicing scales with thread count.
+
+  The reslicers of EVSSlicePlaneFactory can be given a thread count and a
+  split mode with SetNumberOfThreads() and SetSplitMode().  This module
+  times vtkImageReslice, set up the way the slice planes use it, on
+  synthetic volumes of several sizes, for axial and oblique planes, over a
+  range of thread counts, and reports the throughput and the speedup over
+  a single thread.
+
+  Run it from the command line, e.g.
+
+    python -m vtkEVS.ResliceBenchmark --sizes 128 256 512 --threads 1 2 4 8 16 32
+
+See Also:
+
+  EVSSlicePlaneFactory.SetNumberOfThreads, EVSSlicePlaneFactory.SetSplitMode
+
+"""
+
+import argparse
+import json
+import logging
+import math
+import sys
+import time
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+
+logger = logging.getLogger(__name__)
+
+# split modes of vtkThreadedImageAlgorithm
+SPLIT_MODES = {'slab': 0, 'beam': 1, 'block': 2}
+
+# interpolation modes of vtkImageReslice
+INTERPOLATION_MODES = {'nearest': vtk.VTK_RESLICE_NEAREST,
+                       'linear': vtk.VTK_RESLICE_LINEAR,
+                       'cubic': vtk.VTK_RESLICE_CUBIC}
+
+# plane orientations, as a rotation of the axial plane (axis, degrees)
+ORIENTATIONS = {'axial': None,
+                'oblique': ((1.0, 1.0, 0.0), 30.0)}
+
+
+def MakeVolume(size, scalar_type=np.int16):
+    """Return a cubic vtkImageData of the given size, with smooth structure.
+
+    The content doesn't affect the speed of linear interpolation, but a
+    CT-like short volume keeps the memory traffic realistic.
+
+    """
+    x = np.linspace(-math.pi, math.pi, size, dtype=np.float32)
+    volume = (1000.0 * np.sin(3 * x)[:, None, None] *
+              np.cos(2 * x)[None, :, None] *
+              np.sin(x)[None, None, :]).astype(scalar_type)
+
+    image = vtk.vtkImageData()
+    image.SetDimensions(size, size, size)
+    image.SetSpacing(1.0, 1.0, 1.0)
+    image.GetPointData().SetScalars(
+        numpy_support.numpy_to_vtk(volume.ravel(), deep=True))
+    return image
+
+
+def MakeReslicer(image, orientation='axial', interpolation='linear'):
+    """Return a vtkImageReslice that cuts a 2D slice through the image."""
+
+    size = image.GetDimensions()[0]
+    center = [0.5 * (size - 1)] * 3
+
+    transform = vtk.vtkTransform()
+    transform.Translate(center)
+    rotation = ORIENTATIONS[orientation]
+    if rotation is not None:
+        axis, angle = rotation
+        transform.RotateWXYZ(angle, axis)
+
+    reslicer = vtk.vtkImageReslice()
+    reslicer.SetInputData(image)
+    reslicer.SetResliceAxes(transform.GetMatrix())
+    reslicer.SetOutputDimensionality(2)
+    reslicer.SetOutputSpacing(1.0, 1.0, 1.0)
+    reslicer.SetOutputOrigin(-center[0], -center[1], 0.0)
+    reslicer.SetOutputExtent(0, size - 1, 0, size - 1, 0, 0)
+    reslicer.SetInterpolationMode(INTERPOLATION_MODES[interpolation])
+    return reslicer
+
+
+def TimeReslice(reslicer, threads, split_mode=0, slices=50, slab=1):
+    """Return the seconds taken per slice, over a run of adjacent slices.
+
+    The plane is stepped through the volume like a user paging through
+    slices, so that every update does the full reslice.
+
+    """
+    reslicer.SetNumberOfThreads(threads)
+    reslicer.SetSplitMode(split_mode)
+    reslicer.SetSlabNumberOfSlices(slab)
+
+    axes = vtk.vtkMatrix4x4()
+    axes.DeepCopy(reslicer.GetResliceAxes())
+    normal = [axes.GetElement(i, 2) for i in range(3)]
+    start = [axes.GetElement(i, 3) for i in range(3)]
+    first = -(slices // 2)
+
+    # warm up the pipeline and the thread pool
+    reslicer.Update()
+
+    t0 = time.perf_counter()
+    for i in range(first, first + slices):
+        for j in range(3):
+            axes.SetElement(j, 3, start[j] + i * normal[j])
+        reslicer.GetResliceAxes().DeepCopy(axes)
+        reslicer.Update()
+    elapsed = time.perf_counter() - t0
+
+    for j in range(3):
+        axes.SetElement(j, 3, start[j])
+    reslicer.GetResliceAxes().DeepCopy(axes)
+    return elapsed / slices
+
+
+def RunBenchmark(sizes=(128, 256, 512), threads=None, split_mode='slab',
+                 orientations=('axial', 'oblique'), interpolation='linear',
+                 slices=50, slab=1, callback=None):
+    """Time reslicing for each size, orientation and thread count.
+
+    Returns a list of dicts with the size, orientation, thread count,
+    milliseconds per slice, output megapixels per second and the speedup
+    relative to the first thread count.  If given, callback(result) is
+    called as each result is measured.
+
+    """
+    if threads is None:
+        maxthreads = vtk.vtkMultiThreader.GetGlobalDefaultNumberOfThreads()
+        threads = [1]
+        while threads[-1] * 2 <= maxthreads:
+            threads.append(threads[-1] * 2)
+        if threads[-1] != maxthreads:
+            threads.append(maxthreads)
+
+    results = []
+    for size in sizes:
+        image = MakeVolume(size)
+        for orientation in orientations:
+            reslicer = MakeReslicer(image, orientation, interpolation)
+            baseline = None
+            for n in threads:
+                seconds = TimeReslice(reslicer, n, SPLIT_MODES[split_mode],
+                                      slices, slab)
+                if baseline is None:
+                    baseline = seconds
+                result = {'size': size,
+                          'orientation': orientation,
+                          'threads': n,
+                          'split_mode': split_mode,
+                          'slab': slab,
+                          'ms_per_slice': 1000.0 * seconds,
+                          'mpixels_per_second': size * size / seconds / 1e6,
+                          'speedup': baseline / seconds}
+                results.append(result)
+                if callback:
+                    callback(result)
+        del image
+
+    return results
+
+
+def FormatResult(result):
+    return ("{size:5d}^3 {orientation:8s} {threads:4d} {ms_per_slice:10.3f} "
+            "{mpixels_per_second:10.1f} {speedup:8.2f}".format(**result))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Measure vtkImageReslice throughput against thread count.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[128, 256, 512],
+                        help="edge lengths of the synthetic volumes")
+    parser.add_argument('--threads', type=int, nargs='+',
+                        help="thread counts (default: powers of 2 up to the "
+                        "number of cores)")
+    parser.add_argument('--split-mode', choices=sorted(SPLIT_MODES),
+                        default='slab')
+    parser.add_argument('--orientations', nargs='+',
+                        choices=sorted(ORIENTATIONS),
+                        default=['axial', 'oblique'])
+    parser.add_argument('--interpolation', default='linear',
+                        choices=sorted(INTERPOLATION_MODES))
+    parser.add_argument('--slices', type=int, default=50,
+                        help="number of slices timed per measurement")
+    parser.add_argument('--slab', type=int, default=1,
+                        help="number of slices in a thick slab")
+    parser.add_argument('--json', metavar='FILE',
+                        help="also write the results to a JSON file")
+    args = parser.parse_args(argv)
+
+    print("{:>7s} {:8s} {:>4s} {:>10s} {:>10s} {:>8s}".format(
+        'size', 'plane', 'thr', 'ms/slice', 'Mpix/s', 'speedup'))
+
+    def report(result):
+        print(FormatResult(result))
+        sys.stdout.flush()
+
+    results = RunBenchmark(args.sizes, args.threads, args.split_mode,
+                           args.orientations, args.interpolation,
+                           args.slices, args.slab, callback=report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,535 @@
+# =========================================================================
+#
+# Copyright (c) 2011-2022 Parallax Innovations Inc.
+#
+# Use, modification and redistribution of the software, in source or
+# binary forms, are permitted provided that the following terms and
+# conditions are met:
+#
+# 1) Redistribution of the source code, in verbatim or modified
+#    form, must retain the above copyright notice, this license,
+#    the following disclaimer, and any notices that refer to this
+#    license and/or the following disclaimer.
+#
+# 2) Redistribution in binary form must include the above copyright
+#    notice, a copy of this license and the following disclaimer
+#    in the documentation or with other materials provided with the
+#    distribution.
+#
+# 3) Modified copies of the source code must be clearly marked as such,
+#    and must not be misrepresented as verbatim copies of the source code.
+#
+# EXCEPT WHEN OTHERWISE STATED IN WRITING BY THE COPYRIGHT HOLDERS AND/OR
+# OTHER PARTIES, THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES PROVIDE THE
+# SOFTWARE "AS IS" WITHOUT EXPRESSED OR IMPLIED WARRANTY INCLUDING, BUT
+# NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE.  IN NO EVENT UNLESS AGREED TO IN WRITING WILL
+# ANY COPYRIGHT HOLDER OR OTHER PARTY WHO MAY MODIFY AND/OR REDISTRIBUTE
+# THE SOFTWARE UNDER THE TERMS OF THIS LICENSE BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED
+# TO, LOSS OF DATA OR DATA BECOMING INACCURATE OR LOSS OF PROFIT OR
+# BUSINESS INTERRUPTION) ARISING IN ANY WAY OUT OF THE USE OR INABILITY TO
+# USE THE SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+#
+# =========================================================================
+
+"""
+SliceCache - caching and background prefetching of resliced images.
+
+  A SliceCache holds resliced 2D images in a memory-bounded, thread-safe
+  LRU cache.  A ResliceCacheStage is placed between a vtkImageReslice and
+  the filters that consume its output: when the image for the current
+  reslice geometry is already in the cache it is handed downstream
+  directly, otherwise the reslicer is run and its output is cached.
+
+  A SlicePrefetcher runs private copies of a reslicer on a worker thread,
+  filling the cache with the slices that are expected to be displayed
+  next, e.g. the neighbours of the current slice in the scroll direction.
+  Inputs that are streamed, i.e. that only hold the extent needed for the
+  current slice, are not prefetched.
+
+  Cache entries are keyed by GetSliceKey(), i.e. by the reslice
+  transform, the index of the slice along its normal, the pipeline
+  modified time of the input, and the output geometry (which reflects
+  the downsample factor) and interpolation mode of the reslicer.  Returning to a
+  recently viewed slice is therefore served from the cache.
+
+See Also:
+
+  EVSSlicePlaneFactory
+
+"""
+
+import collections
+import logging
+import math
+import queue
+import threading
+import vtk
+from vtk.util.vtkAlgorithm import VTKPythonAlgorithmBase
+
+logger = logging.getLogger(__name__)
+
+# vtkImageReslice settings that are copied to private reslicers
+_RESLICE_SETTINGS = ('InterpolationMode', 'OutputDimensionality',
+                     'OutputScalarType', 'BackgroundColor', 'Wrap', 'Mirror',
+                     'Border', 'SlabMode', 'SlabNumberOfSlices',
+                     'SlabTrapezoidIntegration', 'SlabSliceSpacingFraction',
+                     'NumberOfThreads', 'SplitMode')
+
+
+def _GetResliceMatrix(reslicer):
+    """Return the 4x4 reslice axes of reslicer, combined with its transform.
+
+    Returns None if the reslice transform is not linear.
+
+    """
+    matrix = vtk.vtkMatrix4x4()
+    axes = reslicer.GetResliceAxes()
+    if axes is not None:
+        matrix.DeepCopy(axes)
+
+    transform = reslicer.GetResliceTransform()
+    if transform is not None:
+        if not isinstance(transform, vtk.vtkLinearTransform):
+            return None
+        transform.Update()
+        vtk.vtkMatrix4x4.Multiply4x4(transform.GetMatrix(), matrix, matrix)
+
+    return matrix
+
+
+def GetResliceSettings(reslicer):
+    """Return the settings that determine the output of reslicer.
+
+    The settings are returned as a dict keyed by vtkImageReslice property
+    name, so that they can be applied to a private copy of the reslicer
+    through its Set methods.  The reslice axes and transform aren't
+    included, see GetSliceMatrix().  The reslicer's information must be up
+    to date.
+
+    """
+    settings = dict((s, getattr(reslicer, 'Get' + s)())
+                    for s in _RESLICE_SETTINGS
+                    if hasattr(reslicer, 'Get' + s))
+
+    outInfo = reslicer.GetOutputInformation(0)
+    settings['OutputExtent'] = outInfo.Get(
+        vtk.vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT())
+    settings['OutputSpacing'] = outInfo.Get(vtk.vtkDataObject.SPACING())
+    settings['OutputOrigin'] = outInfo.Get(vtk.vtkDataObject.ORIGIN())
+
+    return settings
+
+
+def GetSliceMatrix(reslicer, offset=0):
+    """Return the reslice matrix of reslicer, shifted along its normal.
+
+    The reslicer's information must be up to date.
+
+    Args:
+        reslicer (vtkImageReslice): the reslicer
+        offset (int): number of slices to shift the matrix by, at the
+            spacing of the input along the normal
+
+    Returns:
+        vtkMatrix4x4: the reslice axes combined with the reslice transform,
+        or None if the transform is not linear
+
+    """
+    matrix = _GetResliceMatrix(reslicer)
+    if matrix is None or offset == 0:
+        return matrix
+
+    inInfo = reslicer.GetInputInformation(0, 0)
+    spacing = inInfo.Get(vtk.vtkDataObject.SPACING()) or (1.0, 1.0, 1.0)
+
+    normal = [matrix.GetElement(i, 2) for i in range(3)]
+    length = math.sqrt(sum(n * n for n in normal))
+    step = length / math.sqrt(
+        sum((n / s) ** 2 for n, s in zip(normal, spacing)))
+
+    for i in range(3):
+        matrix.SetElement(i, 3, matrix.GetElement(i, 3) +
+                          offset * step * normal[i] / length)
+
+    return matrix
+
+
+def _GetInputMTime(reslicer):
+    """Return the pipeline modified time of the input of reslicer.
+
+    This covers every filter upstream of the reslicer, and the data given
+    to SetInputData(), but unlike the modified time of the input data it
+    doesn't change when a streamed input re-executes for a new extent.
+    The reslicer's information must be up to date.
+
+    """
+    if reslicer.GetNumberOfInputConnections(0) == 0:
+        return None
+
+    return reslicer.GetInputAlgorithm().GetExecutive().GetPipelineMTime()
+
+
+def GetSliceKey(reslicer, name=0, offset=0):
+    """Return the cache key for the image reslicer produces.
+
+    The reslicer's information must be up to date.
+
+    Args:
+        reslicer (vtkImageReslice): the reslicer
+        name: identifies the reslicer within its cache
+        offset (int): number of slices to shift the reslice axes by, along
+            their normal
+
+    Returns:
+        tuple: (name, transform, slice index, input mtime, output
+        geometry), or None if the image can't be cached
+
+    """
+    mtime = _GetInputMTime(reslicer)
+    matrix = _GetResliceMatrix(reslicer)
+    if mtime is None or matrix is None:
+        return None
+
+    inInfo = reslicer.GetInputInformation(0, 0)
+    spacing = inInfo.Get(vtk.vtkDataObject.SPACING()) or (1.0, 1.0, 1.0)
+    origin = inInfo.Get(vtk.vtkDataObject.ORIGIN()) or (0.0, 0.0, 0.0)
+
+    normal = [matrix.GetElement(i, 2) for i in range(3)]
+    length = math.sqrt(sum(n * n for n in normal))
+    if length == 0:
+        return None
+    normal = [n / length for n in normal]
+
+    # the distance between slices along the normal
+    step = 1.0 / math.sqrt(sum((n / s) ** 2 for n, s in zip(normal, spacing)))
+
+    position = sum((matrix.GetElement(i, 3) - origin[i]) * normal[i]
+                   for i in range(3))
+    index = position / step + offset
+
+    # planes that aren't on a slice are keyed by their exact position
+    if abs(index - round(index)) < 1e-3:
+        index = int(round(index))
+    else:
+        index = round(index, 6)
+
+    # the orientation, and the position of the axes within the plane
+    transform = tuple(round(matrix.GetElement(i, j), 6)
+                      for i in range(3) for j in range(3)) + \
+        tuple(round(matrix.GetElement(i, 3) - origin[i] -
+                    position * normal[i], 6) for i in range(3))
+
+    outInfo = reslicer.GetOutputInformation(0)
+    geometry = (
+        tuple(outInfo.Get(vtk.vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT())),
+        tuple(outInfo.Get(vtk.vtkDataObject.SPACING())),
+        tuple(outInfo.Get(vtk.vtkDataObject.ORIGIN())),
+        reslicer.GetInterpolationMode(),
+        reslicer.GetSlabMode(), reslicer.GetSlabNumberOfSlices(),
+        reslicer.GetSlabSliceSpacingFraction())
+
+    return (name, transform, index, mtime, geometry)
+
+
+class SliceCache(object):
+
+    """A thread-safe LRU cache of vtkImageData, bounded by memory size.
+
+    Parameters:
+        size : maximum total size of the cached images, in bytes
+
+    """
+
+    def __init__(self, size=64 * 1024 * 1024):
+        self._Lock = threading.Lock()
+        self._Images = collections.OrderedDict()
+        self._Size = size
+        self._Bytes = 0
+        self._Hits = 0
+        self._Misses = 0
+
+    def SetSize(self, size):
+        """Set the maximum total size of the cached images, in bytes."""
+        with self._Lock:
+            self._Size = size
+            self._Trim()
+
+    def GetSize(self):
+        return self._Size
+
+    def GetMemorySize(self):
+        """Return the total size of the cached images, in bytes."""
+        return self._Bytes
+
+    def __len__(self):
+        return len(self._Images)
+
+    def __contains__(self, key):
+        with self._Lock:
+            return key in self._Images
+
+    def Get(self, key):
+        """Return the image for key, or None if it isn't cached."""
+
+        with self._Lock:
+            entry = self._Images.get(key)
+            if entry is None:
+                self._Misses += 1
+                return None
+            self._Images.move_to_end(key)
+            self._Hits += 1
+            return entry[0]
+
+    def Put(self, key, image):
+        """Add an image to the cache, evicting the least recently used."""
+
+        nbytes = image.GetActualMemorySize() * 1024
+
+        with self._Lock:
+            if key in self._Images:
+                self._Bytes -= self._Images.pop(key)[1]
+            if nbytes > self._Size:
+                return
+            self._Images[key] = (image, nbytes)
+            self._Bytes += nbytes
+            self._Trim()
+
+    def Clear(self):
+        with self._Lock:
+            self._Images.clear()
+            self._Bytes = 0
+
+    def Discard(self, predicate):
+        """Remove all of the images whose key satisfies predicate(key)."""
+
+        with self._Lock:
+            for key in [k for k in self._Images if predicate(k)]:
+                self._Bytes -= self._Images.pop(key)[1]
+
+    def GetStatistics(self):
+        """Return the cache statistics.
+
+        Returns:
+            dict: 'hits', 'misses', 'hit_rate', the number of 'entries',
+            the 'bytes' held and the 'size' budget in bytes
+
+        """
+        lookups = self._Hits + self._Misses
+        return {'hits': self._Hits,
+                'misses': self._Misses,
+                'hit_rate': self._Hits / float(lookups) if lookups else 0.0,
+                'entries': len(self._Images),
+                'bytes': self._Bytes,
+                'size': self._Size}
+
+    def ResetStatistics(self):
+        self._Hits = 0
+        self._Misses = 0
+
+    def _Trim(self):
+        while self._Bytes > self._Size and self._Images:
+            key, (image, nbytes) = self._Images.popitem(last=False)
+            self._Bytes -= nbytes
+
+
+class ResliceCacheStage(VTKPythonAlgorithmBase):
+
+    """Serve the output of a vtkImageReslice from a SliceCache.
+
+    The stage is connected to the output of the reslicer, so the pipeline
+    re-executes it whenever anything upstream is modified.  When the image
+    for the current slice is in the cache, the stage requests an empty
+    extent from the reslicer so that nothing upstream does any work, and
+    passes the cached image downstream instead.
+
+    Parameters:
+        reslicer : the vtkImageReslice to cache the output of
+        cache : the SliceCache to use
+        name : identifies the reslicer within the cache
+
+    """
+
+    def __init__(self, reslicer, cache, name=0):
+        VTKPythonAlgorithmBase.__init__(self, nInputPorts=1,
+                                        inputType='vtkImageData',
+                                        nOutputPorts=1,
+                                        outputType='vtkImageData')
+        self._Reslicer = reslicer
+        self._Cache = cache
+        self._Name = name
+        self._Key = None
+        self._Image = None
+        self._LastIndex = None
+        self._LastMTime = None
+        self._Direction = 0
+
+        self.SetInputConnection(reslicer.GetOutputPort())
+
+    def GetReslicer(self):
+        return self._Reslicer
+
+    def GetDirection(self):
+        """Return +1 or -1 for the direction the slice index last moved in."""
+        return self._Direction
+
+    def RequestInformation(self, request, inInfo, outInfo):
+        resliceInfo = inInfo[0].GetInformationObject(0)
+        info = outInfo.GetInformationObject(0)
+        info.CopyEntry(resliceInfo,
+                       vtk.vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT())
+        info.CopyEntry(resliceInfo, vtk.vtkDataObject.SPACING())
+        info.CopyEntry(resliceInfo, vtk.vtkDataObject.ORIGIN())
+        info.CopyEntry(resliceInfo, vtk.vtkDataObject.POINT_DATA_VECTOR(), 1)
+        return 1
+
+    def RequestUpdateExtent(self, request, inInfo, outInfo):
+        # the information of the reslicer and of its input is up to date
+        # at this point, but the reslicer hasn't executed yet
+        key = self._Key = GetSliceKey(self._Reslicer, self._Name)
+        self._Image = None
+        if key is None:
+            return 1
+
+        self._Image = self._Cache.Get(key)
+
+        # images of an older input will never be shown again
+        name, mtime = self._Name, key[3]
+        if self._LastMTime is not None and mtime != self._LastMTime:
+            self._Cache.Discard(lambda k: k[0] == name and k[3] != mtime)
+        self._LastMTime = mtime
+
+        # keep track of the scroll direction, for prefetching
+        index = key[2]
+        if self._LastIndex is not None and index != self._LastIndex:
+            self._Direction = 1 if index > self._LastIndex else -1
+        self._LastIndex = index
+
+        if self._Image is not None:
+            inInfo[0].GetInformationObject(0).Set(
+                vtk.vtkStreamingDemandDrivenPipeline.UPDATE_EXTENT(),
+                (0, -1, 0, -1, 0, -1), 6)
+        return 1
+
+    def RequestData(self, request, inInfo, outInfo):
+        output = vtk.vtkImageData.GetData(outInfo.GetInformationObject(0))
+
+        image = self._Image
+        self._Image = None
+        if image is None:
+            image = vtk.vtkImageData()
+            image.ShallowCopy(vtk.vtkImageData.GetData(inInfo[0]))
+            if self._Key is not None:
+                self._Cache.Put(self._Key, image)
+
+        output.ShallowCopy(image)
+        return 1
+
+
+class SlicePrefetcher(object):
+
+    """Reslice the slices around the current one on a worker thread.
+
+    Parameters:
+        cache : the SliceCache to fill
+
+    """
+
+    def __init__(self, cache):
+        self._Cache = cache
+        self._Queue = queue.Queue()
+        self._Generation = 0
+        self._Thread = None
+        self._Reslicer = vtk.vtkImageReslice()
+
+    def Prefetch(self, reslicer, name, offsets):
+        """Queue the slices at the given offsets from the current slice.
+
+        Any slices that were queued by previous calls and have not been
+        computed yet are discarded.  Must be called on the main thread.
+
+        Args:
+            reslicer (vtkImageReslice): the reslicer that displays the slice
+            name: identifies the reslicer within the cache
+            offsets (list of int): slices to compute, relative to the current
+                slice, in order of priority
+
+        """
+        self._Generation += 1
+
+        reslicer.UpdateInformation()
+        matrix = _GetResliceMatrix(reslicer)
+        input = reslicer.GetInput()
+        if matrix is None or input is None:
+            return
+
+        # a streamed input only holds the extent needed for the current
+        # slice, and the neighbours can't be resliced from it
+        inInfo = reslicer.GetInputInformation(0, 0)
+        wholeExtent = inInfo.Get(
+            vtk.vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT())
+        if wholeExtent is not None and \
+                tuple(input.GetExtent()) != tuple(wholeExtent):
+            return
+
+        # the worker reslices a snapshot, so that the main pipeline can
+        # update the input while the worker runs
+        snapshot = vtk.vtkImageData()
+        snapshot.ShallowCopy(input)
+
+        settings = GetResliceSettings(reslicer)
+
+        for offset in offsets:
+            key = GetSliceKey(reslicer, name, offset)
+            if key is None or key in self._Cache:
+                continue
+
+            axes = GetSliceMatrix(reslicer, offset)
+            self._Queue.put((self._Generation, key, snapshot, axes, settings))
+
+        if self._Thread is None:
+            self._Thread = threading.Thread(
+                target=self._Run, name='SlicePrefetcher', daemon=True)
+            self._Thread.start()
+
+    def Cancel(self):
+        """Discard any slices that have been queued but not computed."""
+        self._Generation += 1
+
+    def Stop(self):
+        """Stop the worker thread."""
+        self.Cancel()
+        if self._Thread is not None:
+            self._Queue.put(None)
+            self._Thread.join()
+            self._Thread = None
+
+    def _Run(self):
+        while True:
+            job = self._Queue.get()
+            if job is None:
+                return
+
+            generation, key, image, axes, settings = job
+            if generation != self._Generation or key in self._Cache:
+                continue
+
+            try:
+                self._Cache.Put(key, self._Reslice(image, axes, settings))
+            except Exception:
+                logger.exception("SlicePrefetcher: reslice failed")
+
+    def _Reslice(self, image, axes, settings):
+        reslicer = self._Reslicer
+        reslicer.SetInputData(image)
+        reslicer.SetResliceAxes(axes)
+        for name, value in settings.items():
+            getattr(reslicer, 'Set' + name)(value)
+        reslicer.Update()
+
+        output = vtk.vtkImageData()
+        output.ShallowCopy(reslicer.GetOutput())
+        reslicer.SetInputData(None)
+
+        return output
@@ -0,0 +1,418 @@
+# =========================================================================
+#
+# Copyright (c) 2011-2022 Parallax Innovations Inc.
+#
+# Use, modification and redistribution of the software, in source or
+# binary forms, are permitted provided that the following terms and
+# conditions are met:
+#
+# 1) Redistribution of the source code, in verbatim or modified
+#    form, must retain the above copyright notice, this license,
+#    the following disclaimer, and any notices that refer to this
+#    license and/or the following disclaimer.
+#
+# 2) Redistribution in binary form must include the above copyright
+#    notice, a copy of this license and the following disclaimer
+#    in the documentation or with other materials provided with the
+#    distribution.
+#
+# 3) Modified copies of the source code must be clearly marked as such,
+#    and must not be misrepresented as verbatim copies of the source code.
+#
+# EXCEPT WHEN OTHERWISE STATED IN WRITING BY THE COPYRIGHT HOLDERS AND/OR
+# OTHER PARTIES, THE COPYRIGHT HOLDERS AND/OR OTHER PARTIES PROVIDE THE
+# SOFTWARE "AS IS" WITHOUT EXPRESSED OR IMPLIED WARRANTY INCLUDING, BUT
+# NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE.  IN NO EVENT UNLESS AGREED TO IN WRITING WILL
+# ANY COPYRIGHT HOLDER OR OTHER PARTY WHO MAY MODIFY AND/OR REDISTRIBUTE
+# THE SOFTWARE UNDER THE TERMS OF THIS LICENSE BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED
+# TO, LOSS OF DATA OR DATA BECOMING INACCURATE OR LOSS OF PROFIT OR
+# BUSINESS INTERRUPTION) ARISING IN ANY WAY OUT OF THE USE OR INABILITY TO
+# USE THE SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGES.
+#
+# =========================================================================
+
+"""
+SliceStackExporter - write the slices of a 2D pane to a PNG or TIFF stack.
+
+  SliceStackExporter renders a range of slices along the slice plane of an
+  EVSRenderPane2D in an offscreen render window of its own, and reads each
+  one back with vtkWindowToImageFilter.  The captured frames are encoded and
+  written by a pool of worker processes, while the main thread goes on
+  rendering the next slice.
+
+  The offscreen scene has private copies of the reslicers of the plane,
+  taken when the export is created, and a copy of the pane's camera.  The
+  plane itself is never moved and the pane's window is never rendered, so
+  the user can go on working in the pane, or in the other views of the
+  plane, during the export.  Only the slice images are exported, coloured
+  with the lookup tables of the plane; annotations and the other actors of
+  the pane are not.
+
+  When a wx application is running, one slice is captured per pass of the
+  event loop, so the user interface stays responsive during long exports.
+
+See Also:
+
+  EVSRenderPane2D.ExportSlices
+
+"""
+
+import collections
+import concurrent.futures
+import logging
+import math
+import multiprocessing
+import os
+import vtk
+import wx
+from vtk.util import numpy_support
+from . import SliceCache
+
+logger = logging.getLogger(__name__)
+
+# writers for the supported file types
+_WRITERS = {'.png': 'vtkPNGWriter',
+            '.tif': 'vtkTIFFWriter',
+            '.tiff': 'vtkTIFFWriter'}
+
+
+def _WriteFrame(filename, frame):
+    """Write a (height, width, components) uint8 array to an image file.
+
+    This runs in the worker processes.
+
+    """
+    height, width, components = frame.shape
+
+    image = vtk.vtkImageData()
+    image.SetDimensions(width, height, 1)
+    scalars = numpy_support.numpy_to_vtk(
+        frame.reshape(-1, components), deep=1)
+    image.GetPointData().SetScalars(scalars)
+
+    ext = os.path.splitext(filename)[1].lower()
+    writer = getattr(vtk, _WRITERS[ext])()
+    writer.SetInputData(image)
+    writer.SetFileName(filename)
+    writer.Write()
+
+    return filename
+
+
+def _FindLookupTable(factory, reslicer):
+    """Return the lookup table that colours the output of reslicer on screen.
+
+    The pipelines of the factory's actors are searched for the filter that
+    consumes the output of the reslicer, or of the slice cache stage that
+    follows it.
+
+    Returns:
+        vtkScalarsToColors: the lookup table of that filter, or None
+
+    """
+    pending = []
+    for actors in factory._ActorDict.values():
+        for actor in actors:
+            for method in ('GetTexture', 'GetMapper'):
+                if hasattr(actor, method) and getattr(actor, method)():
+                    pending.append(getattr(actor, method)())
+
+    visited = set()
+    while pending:
+        algorithm = pending.pop()
+        if algorithm in visited:
+            continue
+        visited.add(algorithm)
+
+        for port in range(algorithm.GetNumberOfInputPorts()):
+            for i in range(algorithm.GetNumberOfInputConnections(port)):
+                producer = algorithm.GetInputConnection(port, i).GetProducer()
+                if producer is reslicer or (
+                        isinstance(producer, SliceCache.ResliceCacheStage) and
+                        producer.GetReslicer() is reslicer):
+                    if hasattr(algorithm, 'GetLookupTable'):
+                        return algorithm.GetLookupTable()
+                    return None
+                pending.append(producer)
+
+    return None
+
+
+class SliceStackExporter(object):
+
+    """Export a range of slices from a 2D pane as a stack of images.
+
+    Parameters:
+        pane : the EVSRenderPane2D to export from
+        filename : a .png or .tif file name; for a stack, the slice index is
+            inserted before the extension, or substituted for a '%d' style
+            format in the name
+        first, last : range of slice indices to export, inclusive; defaults
+            to the displayed slice
+        step : export every step'th slice
+        magnification : integer scale factor for the captured images
+        processes : number of encoding processes, defaults to the CPU count,
+            and is limited to the number of slices
+
+    """
+
+    def __init__(self, pane, filename, first=None, last=None, step=1,
+                 magnification=1, processes=None):
+
+        ext = os.path.splitext(filename)[1].lower()
+        if ext not in _WRITERS:
+            raise ValueError(
+                "SliceStackExporter: unsupported file type '{}'".format(ext))
+
+        self._Pane = pane
+        self._FileName = filename
+
+        index = pane.GetSliceIndex()
+        if first is None:
+            first = index
+        if last is None:
+            last = first
+        if step == 0:
+            step = 1
+        if (last - first) * step < 0:
+            step = -step
+        self._Indices = list(range(first, last + (1 if step > 0 else -1),
+                                   step))
+
+        # with a single process, e.g. for one slice, frames are written inline
+        self._Processes = min(processes or multiprocessing.cpu_count(),
+                              len(self._Indices))
+
+        # slice indices are relative to the displayed slice
+        self._StartIndex = index
+        self._Slices = []
+        self._RenderWindow = self._MakeScene(magnification)
+
+        self._WindowToImage = vtk.vtkWindowToImageFilter()
+        self._WindowToImage.SetInput(self._RenderWindow)
+        self._WindowToImage.SetInputBufferTypeToRGB()
+        self._WindowToImage.ReadFrontBufferOff()
+        self._WindowToImage.ShouldRerenderOn()
+
+        self._Executor = None
+        self._Futures = collections.deque()
+        self._FileNames = []
+        self._Next = 0
+        self._Written = 0
+        self._Running = False
+        self._Callback = None
+
+    def _MakeScene(self, magnification):
+        """Build the offscreen window that the slices are rendered in.
+
+        Each reslicer of the pane's plane is copied, along with its current
+        reslice matrix and the step between slices, and its output is shown
+        by an image actor placed where the plane shows it.
+
+        """
+        pane = self._Pane
+        plane = pane._Plane
+
+        renderer = vtk.vtkRenderer()
+        renderer.SetBackground(pane._Renderer.GetBackground())
+        renderer.GetActiveCamera().DeepCopy(pane._Renderer.GetActiveCamera())
+
+        width, height = pane._Renderer.GetSize()
+        window = vtk.vtkRenderWindow()
+        window.SetOffScreenRendering(1)
+        window.SetSize(width * magnification, height * magnification)
+        window.AddRenderer(renderer)
+
+        # the pane counts slices along the stepping axis, the plane along
+        # its normal
+        spacing, origin, extent, axis, sign = pane.GetSliceGeometry()
+        normal = plane.GetNormal()
+        direction = math.copysign(1, normal[axis])
+
+        reslicers = plane.GetImageReslicers()
+        for name in reslicers:
+            source = reslicers[name]
+            source.UpdateInformation()
+            matrix = SliceCache.GetSliceMatrix(source)
+            following = SliceCache.GetSliceMatrix(source, 1)
+            if matrix is None:
+                logger.error("SliceStackExporter: can't export reslicer "
+                             "{} with a non-linear transform".format(name))
+                continue
+
+            # the step between slices, along the normal of the plane
+            shift = [following.GetElement(i, 3) - matrix.GetElement(i, 3)
+                     for i in range(3)]
+            if sum(s * n for s, n in zip(shift, normal)) < 0:
+                shift = [-s for s in shift]
+
+            reslice = vtk.vtkImageReslice()
+            reslice.SetInputConnection(source.GetInputConnection(0, 0))
+            for setting, value in SliceCache.GetResliceSettings(
+                    source).items():
+                getattr(reslice, 'Set' + setting)(value)
+
+            table = _FindLookupTable(plane, source)
+            if table is not None:
+                colors = vtk.vtkImageMapToColors()
+                colors.SetLookupTable(table)
+                colors.SetOutputFormatToRGBA()
+                colors.SetInputConnection(reslice.GetOutputPort())
+                port = colors.GetOutputPort()
+            else:
+                port = reslice.GetOutputPort()
+
+            actor = vtk.vtkImageActor()
+            actor.GetMapper().SetInputConnection(port)
+            renderer.AddViewProp(actor)
+
+            self._Slices.append(
+                (reslice, actor, matrix, [direction * s for s in shift]))
+
+        self._PlaneMatrix = vtk.vtkMatrix4x4()
+        self._PlaneMatrix.DeepCopy(plane.GetTransform().GetMatrix())
+        self._Renderer = renderer
+
+        return window
+
+    def _SetSlice(self, index):
+        """Move the private reslicers and their actors to a slice index."""
+
+        n = index - self._StartIndex
+        for reslice, actor, matrix, shift in self._Slices:
+            axes = vtk.vtkMatrix4x4()
+            axes.DeepCopy(matrix)
+            for i in range(3):
+                axes.SetElement(i, 3, matrix.GetElement(i, 3) + n * shift[i])
+            reslice.SetResliceAxes(axes)
+
+            world = vtk.vtkMatrix4x4()
+            vtk.vtkMatrix4x4.Multiply4x4(self._PlaneMatrix, axes, world)
+            actor.SetUserMatrix(world)
+
+        self._Renderer.ResetCameraClippingRange()
+
+    def GetFileName(self, index):
+        """Return the name of the file that slice index is written to."""
+
+        if len(self._Indices) == 1:
+            return self._FileName
+        if '%' in self._FileName:
+            return self._FileName % index
+
+        root, ext = os.path.splitext(self._FileName)
+        return '{}_{:04d}{}'.format(root, index, ext)
+
+    def GetNumberOfSlices(self):
+        return len(self._Indices)
+
+    def GetProgress(self):
+        """Return the fraction of the slices that have been written."""
+        return self._Written / float(max(1, len(self._Indices)))
+
+    def IsRunning(self):
+        return self._Running
+
+    def Start(self, callback=None):
+        """Start the export.
+
+        Args:
+            callback: called with the list of file names written once the
+                export has completed, or an empty list if it failed or was
+                cancelled
+
+        """
+        self._Callback = callback
+        self._Running = True
+        if self._Processes > 1:
+            self._Executor = concurrent.futures.ProcessPoolExecutor(
+                self._Processes,
+                mp_context=multiprocessing.get_context('spawn'))
+
+        if wx.GetApp() is None:
+            while self._Running:
+                self._CaptureNext()
+        else:
+            wx.CallAfter(self._CaptureNext)
+
+    def Cancel(self):
+        """Stop the export after the frame being captured."""
+        if self._Running:
+            self._Finish(cancelled=True)
+
+    def _CaptureNext(self):
+
+        if not self._Running:
+            return
+
+        if self._Next >= len(self._Indices):
+            self._Finish()
+            return
+
+        index = self._Indices[self._Next]
+        self._Next += 1
+
+        try:
+            self._SetSlice(index)
+            self._WindowToImage.Modified()
+            self._WindowToImage.Update()
+
+            image = self._WindowToImage.GetOutput()
+            width, height, _ = image.GetDimensions()
+            scalars = image.GetPointData().GetScalars()
+            frame = numpy_support.vtk_to_numpy(scalars).reshape(
+                height, width, scalars.GetNumberOfComponents()).copy()
+
+            filename = self.GetFileName(index)
+            if self._Executor is None:
+                self._FileNames.append(_WriteFrame(filename, frame))
+                self._Written += 1
+            else:
+                self._Futures.append(
+                    self._Executor.submit(_WriteFrame, filename, frame))
+
+            # bound the number of frames held in memory
+            while len(self._Futures) > 2 * self._Processes:
+                self._Collect(self._Futures.popleft())
+
+        except Exception:
+            logger.exception("SliceStackExporter: export failed")
+            self._Finish(cancelled=True)
+            return
+
+        if wx.GetApp() is not None:
+            wx.CallAfter(self._CaptureNext)
+
+    def _Collect(self, future):
+        self._FileNames.append(future.result())
+        self._Written += 1
+
+    def _Finish(self, cancelled=False):
+
+        self._Running = False
+
+        try:
+            while self._Futures:
+                future = self._Futures.popleft()
+                if cancelled:
+                    future.cancel()
+                else:
+                    self._Collect(future)
+        except Exception:
+            logger.exception("SliceStackExporter: export failed")
+            cancelled = True
+
+        if self._Executor is not None:
+            self._Executor.shutdown(wait=True)
+            self._Executor = None
+
+        # release the input and the offscreen window
+        for reslice, actor, matrix, shift in self._Slices:
+            reslice.RemoveAllInputConnections(0)
+        self._Slices = []
+        self._RenderWindow.Finalize()
+
+        if self._Callback is not None:
+            self._Callback([] if cancelled else self._FileNames)